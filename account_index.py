@@ -0,0 +1,130 @@
+"""
+Account Index
+In-memory indexes over the consolidated history keyed by bank account
+(company_code, housebank, currency).
+
+Indexes are rebuilt with vectorized pandas operations, and only when the
+history store's partition versions change, so request handlers read them
+in O(accounts) instead of walking the history rows.
+"""
+from collections import namedtuple
+from query_engine import REGION_MAP
+
+ACCOUNT_KEY = ['company_code', 'housebank', 'currency']
+
+class LatestAccountIndex:
+    """Most recent history record for every bank account"""
+
+    def __init__(self):
+        self.versions = None
+        self.records = {}
+
+    def sync(self, history_df, versions):
+        """Rebuild from the history frame if its partition versions changed. Returns True if rebuilt"""
+        if versions == self.versions:
+            return False
+
+        if history_df.empty:
+            records = {}
+        else:
+            # Group-last by date: one row per account, the most recent one
+            latest = history_df.sort_values('date', kind='stable').drop_duplicates(ACCOUNT_KEY, keep='last')
+            latest = latest[ACCOUNT_KEY + ['date', 'total_payments', 'automated_count']]
+            records = {
+                (record['company_code'], record['housebank'], record['currency']): record
+                for record in latest.to_dict('records')
+            }
+
+        self.records = records
+        self.versions = dict(versions)
+        return True
+
+    def latest(self):
+        """
+        {(company_code, housebank, currency): record} of each account's latest day
+        (replaced, never modified, by sync - safe to keep using after the lock)
+        """
+        return self.records
+
+def regions_for(company_code):
+    """Regions a company code belongs to (a company may be in several)"""
+    return [region for region, company_codes in REGION_MAP.items() if company_code in company_codes]
+
+# One published version of the dimensions; readers get a whole state at once
+DimensionsState = namedtuple('DimensionsState', [
+    'accounts',        # {(company_code, housebank, currency): entry}, sorted by key
+    'company_codes',
+    'housebanks',
+    'currencies',
+    'history_versions',
+    'live_version'
+])
+
+class AccountDimensions:
+    """
+    Dimension table of bank accounts with their regions and first/last-seen
+    dates, plus the distinct companies, housebanks and currencies.
+    History accounts are rebuilt when the history changes; live accounts are
+    merged in whenever a new live snapshot is published.
+    """
+
+    def __init__(self):
+        self.history_accounts = {}
+        self.state = DimensionsState({}, [], [], [], None, None)
+
+    def build_history_accounts(self, history_df):
+        """First/last-seen date per account with one vectorized groupby"""
+        if history_df.empty:
+            return {}
+        seen = history_df.groupby(ACCOUNT_KEY)['date'].agg(['min', 'max']).reset_index()
+        return {
+            (row['company_code'], row['housebank'], row['currency']): {
+                'company_code': row['company_code'],
+                'housebank': row['housebank'],
+                'currency': row['currency'],
+                'regions': regions_for(row['company_code']),
+                'first_seen': row['min'],
+                'last_seen': row['max'],
+            }
+            for row in seen.to_dict('records')
+        }
+
+    def sync(self, history_df, history_versions, live_records, live_version, live_date):
+        """
+        Bring the dimensions up to date with the history and the live snapshot.
+        Does nothing if neither changed since the last call. Returns True if rebuilt.
+        """
+        history_changed = history_versions != self.state.history_versions
+        if not history_changed and live_version == self.state.live_version:
+            return False
+
+        if history_changed:
+            self.history_accounts = self.build_history_accounts(history_df)
+
+        accounts = {key: dict(entry) for key, entry in self.history_accounts.items()}
+        for record in live_records:
+            key = (record['company_code'], record['housebank'], record['currency'])
+            entry = accounts.get(key)
+            if entry is None:
+                accounts[key] = {
+                    'company_code': key[0],
+                    'housebank': key[1],
+                    'currency': key[2],
+                    'regions': regions_for(key[0]),
+                    'first_seen': live_date,
+                    'last_seen': live_date,
+                }
+            else:
+                entry['first_seen'] = min(entry['first_seen'], live_date)
+                entry['last_seen'] = max(entry['last_seen'], live_date)
+
+        # Publish: sorted views are computed once here, not per request
+        self.state = DimensionsState(
+            accounts={key: accounts[key] for key in sorted(accounts, key=lambda k: tuple(str(part) for part in k))},
+            company_codes=sorted({key[0] for key in accounts}),
+            housebanks=sorted({key[1] for key in accounts}),
+            currencies=sorted({key[2] for key in accounts}),
+            history_versions=dict(history_versions),
+            live_version=live_version
+        )
+        return True
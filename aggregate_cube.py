@@ -0,0 +1,169 @@
+"""
+Daily Aggregate Cube
+Materialized daily totals over the consolidated history, used by the
+automation trend and overview endpoints.
+
+Base grain is (company_code, housebank, currency, date); rollups are kept
+per (company_code, date), per (region, date) and per date. Every rollup is
+indexed by its key then date, so a range query is an index lookup plus a
+slice instead of a scan over the history. The cube tracks the history
+store's partition versions and only recomputes dates that changed.
+"""
+from collections import namedtuple
+import pandas as pd
+from query_engine import REGION_MAP
+
+ACCOUNT_KEY = ['company_code', 'housebank', 'currency']
+
+# Summed per day; processing time is kept as sum + count so averages stay exact
+MEASURES = [
+    'total_payments',
+    'automated_count',
+    'assigned_to_account',
+    'invoices_assigned',
+    'total_received_eur',
+    'value_assigned_eur',
+    'processing_minutes_sum',
+    'processing_minutes_count',
+]
+
+def empty_rollup(key_columns):
+    """Empty rollup frame with a (key..., date) index"""
+    index = pd.MultiIndex.from_arrays([[] for _ in key_columns + ['date']], names=key_columns + ['date'])
+    return pd.DataFrame({measure: pd.Series(dtype='float64') for measure in MEASURES}, index=index)
+
+def base_rows(df):
+    """Aggregate history rows to (account, date) grain with cube measures"""
+    if df.empty:
+        return empty_rollup(ACCOUNT_KEY)
+
+    rows = pd.DataFrame({
+        'company_code': df['company_code'],
+        'housebank': df['housebank'],
+        'currency': df['currency'],
+        'date': pd.to_datetime(df['date']),
+        'total_payments': df['total_payments'],
+        'automated_count': df['automated_count'],
+        'assigned_to_account': df['assigned_to_account'],
+        'invoices_assigned': df['invoices_assigned'],
+        'total_received_eur': df['total_received_eur'],
+        'value_assigned_eur': df['value_assigned_eur'],
+        'processing_minutes_sum': df['processing_minutes'].fillna(0),
+        'processing_minutes_count': df['processing_minutes'].notna().astype(int),
+    })
+    return rows.groupby(ACCOUNT_KEY + ['date']).sum()
+
+def roll_up(base, key_columns):
+    """Sum the base grain up to (key_columns..., date)"""
+    if base.empty:
+        return empty_rollup(key_columns)
+    return base.groupby(key_columns + ['date']).sum()
+
+def roll_up_regions(company_rollup):
+    """Sum the company rollup into regions (a company may belong to several)"""
+    frames = []
+    for region, company_codes in REGION_MAP.items():
+        part = company_rollup[company_rollup.index.get_level_values('company_code').isin(company_codes)]
+        if part.empty:
+            continue
+        daily = part.groupby('date').sum()
+        daily.index = pd.MultiIndex.from_arrays(
+            [[region] * len(daily), daily.index], names=['region', 'date']
+        )
+        frames.append(daily)
+    if not frames:
+        return empty_rollup(['region'])
+    return pd.concat(frames)
+
+def replace_dates(rollup, stale_dates, fresh):
+    """Swap the rows for stale_dates in a rollup for freshly computed ones"""
+    if len(stale_dates):
+        keep = ~rollup.index.get_level_values('date').isin(stale_dates)
+        rollup = rollup[keep]
+    if not fresh.empty:
+        rollup = pd.concat([rollup, fresh]) if not rollup.empty else fresh
+    return rollup.sort_index()
+
+class CubeState(namedtuple('CubeState', ['versions', 'by_account', 'by_company', 'by_region', 'totals'])):
+    """
+    One published, immutable version of the cube. sync() swaps in a whole new
+    state, so a reader holding a state never sees rollups from two versions.
+    """
+    __slots__ = ()
+
+    def daily(self, start_date, end_date, bank_account=None, region='', company_code=''):
+        """
+        Daily measures between start_date and end_date (inclusive), indexed by date.
+        bank_account is a (company_code, housebank, currency) tuple and overrides
+        region/company_code; region and company_code combine.
+        """
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+
+        if bank_account:
+            rollup, key = self.by_account, tuple(bank_account)
+        elif region and region in REGION_MAP:
+            if company_code:
+                if company_code not in REGION_MAP[region]:
+                    return self.totals.iloc[0:0]
+                rollup, key = self.by_company, company_code
+            else:
+                rollup, key = self.by_region, region
+        elif company_code:
+            rollup, key = self.by_company, company_code
+        else:
+            return self.totals.loc[start:end]
+
+        try:
+            series = rollup.loc[key]
+        except KeyError:
+            return self.totals.iloc[0:0]
+        return series.loc[start:end]
+
+    def total(self, start_date, end_date, **filters):
+        """Sum of every measure over a date range (a Series)"""
+        return self.daily(start_date, end_date, **filters).sum().reindex(MEASURES, fill_value=0)
+
+class DailyCube:
+    """Daily aggregates at account grain plus company, region and total rollups"""
+
+    def __init__(self):
+        self.state = CubeState(
+            versions={},
+            by_account=empty_rollup(ACCOUNT_KEY),
+            by_company=empty_rollup(['company_code']),
+            by_region=empty_rollup(['region']),
+            totals=pd.DataFrame(
+                {measure: pd.Series(dtype='float64') for measure in MEASURES},
+                index=pd.DatetimeIndex([], name='date')
+            )
+        )
+
+    def sync(self, history_df, versions):
+        """
+        Bring the cube in line with the history frame.
+        Only dates whose partition version differs from the last sync are recomputed.
+        Returns the number of dates recomputed.
+        """
+        state = self.state
+        stale = {d for d, v in versions.items() if state.versions.get(d) != v}
+        stale.update(d for d in state.versions if d not in versions)
+        if not stale:
+            return 0
+
+        stale_timestamps = pd.to_datetime(list(stale))
+        changed = history_df[history_df['date'].isin(stale)] if not history_df.empty else history_df
+
+        base = base_rows(changed)
+        company = roll_up(base, ['company_code'])
+        region = roll_up_regions(company)
+        totals = base.groupby('date').sum() if not base.empty else state.totals.iloc[0:0]
+
+        keep = ~state.totals.index.isin(stale_timestamps)
+        self.state = CubeState(
+            versions=dict(versions),
+            by_account=replace_dates(state.by_account, stale_timestamps, base),
+            by_company=replace_dates(state.by_company, stale_timestamps, company),
+            by_region=replace_dates(state.by_region, stale_timestamps, region),
+            totals=pd.concat([state.totals[keep], totals]).sort_index() if not totals.empty else state.totals[keep]
+        )
+        return len(stale)
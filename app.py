@@ -1,110 +1,191 @@
 """
 CashWeb - Cash Management Web Application
 A Flask application for tracking PACO/FRAN automation analytics with dual-source data:
-- Historical data from consolidated Excel database
+- Historical data from the consolidated history store (SQLite, see history_store.py)
 - Live data from network path for real-time status
 """
-from flask import Flask, render_template, jsonify, request
-from datetime import datetime, timedelta, date
+from flask import Flask, render_template, jsonify, request, send_file, g
+from datetime import datetime, timedelta, date, timezone
 import pandas as pd
+import io
 import os
+import csv
 import re
 import json
-from currency_converter import convert_to_eur
+import time
+import threading
+from collections import OrderedDict, namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
+from history_store import get_history_store
+from aggregate_cube import DailyCube
+from account_index import LatestAccountIndex, AccountDimensions
+from query_engine import parse_filter_spec, overview_metrics, automation_trend
+from dir_scanner import files, folders, read_listing, ACCOUNT_FOLDER, EXCEL_FILE
+from workbook_reader import read_workbook, METRIC_COLUMNS, TRANSACTION_COLUMNS
+from payment_metrics import file_metrics
+from transaction_feed import file_transactions, feed_page, FEED_PAGE_SIZE
+import exception_store
 
 app = Flask(__name__)
 
-# Configuration
-CONSOLIDATED_DB_PATH = "data/paco_consolidated.xlsx"
-FRAN_CONSOLIDATED_DB_PATH = "data/fran_consolidated.xlsx"
+# Configuration (historical database location lives in history_store.py)
 PACO_NETWORK_PATH = r"\\emea\central\SSC_GROUP\BPA\30_Automations\90_CashOps\02_Posting Cash\03_Output\2025"
 FRAN_NETWORK_PATH = r"\\emea\central\SSC_GROUP\BPA\30_Automations\90_CashOps\02_Posting Cash\03_Output\2025"
 PACO_RAW_DATA_PATH = r"\\emea\central\SSC_GROUP\BPA\30_Automations\90_CashOps\02_Posting Cash\02_RD\02_P\2025"
 FRAN_RAW_DATA_PATH = r"\\emea\central\SSC_GROUP\BPA\30_Automations\90_CashOps\02_Posting Cash\02_RD\02_F\2025"
-CUSTOMER_EXCEPTIONS_PATH = "data/customer_exceptions.json"
+LIVE_FILE_CACHE_SIZE = 256  # Max parsed live output files kept in memory
+RAW_COUNT_CACHE_SIZE = 1024  # Max raw account folder counts kept in memory
+RAW_COUNT_WORKERS = 8  # Raw account folders listed concurrently
+LIVE_REFRESH_SECONDS = 60  # How often the background worker re-reads live data
+AUTOMATION_TYPES = ('PACO', 'FRAN')
+HISTORY_CHECK_SECONDS = 30  # How often to look for new/replaced history partitions
+EXCEPTIONS_PAGE_SIZE = 50  # Customer exceptions per page (default)
+EXCEPTIONS_MAX_PAGE_SIZE = 1000
+EXCEPTIONS_BULK_MAX_ROWS = 50_000  # Rows accepted by one bulk import
+STATUS_EVENT_BACKLOG = 100  # Status delta events kept for reconnecting stream clients
+STATUS_STREAM_KEEPALIVE_SECONDS = 15  # Comment line sent on idle status streams
 
 # Global cache for historical data
-historical_data_cache = None
-historical_data_timestamp = None
-fran_data_cache = None
-fran_data_timestamp = None
-
-# Customer exceptions storage helpers
-def load_customer_exceptions():
-    """Load customer exceptions from JSON file"""
-    if os.path.exists(CUSTOMER_EXCEPTIONS_PATH):
-        try:
-            with open(CUSTOMER_EXCEPTIONS_PATH, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading customer exceptions: {str(e)}")
-            return []
-    return []
+# Snapshot frames are shared by every request and must never be written to:
+# derived frames come from boolean masks, concat and groupby (new objects), and
+# the cube's date slices (views) are only ever read. Take an explicit .copy()
+# before any in-place change to a frame reached from a snapshot.
 
-def save_customer_exceptions(exceptions):
-    """Save customer exceptions to JSON file"""
-    try:
-        os.makedirs(os.path.dirname(CUSTOMER_EXCEPTIONS_PATH), exist_ok=True)
-        with open(CUSTOMER_EXCEPTIONS_PATH, 'w') as f:
-            json.dump(exceptions, f, indent=2)
-        return True
-    except Exception as e:
-        print(f"Error saving customer exceptions: {str(e)}")
-        return False
+# Published history snapshots per source ('paco'/'fran') - replaced wholesale, never mutated
+history_snapshots = {}
+history_snapshot_lock = threading.Lock()
+
+# Indexes kept in sync with the history caches above
+daily_cubes = {'paco': DailyCube(), 'fran': DailyCube()}
+latest_account_index = LatestAccountIndex()
+account_dimensions = AccountDimensions()
+history_index_lock = threading.Lock()
+
+# Parsed live output files: path -> ((size, mtime), record), least recently used first
+live_file_cache = OrderedDict()
+live_file_cache_lock = threading.Lock()
+
+# Raw payment counts: account folder path -> (folder mtime_ns, payment count, latest file mtime_ns)
+raw_count_cache = OrderedDict()
+raw_count_cache_lock = threading.Lock()
+
+# Published live snapshots per automation type - replaced wholesale, never mutated
+live_snapshots = {}
+live_snapshot_version = 0
+live_snapshot_lock = threading.Lock()
+live_refresher_thread = None
+
+# Company status grid per automation type and the deltas between successive grids,
+# pushed to /api/status-stream clients (event id increases by one per delta)
+status_grids = {}
+status_events = deque(maxlen=STATUS_EVENT_BACKLOG)
+status_event_id = 0
+status_condition = threading.Condition()
 
-def load_historical_data(force_reload=False):
+HistorySnapshot = namedtuple('HistorySnapshot', [
+    'source',
+    'df',           # Normalized history frame - shared by all requests, never modified
+    'versions',     # {date: partition version} the frame reflects (emptied dates included)
+    'version',      # Max partition version (increases on every history store write)
+    'checked_at',   # When the store was last checked for changes
+    'changed_at'    # When this process last loaded changed partitions
+])
+
+def build_history_snapshot(source, previous=None):
     """
-    Load PACO historical data from consolidated Excel database.
-    Caches the data to avoid repeated file reads.
+    Build a new history snapshot from the history store.
+    Only date partitions whose version changed since `previous` are read; the
+    rest of the previous frame is reused. The previous snapshot is left untouched.
     """
-    global historical_data_cache, historical_data_timestamp
-    
-    # Check if cache is valid (less than 5 minutes old)
-    if not force_reload and historical_data_cache is not None:
-        if historical_data_timestamp and (datetime.now() - historical_data_timestamp).seconds < 300:
-            return historical_data_cache
+    store = get_history_store(source)
     
-    # Load data from Excel
-    if os.path.exists(CONSOLIDATED_DB_PATH):
-        try:
-            df = pd.read_excel(CONSOLIDATED_DB_PATH, engine='openpyxl')
-            df['date'] = pd.to_datetime(df['date']).dt.date
-            historical_data_cache = df
-            historical_data_timestamp = datetime.now()
-            return df
-        except Exception as e:
-            print(f"Error loading PACO historical data: {str(e)}")
-            return pd.DataFrame()
+    if previous is None:
+        df, versions = store.load_changes()
     else:
-        print(f"PACO historical database not found: {CONSOLIDATED_DB_PATH}")
-        return pd.DataFrame()
+        changed_df, versions = store.load_changes(previous.versions)
+        stale_dates = {d for d in previous.versions if previous.versions[d] != versions.get(d)}
+        stale_dates.update(d for d in versions if d not in previous.versions)
+        
+        if not stale_dates:
+            return previous._replace(checked_at=datetime.now())
+        
+        print(f"{source.upper()} history: reloading {len(stale_dates)} changed date partition(s)")
+        kept_df = previous.df[~previous.df['date'].isin(stale_dates)]
+        df = pd.concat([kept_df, changed_df], ignore_index=True)
+    
+    return HistorySnapshot(
+        source=source,
+        df=df,
+        versions=versions,
+        version=max(versions.values(), default=0),
+        checked_at=datetime.now(),
+        changed_at=datetime.now()
+    )
 
-def load_fran_historical_data(force_reload=False):
+def get_history_snapshot(source, force_reload=False):
     """
-    Load FRAN historical data from consolidated Excel database.
-    Caches the data to avoid repeated file reads.
+    Get the current history snapshot for 'paco' or 'fran'.
+    The store is checked for changed partitions at most every HISTORY_CHECK_SECONDS;
+    a refreshed snapshot is swapped in atomically. Callers get shared read-only access.
     """
-    global fran_data_cache, fran_data_timestamp
-    
-    # Check if cache is valid (less than 5 minutes old)
-    if not force_reload and fran_data_cache is not None:
-        if fran_data_timestamp and (datetime.now() - fran_data_timestamp).seconds < 300:
-            return fran_data_cache
-    
-    # Load data from Excel
-    if os.path.exists(FRAN_CONSOLIDATED_DB_PATH):
+    snapshot = history_snapshots.get(source)
+    if not force_reload and snapshot is not None:
+        if (datetime.now() - snapshot.checked_at).total_seconds() < HISTORY_CHECK_SECONDS:
+            return snapshot
+    
+    with history_snapshot_lock:
+        # Another request may have refreshed while we waited for the lock
+        current = history_snapshots.get(source)
+        if not force_reload and current is not None and current is not snapshot:
+            return current
+        
         try:
-            df = pd.read_excel(FRAN_CONSOLIDATED_DB_PATH, engine='openpyxl')
-            df['date'] = pd.to_datetime(df['date']).dt.date
-            fran_data_cache = df
-            fran_data_timestamp = datetime.now()
-            return df
+            snapshot = build_history_snapshot(source, None if force_reload else current)
         except Exception as e:
-            print(f"Error loading FRAN historical data: {str(e)}")
-            return pd.DataFrame()
-    else:
-        print(f"FRAN historical database not found: {FRAN_CONSOLIDATED_DB_PATH}")
-        return pd.DataFrame()
+            print(f"Error loading {source.upper()} historical data: {str(e)}")
+            if current is not None:
+                return current
+            snapshot = HistorySnapshot(source, pd.DataFrame(), {}, 0, datetime.now(), datetime.now())
+        
+        history_snapshots[source] = snapshot
+        return snapshot
+
+def get_daily_cube(source, snapshot=None):
+    """
+    Get the daily aggregate cube state for 'paco' or 'fran' (synced to `snapshot`,
+    default the current one). Dates whose history partition changed since the
+    last call are recomputed first. The returned state is immutable, so the
+    request reads one consistent version even if another request syncs later.
+    """
+    snapshot = snapshot or get_history_snapshot(source)
+    cube = daily_cubes[source]
+    with history_index_lock:
+        cube.sync(snapshot.df, snapshot.versions)
+        return cube.state
+
+def get_latest_accounts(snapshot=None):
+    """
+    Get {(company_code, housebank, currency): record} with each bank account's
+    most recent PACO history record. Rebuilt only when the history changed.
+    """
+    snapshot = snapshot or get_history_snapshot('paco')
+    with history_index_lock:
+        latest_account_index.sync(snapshot.df, snapshot.versions)
+        return latest_account_index.latest()
+
+def get_account_dimensions():
+    """
+    Get the bank-account dimension table (PACO history + today's live accounts,
+    an immutable DimensionsState) together with the live snapshot it reflects.
+    Rebuilt only when either changed.
+    """
+    snapshot = get_history_snapshot('paco')
+    live_snapshot = get_live_snapshot('PACO')
+    live_date = date.today() - timedelta(days=1)  # Today's live data is yesterday's payments
+    with history_index_lock:
+        account_dimensions.sync(snapshot.df, snapshot.versions, live_snapshot.records,
+                                live_snapshot.version, live_date)
+        return account_dimensions.state, live_snapshot
 
 def parse_filename(filename):
     """
@@ -122,97 +203,30 @@ def parse_filename(filename):
     
     return None, None, None
 
-def count_invoices(docnumbers_str):
-    """Count invoices from DocNumbers column (separated by ;)"""
-    if pd.isna(docnumbers_str) or docnumbers_str == '':
-        return 0
-    invoices = [inv.strip() for inv in str(docnumbers_str).split(';') if inv.strip()]
-    return len(invoices)
-
 def process_live_excel_file(filepath):
     """
     Process a single Excel file and extract metrics for live data.
     Returns aggregated metrics and transaction details.
     """
     try:
-        df = pd.read_excel(filepath, engine='openpyxl')
-        df.columns = df.columns.str.strip()
-        
         filename = os.path.basename(filepath)
         company_code, housebank, currency = parse_filename(filename)
         
         if not all([company_code, housebank, currency]):
             return None
         
-        # Calculate metrics
-        total_payments = len(df)
-        total_received = df['Amount'].sum() if 'Amount' in df.columns else 0
-        
-        # Determine which DocNumbers column to use
-        docnumbers_col = None
-        if 'DocNumbers' in df.columns:
-            docnumbers_col = 'DocNumbers'
-        elif 'Docnumbers' in df.columns:
-            docnumbers_col = 'Docnumbers'
-        
-        # Processed Automatically = Match == "Yes" AND has invoices (DocNumbers not empty)
-        automated_count = 0
-        if 'Match' in df.columns and docnumbers_col:
-            automated_mask = (df['Match'].str.upper() == 'YES') & (df[docnumbers_col].notna()) & (df[docnumbers_col] != '')
-            automated_count = len(df[automated_mask])
-        
-        assigned_to_account = len(df[df['Business_Partner'].notna()]) if 'Business_Partner' in df.columns else 0
+        # Only the metric and recent-transaction columns are read (headers are stripped)
+        df = read_workbook(filepath, METRIC_COLUMNS + TRANSACTION_COLUMNS)
         
-        invoices_assigned = 0
-        if docnumbers_col:
-            invoices_assigned = df[docnumbers_col].apply(count_invoices).sum()
-        
-        # Value Assigned = Amount for rows where Match == "Yes" AND has invoices
-        value_assigned = 0
-        if 'Match' in df.columns and 'Amount' in df.columns and docnumbers_col:
-            value_mask = (df['Match'].str.upper() == 'YES') & (df[docnumbers_col].notna()) & (df[docnumbers_col] != '')
-            value_assigned = df[value_mask]['Amount'].sum()
-        
-        # Convert amounts to EUR
-        total_received_eur = convert_to_eur(total_received, currency)
-        value_assigned_eur = convert_to_eur(value_assigned, currency)
-        
-        # Get file timestamp
         file_timestamp = datetime.fromtimestamp(os.path.getmtime(filepath))
-        start_of_day = datetime.combine(file_timestamp.date(), datetime.strptime('08:00', '%H:%M').time())
-        processing_minutes = int((file_timestamp - start_of_day).total_seconds() / 60)
+        # Convert at the data date (the payments are the previous day's), like the
+        # consolidation will, so live EUR totals match the history they become
+        data_date = file_timestamp.date() - timedelta(days=1)
+        record = file_metrics(df, company_code, housebank, currency, file_timestamp, rate_date=data_date)
         
-        # Extract recent transactions (last 5 for each file)
-        transactions = []
-        for idx, row in df.tail(5).iterrows():
-            transactions.append({
-                'payment_number': str(row.get('Payment_Number', '')),
-                'business_partner': str(row.get('Business_Partner', '')),
-                'amount': float(row.get('Amount', 0)),
-                'match': str(row.get('Match', '')),
-                'docnumbers': str(row.get('Docnumbers', '')),
-                'payment_date': str(row.get('Payment Date', '')),
-                'company_code': company_code,
-                'housebank': housebank,
-                'currency': currency
-            })
-        
-        return {
-            'company_code': company_code,
-            'housebank': housebank,
-            'currency': currency,
-            'total_received': float(total_received),
-            'total_received_eur': float(total_received_eur),
-            'total_payments': int(total_payments),
-            'automated_count': int(automated_count),
-            'assigned_to_account': int(assigned_to_account),
-            'invoices_assigned': int(invoices_assigned),
-            'value_assigned': float(value_assigned),
-            'value_assigned_eur': float(value_assigned_eur),
-            'file_timestamp': file_timestamp,
-            'processing_minutes': processing_minutes,
-            'transactions': transactions
-        }
+        # Sorted transaction index for the recent-transactions feed
+        record['transactions'] = file_transactions(df, company_code, housebank, currency)
+        return record
         
     except Exception as e:
         with open('live_data_debug.txt', 'a') as f:
@@ -221,10 +235,72 @@ def process_live_excel_file(filepath):
             f.write(traceback.format_exc())
         return None
 
+def get_cached_live_file(filepath, signature=None):
+    """
+    Return live metrics for an output file, re-parsing it only when it changed.
+    Files are identified by (path, size, mtime); anything beyond
+    LIVE_FILE_CACHE_SIZE is evicted least recently used first.
+    signature: (size, mtime_ns) from a directory scan, saves a stat per file.
+    """
+    if signature is None:
+        try:
+            stat = os.stat(filepath)
+        except OSError as e:
+            print(f"Error reading file info for {filepath}: {str(e)}")
+            return None
+        signature = (stat.st_size, stat.st_mtime_ns)
+    
+    with live_file_cache_lock:
+        cached = live_file_cache.get(filepath)
+        if cached is not None and cached[0] == signature:
+            live_file_cache.move_to_end(filepath)
+            return cached[1]
+    
+    # Parse outside the lock so one slow workbook doesn't block other requests
+    record = process_live_excel_file(filepath)
+    if record is None:
+        # Don't cache failures - the file may still be being written
+        return None
+    
+    with live_file_cache_lock:
+        live_file_cache[filepath] = (signature, record)
+        live_file_cache.move_to_end(filepath)
+        while len(live_file_cache) > LIVE_FILE_CACHE_SIZE:
+            live_file_cache.popitem(last=False)
+    
+    return record
+
+def count_raw_payments(folder_path):
+    """
+    (payment count, latest file mtime_ns) of a raw account folder.
+    Each raw payment is its own .xls/.xlsx file; the folder is re-listed only
+    when its own mtime changed (files added, removed or renamed).
+    """
+    folder_mtime_ns = os.stat(folder_path).st_mtime_ns
+    
+    with raw_count_cache_lock:
+        cached = raw_count_cache.get(folder_path)
+        if cached is not None and cached[0] == folder_mtime_ns:
+            raw_count_cache.move_to_end(folder_path)
+            return cached[1], cached[2]
+    
+    excel_files = [entry for entry in read_listing(folder_path) if entry.kind == EXCEL_FILE]
+    count = len(excel_files)
+    latest_mtime_ns = max((entry.mtime_ns for entry in excel_files), default=0)
+    
+    with raw_count_cache_lock:
+        raw_count_cache[folder_path] = (folder_mtime_ns, count, latest_mtime_ns)
+        raw_count_cache.move_to_end(folder_path)
+        while len(raw_count_cache) > RAW_COUNT_CACHE_SIZE:
+            raw_count_cache.popitem(last=False)
+    
+    return count, latest_mtime_ns
+
 def get_raw_data_counts(automation_type='PACO'):
     """
     Get raw data counts from today's raw data path (before processing starts).
     Returns list of bank account records with total payment counts.
+    Counts are cached per account folder (see count_raw_payments).
     """
     raw_path = PACO_RAW_DATA_PATH if automation_type == 'PACO' else FRAN_RAW_DATA_PATH
     
@@ -240,55 +316,53 @@ def get_raw_data_counts(automation_type='PACO'):
     
     records = []
     
-    if not os.path.exists(raw_data_path):
+    # Look for subdirectories (e.g., 0010_1050D_EUR)
+    try:
+        account_folders = folders(raw_data_path, ACCOUNT_FOLDER)
+    except FileNotFoundError:
         print(f"[DEBUG] Raw data path does not exist: {raw_data_path}")
         return records
     
-    # Look for subdirectories (e.g., 0010_1050D_EUR)
     try:
-        for dirname in os.listdir(raw_data_path):
-            dir_path = os.path.join(raw_data_path, dirname)
-            if os.path.isdir(dir_path):
-                # Parse directory name to extract company_code, housebank, currency
-                company_code, housebank, currency = parse_filename(dirname)
-                if not all([company_code, housebank, currency]):
-                    continue
-                
+        accounts = []
+        for folder in account_folders:
+            # Parse directory name to extract company_code, housebank, currency
+            company_code, housebank, currency = parse_filename(folder.name)
+            if all([company_code, housebank, currency]):
                 # Keep company_code as is (with leading zeros like 0010)
-                
-                # Count Excel files in the directory (each file = 1 payment)
-                # Raw data can be .xls or .xlsx format
-                excel_files = [f for f in os.listdir(dir_path) 
-                              if (f.endswith('.xls') or f.endswith('.xlsx')) and not f.startswith('~$')]
-                total_payments = len(excel_files)
-                
-                if total_payments > 0:
-                    records.append({
-                        'company_code': company_code,
-                        'housebank': housebank,
-                        'currency': currency,
-                        'total_payments': total_payments,
-                        'total_received': 0,  # Unknown from raw data
-                        'total_received_eur': 0,  # Unknown from raw data
-                        'automated_count': 0,  # Not processed yet
-                        'assigned_to_account': 0,  # Not processed yet
-                        'invoices_assigned': 0,  # Not processed yet
-                        'value_assigned': 0,  # Not processed yet
-                        'value_assigned_eur': 0,  # Not processed yet
-                        'processing_minutes': 0,  # Not processed yet
-                        'is_raw': True,
-                        'file_timestamp': datetime.now()
-                    })
+                accounts.append((folder.path, company_code, housebank, currency))
+        
+        # One stat per folder; only changed folders are listed again (concurrently)
+        with ThreadPoolExecutor(max_workers=RAW_COUNT_WORKERS) as executor:
+            counts = list(executor.map(count_raw_payments, [account[0] for account in accounts]))
+        
+        for (_, company_code, housebank, currency), (total_payments, latest_mtime_ns) in zip(accounts, counts):
+            if total_payments > 0:
+                records.append({
+                    'company_code': company_code,
+                    'housebank': housebank,
+                    'currency': currency,
+                    'total_payments': total_payments,
+                    'total_received': 0,  # Unknown from raw data
+                    'total_received_eur': 0,  # Unknown from raw data
+                    'automated_count': 0,  # Not processed yet
+                    'assigned_to_account': 0,  # Not processed yet
+                    'invoices_assigned': 0,  # Not processed yet
+                    'value_assigned': 0,  # Not processed yet
+                    'value_assigned_eur': 0,  # Not processed yet
+                    'processing_minutes': 0,  # Not processed yet
+                    'is_raw': True,
+                    'file_timestamp': datetime.fromtimestamp(latest_mtime_ns / 1e9)  # Latest raw file
+                })
     except Exception as e:
         print(f"Error reading raw data: {str(e)}")
     
     return records
 
-def get_live_data(automation_type='PACO'):
+def get_processed_live_data(automation_type='PACO'):
     """
-    Read today's files from network path for real-time data.
-    First checks processed output, then falls back to raw data if not available.
-    Returns list of processed bank account records.
+    Read today's processed output files from network path.
+    Returns list of processed bank account records (empty if none yet).
     
     Note: "Today" means yesterday's payments (received and processed today).
     """
@@ -308,36 +382,224 @@ def get_live_data(automation_type='PACO'):
     
     records = []
     
-    # First, try to get processed data
-    if os.path.exists(output_folder):
-        files = os.listdir(output_folder)
-        excel_files = [f for f in files if f.endswith('.xlsx') and not f.startswith('~$')]
+    # First, try to get processed data (one listing, stat info included)
+    try:
+        excel_files = files(output_folder, '.xlsx')
+    except FileNotFoundError:
+        return records
+    
+    with open('live_data_debug.txt', 'a') as f:
+        f.write(f"Found {len(excel_files)} Excel files in output folder\n")
+    
+    # Process all Excel files in today's output folder
+    for entry in excel_files:
         with open('live_data_debug.txt', 'a') as f:
-            f.write(f"Found {len(excel_files)} Excel files in output folder\n")
-        
-        # Process all Excel files in today's output folder
-        for filename in excel_files:
-            filepath = os.path.join(output_folder, filename)
+            f.write(f"Processing output file: {entry.name}\n")
+        record = get_cached_live_file(entry.path, (entry.size, entry.mtime_ns))
+        if record:
+            records.append(record)
             with open('live_data_debug.txt', 'a') as f:
-                f.write(f"Processing output file: {filename}\n")
-            record = process_live_excel_file(filepath)
-            if record:
-                records.append(record)
-                with open('live_data_debug.txt', 'a') as f:
-                    f.write(f"  SUCCESS: Processed {filename}\n")
+                f.write(f"  SUCCESS: Processed {entry.name}\n")
+        else:
+            with open('live_data_debug.txt', 'a') as f:
+                f.write(f"  FAILED: Could not process {entry.name}\n")
+    
+    return records
+
+LiveSnapshot = namedtuple('LiveSnapshot', [
+    'automation_type',
+    'records',      # Processed records, or raw counts before processing starts
+    'processed',    # Records parsed from today's output files
+    'raw_counts',   # Payment counts from today's raw data folders
+    'built_at',     # datetime the snapshot was built (None = not built yet)
+    'version',      # Increments on every publish that changed the data
+    'changed_at'    # datetime the data last changed (None = not built yet)
+])
+
+def build_live_snapshot(automation_type, version):
+    """
+    Read today's live data from the network share into a new snapshot.
+    Processed output is preferred; raw data counts stand in until the
+    first output file lands. Only the background refresher calls this -
+    request-serving threads never touch the share.
+    """
+    processed = tuple(get_processed_live_data(automation_type))
+    raw_counts = tuple(get_raw_data_counts(automation_type))
+    
+    if processed:
+        print(f"[DEBUG] Found {len(processed)} processed {automation_type} files")
+    else:
+        print(f"[DEBUG] No processed {automation_type} data found, raw data returned {len(raw_counts)} records")
+    
+    return LiveSnapshot(
+        automation_type=automation_type,
+        records=processed if processed else raw_counts,
+        processed=processed,
+        raw_counts=raw_counts,
+        built_at=datetime.now(),
+        version=version,
+        changed_at=datetime.now()
+    )
+
+def refresh_live_snapshots():
+    """Build and atomically publish a fresh snapshot for every automation type"""
+    global live_snapshot_version
+    
+    for automation_type in AUTOMATION_TYPES:
+        try:
+            snapshot = build_live_snapshot(automation_type, live_snapshot_version + 1)
+        except Exception as e:
+            # Keep serving the previous snapshot
+            print(f"Error refreshing {automation_type} live snapshot: {str(e)}")
+            continue
+        
+        with live_snapshot_lock:
+            previous = live_snapshots.get(automation_type)
+            if previous is not None and (previous.processed, previous.raw_counts) == (snapshot.processed, snapshot.raw_counts):
+                # Same data: keep the version so ETags and memoized queries stay valid
+                snapshot = snapshot._replace(version=previous.version, changed_at=previous.changed_at)
             else:
-                with open('live_data_debug.txt', 'a') as f:
-                    f.write(f"  FAILED: Could not process {filename}\n")
-    
-    # If no processed files found, get raw data counts
-    if not records:
-        print(f"[DEBUG] No processed data found in {output_folder}, checking raw data...")
-        records = get_raw_data_counts(automation_type)
-        print(f"[DEBUG] Raw data returned {len(records)} records")
+                live_snapshot_version = snapshot.version
+            live_snapshots[automation_type] = snapshot
+    
+    # Fold newly seen live accounts into the dimension table off the request path
+    try:
+        get_account_dimensions()
+    except Exception as e:
+        print(f"Error updating account dimensions: {str(e)}")
+    
+    # Push per-account status changes to connected stream clients
+    for automation_type in AUTOMATION_TYPES:
+        try:
+            publish_status_deltas(automation_type)
+        except Exception as e:
+            print(f"Error publishing {automation_type} status deltas: {str(e)}")
+
+def publish_status_deltas(automation_type):
+    """
+    Diff the current company status grid against the last published one and
+    queue a delta event (changed and removed bank accounts) if anything changed.
+    Runs on the refresher thread, so the grid is built once for all clients.
+    """
+    global status_event_id
+    
+    statuses = build_company_status(get_history_snapshot('paco'), get_live_snapshot(automation_type))
+    grid = {entry['bank_account']: entry for entry in statuses['company_statuses']}
+    
+    with status_condition:
+        previous = status_grids.get(automation_type, {})
+        status_grids[automation_type] = grid
+        
+        changed = [entry for key, entry in grid.items() if previous.get(key) != entry]
+        removed = [key for key in previous if key not in grid]
+        if not changed and not removed:
+            return
+        
+        status_event_id += 1
+        status_events.append((status_event_id, automation_type, {
+            'changed': changed,
+            'removed': removed,
+            'live_data_age_seconds': statuses['live_data_age_seconds']
+        }))
+        status_condition.notify_all()
+
+def live_refresher_loop():
+    """Background worker: refresh live snapshots every LIVE_REFRESH_SECONDS"""
+    while True:
+        refresh_live_snapshots()
+        time.sleep(LIVE_REFRESH_SECONDS)
+
+def start_live_refresher():
+    """Start the background live snapshot refresher (once per process)"""
+    global live_refresher_thread
+    
+    with live_snapshot_lock:
+        if live_refresher_thread is not None:
+            return
+        live_refresher_thread = threading.Thread(
+            target=live_refresher_loop, name='live-snapshot-refresher', daemon=True
+        )
+        live_refresher_thread.start()
+
+def get_live_snapshot(automation_type='PACO'):
+    """
+    Get the latest published live snapshot without any network I/O.
+    Returns an empty snapshot until the refresher has published one.
+    """
+    snapshot = live_snapshots.get(automation_type)
+    if snapshot is None:
+        return LiveSnapshot(automation_type, (), (), (), None, 0, None)
+    return snapshot
+
+def get_snapshot_age_seconds(snapshot):
+    """Seconds since the snapshot was built (None if not built yet)"""
+    if snapshot.built_at is None:
+        return None
+    return round((datetime.now() - snapshot.built_at).total_seconds(), 1)
+
+@app.before_request
+def ensure_live_refresher():
+    """Start the live snapshot refresher on the first request"""
+    if live_refresher_thread is None:
+        start_live_refresher()
+
+def get_data_version(path):
+    """
+    Get (etag, last_modified) for the data behind an /api/* response:
+    today's date, the PACO/FRAN history store versions and the live snapshot
+    versions (plus the exception store version for the customer exceptions endpoints).
+    Only reads already-published snapshots - no aggregation work.
+    """
+    history = [get_history_snapshot(source) for source in ('paco', 'fran')]
+    live = [get_live_snapshot(automation_type) for automation_type in AUTOMATION_TYPES]
+    
+    parts = [date.today().isoformat()]
+    parts += [f"h{snapshot.source}{snapshot.version}" for snapshot in history]
+    parts += [f"l{snapshot.automation_type.lower()}{snapshot.version}" for snapshot in live]
+    changed = [snapshot.changed_at for snapshot in history + live if snapshot.changed_at is not None]
+    
+    if path.startswith('/api/customer-exceptions'):
+        exceptions_version, exceptions_updated_at = exception_store.store_version()
+        parts.append(f"ex{exceptions_version}")
+        if exceptions_updated_at is not None:
+            changed.append(exceptions_updated_at)
+    
+    last_modified = max(changed).astimezone(timezone.utc).replace(microsecond=0) if changed else None
+    return '-'.join(parts), last_modified
+
+@app.before_request
+def check_not_modified():
+    """
+    Answer conditional GETs on /api/* with 304 Not Modified when the data
+    version is unchanged, before the endpoint does any work.
+    """
+    if request.method != 'GET' or not request.path.startswith('/api/'):
+        return None
+    if request.path == '/api/status-stream':
+        return None  # Event stream - never cached
+    
+    etag, last_modified = get_data_version(request.path)
+    g.data_etag, g.data_last_modified = etag, last_modified
+    
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
     else:
-        print(f"[DEBUG] Found {len(records)} processed files")
+        not_modified = bool(request.if_modified_since and last_modified and request.if_modified_since >= last_modified)
     
-    return records
+    if not_modified:
+        response = app.response_class(status=304)
+        return add_version_headers(response)
+    return None
+
+@app.after_request
+def add_version_headers(response):
+    """Tag successful /api/* GET responses with the data version (clients must revalidate)"""
+    if 'data_etag' in g and response.status_code in (200, 304):
+        response.set_etag(g.data_etag)
+        if g.data_last_modified is not None:
+            response.last_modified = g.data_last_modified
+        response.cache_control.no_cache = True
+    return response
 
 @app.route('/')
 def index():
@@ -355,163 +617,29 @@ def get_overview():
     
     This endpoint does NOT auto-refresh - use for overview cards only.
     """
-    period = request.args.get('period', 'today')
-    bank_account = request.args.get('bank_account', '')
-    region = request.args.get('region', '')
-    company_code_filter = request.args.get('company_code', '')
     automation_type = request.args.get('automation_type', 'PACO')
-    
-    # Region to company codes mapping (frontend REGION_MAP)
-    REGION_MAP = {
-        'Iberia': ['0040', '0041'],
-        'France': ['0043'],
-        'NDX': ['0019', '0022', '0023', '0024'],
-        'UK': ['0014'],
-        'BNX': ['0012', '0018'],
-        'GerAus': ['0010', '0033'],
-        'PLN': ['0023']
-    }
-    
-    # Parse bank account filter
-    company_code, housebank, currency = '', '', ''
-    if bank_account:
-        parts = bank_account.split('|')
-        if len(parts) == 3:
-            company_code, housebank, currency = parts
-    
-    # Calculate date range
-    # Note: "Today" shows current day's live data from network path
-    today = date.today()
-    yesterday = today - timedelta(days=1)
-    
-    if period == 'today':
-        # Today = only live data (no historical data)
-        start_date = today
-        end_date = today - timedelta(days=1)  # No historical data for "today"
-    elif period == 'week':
-        start_date = today - timedelta(days=7)
-        end_date = yesterday  # Exclude today (it's live)
-    elif period == 'month':
-        start_date = today - timedelta(days=30)
-        end_date = yesterday
-    elif period == 'quarter':
-        start_date = today - timedelta(days=90)
-        end_date = yesterday
-    else:
-        start_date = today
-        end_date = today - timedelta(days=1)
-    
-    # Initialize totals
-    total_payments = 0
-    total_received = 0
-    automated_count = 0
-    assigned_to_account = 0
-    total_invoices_assigned = 0
-    total_assigned_value = 0
-    processing_times = []
-    
-    # Load historical data (if not today-only)
-    if period != 'today':
-        df = load_historical_data()
-        if not df.empty:
-            # Convert company_code to string for consistent filtering
-            df['company_code'] = df['company_code'].apply(lambda x: str(x).zfill(4) if str(x).isdigit() else str(x))
-            
-            # Filter by date range
-            mask = (df['date'] >= start_date) & (df['date'] <= end_date)
-            
-            # Apply bank account filter (most specific - overrides everything)
-            if bank_account:
-                mask &= (df['company_code'] == company_code) & \
-                        (df['housebank'] == housebank) & \
-                        (df['currency'] == currency)
-            else:
-                # Apply region filter (if set)
-                if region and region in REGION_MAP:
-                    mask &= df['company_code'].isin(REGION_MAP[region])
-                # Apply company code filter (can combine with region)
-                if company_code_filter:
-                    mask &= (df['company_code'] == company_code_filter)
-            
-            filtered_df = df[mask]
-            
-            # Aggregate metrics (use EUR-converted amounts for totals)
-            total_payments += filtered_df['total_payments'].sum()
-            total_received += filtered_df['total_received_eur'].sum()  # EUR amounts
-            automated_count += filtered_df['automated_count'].sum()
-            assigned_to_account += filtered_df['assigned_to_account'].sum()
-            total_invoices_assigned += filtered_df['invoices_assigned'].sum()
-            total_assigned_value += filtered_df['value_assigned_eur'].sum()  # EUR amounts
-            
-            # Collect processing times from historical data
-            if 'processing_minutes' in filtered_df.columns:
-                processing_times.extend(filtered_df['processing_minutes'].dropna().tolist())
-    
-    # Add today's live data and collect processing times
-    live_records = get_live_data(automation_type)
-    
-    for record in live_records:
-        record_company_code = record['company_code']
-        
-        # Apply filters (most specific first)
-        if bank_account:
-            # Filter by specific bank account (overrides everything)
-            if not (record_company_code == company_code and 
-                    record['housebank'] == housebank and 
-                    record['currency'] == currency):
-                continue
-        else:
-            # Apply region filter (if set)
-            if region and region in REGION_MAP:
-                if record_company_code not in REGION_MAP[region]:
-                    continue
-            # Apply company code filter (can combine with region)
-            if company_code_filter:
-                if record_company_code != company_code_filter:
-                    continue
-        
-        total_payments += record['total_payments']
-        total_received += record['total_received_eur']  # EUR amounts
-        automated_count += record['automated_count']
-        assigned_to_account += record['assigned_to_account']
-        total_invoices_assigned += record['invoices_assigned']
-        total_assigned_value += record['value_assigned_eur']  # EUR amounts
-        
-        # Collect processing time for average calculation
-        if 'processing_minutes' in record:
-            processing_times.append(record['processing_minutes'])
-    
-    # Calculate percentages
-    automation_percentage = (automated_count / total_payments * 100) if total_payments > 0 else 0
-    assigned_percentage = (assigned_to_account / total_payments * 100) if total_payments > 0 else 0
-    value_assigned_percentage = (total_assigned_value / total_received * 100) if total_received > 0 else 0
-    
-    manual_count = total_payments - automated_count
-    unassigned_count = total_payments - assigned_to_account
-    unassigned_value = total_received - total_assigned_value
-    
-    # Calculate average processing time from live data (8:00 AM to file generation)
-    # This represents the actual automation processing time
-    avg_auto_time_minutes = sum(processing_times) / len(processing_times) if processing_times else 0.0
-    avg_manual_time_minutes = 45.0  # Manual processing estimate
-    
-    return jsonify({
-        'period': period,
-        'total_payments': int(total_payments),
-        'total_received': float(total_received),
-        'automation_percentage': round(automation_percentage, 1),
-        'automated_count': int(automated_count),
-        'manual_count': int(manual_count),
-        'unassigned_count': int(unassigned_count),
-        'unassigned_value': float(unassigned_value),
-        'assigned_percentage': round(assigned_percentage, 1),
-        'assigned_count': int(assigned_to_account),
-        'total_invoices_assigned': int(total_invoices_assigned),
-        'total_assigned_value': float(total_assigned_value),
-        'value_assigned_percentage': round(value_assigned_percentage, 1),
-        'avg_auto_time_minutes': avg_auto_time_minutes,
-        'avg_manual_time_minutes': avg_manual_time_minutes,
-    })
+    return jsonify(build_overview(
+        request.args, get_history_snapshot('paco'), get_live_snapshot(automation_type)
+    ))
+
+def build_overview(args, history, live_snapshot):
+    """Overview section for the given request args, history and live snapshots"""
+    period = args.get('period', 'today')
+    spec = parse_filter_spec(args)
+    
+    # Historical totals come from the PACO cube, today's from the live snapshot
+    # (the "today" period has an empty historical range)
+    metrics = overview_metrics(
+        spec, period, date.today(), get_daily_cube('paco', history), history.version,
+        live_snapshot.records, (live_snapshot.automation_type, live_snapshot.version)
+    )
+    
+    return dict(
+        metrics,
+        period=period,
+        avg_manual_time_minutes=45.0,  # Manual processing estimate
+        live_data_age_seconds=get_snapshot_age_seconds(live_snapshot),
+    )
 
 @app.route('/api/automation-trend')
 def get_automation_trend():
@@ -521,214 +649,37 @@ def get_automation_trend():
     Data Source: Historical data from consolidated DB ONLY (updated daily)
     Does NOT include today's live data - shows completed days only.
     """
-    period = request.args.get('period', 'week')
-    bank_account = request.args.get('bank_account', '')
-    region = request.args.get('region', '')
-    company_code_filter = request.args.get('company_code', '')
-    automation_type = request.args.get('automation_type', 'PACO')
-    
-    # Region to company codes mapping
-    REGION_MAP = {
-        'Iberia': ['0040', '0041'],
-        'France': ['0043'],
-        'NDX': ['0019', '0022', '0023', '0024'],
-        'UK': ['0014'],
-        'BNX': ['0012', '0018'],
-        'GerAus': ['0010', '0033'],
-        'PLN': ['0023']
-    }
-    
-    # Parse bank account filter
-    company_code, housebank, currency = '', '', ''
-    if bank_account:
-        parts = bank_account.split('|')
-        if len(parts) == 3:
-            company_code, housebank, currency = parts
-    
-    # Calculate date range
-    # Note: Charts show historical data only (up to yesterday)
-    today = date.today()
-    yesterday = today - timedelta(days=1)
-    
-    if period == 'week':
-        days = 7
-    elif period == 'month':
-        days = 30
-    elif period == 'quarter':
-        days = 90
-    else:
-        days = 7
-    
-    start_date = yesterday - timedelta(days=days)
-    end_date = yesterday  # Charts show up to yesterday
-    
-    # Load historical data
-    df = load_historical_data()
-    
-    labels = []
-    paco_percentages = []
-    fran_percentages = []
-    payment_counts = []
+    return jsonify(build_automation_trend(
+        request.args, get_history_snapshot('paco'), get_history_snapshot('fran')
+    ))
+
+def build_automation_trend(args, history, fran_history):
+    """Trend chart section for the given request args and PACO/FRAN history snapshots"""
+    period = args.get('period', 'week')
+    spec = parse_filter_spec(args)
     
-    if df.empty:
+    if history.df.empty:
         # Return empty data structure
-        return jsonify({
-            'labels': labels,
-            'paco_percentages': paco_percentages,
-            'fran_percentages': fran_percentages,
-            'payment_counts': payment_counts
-        })
-    
-    # Convert company_code to string for consistent filtering
-    df['company_code'] = df['company_code'].apply(lambda x: str(x).zfill(4) if str(x).isdigit() else str(x))
-    
-    # Filter by date range
-    mask = (df['date'] >= start_date) & (df['date'] <= end_date)
-    
-    # Apply bank account filter (most specific - overrides everything)
-    if bank_account:
-        mask &= (df['company_code'] == company_code) & \
-                (df['housebank'] == housebank) & \
-                (df['currency'] == currency)
-    else:
-        # Apply region filter (if set)
-        if region and region in REGION_MAP:
-            mask &= df['company_code'].isin(REGION_MAP[region])
-        # Apply company code filter (can combine with region)
-        if company_code_filter:
-            mask &= (df['company_code'] == company_code_filter)
-    
-    filtered_paco_df = df[mask]
-    
-    # Load and filter FRAN data
-    fran_df = load_fran_historical_data()
-    fran_filtered_df = pd.DataFrame()
-    
-    if not fran_df.empty:
-        # Convert company_code to string for consistent filtering
-        fran_df['company_code'] = fran_df['company_code'].apply(lambda x: str(x).zfill(4) if str(x).isdigit() else str(x))
-        
-        # Apply same filters to FRAN data
-        fran_mask = (fran_df['date'] >= start_date) & (fran_df['date'] <= end_date)
-        
-        if bank_account:
-            fran_mask &= (fran_df['company_code'] == company_code) & \
-                        (fran_df['housebank'] == housebank) & \
-                        (fran_df['currency'] == currency)
-        else:
-            if region and region in REGION_MAP:
-                fran_mask &= fran_df['company_code'].isin(REGION_MAP[region])
-            if company_code_filter:
-                fran_mask &= (fran_df['company_code'] == company_code_filter)
-        
-        fran_filtered_df = fran_df[fran_mask]
-    
-    # Group PACO data by date
-    paco_daily = filtered_paco_df.groupby('date').agg({
-        'total_payments': 'sum',
-        'automated_count': 'sum',
-        'assigned_to_account': 'sum',
-        'invoices_assigned': 'sum'
-    }).reset_index()
-    
-    # Group FRAN data by date
-    fran_daily = pd.DataFrame()
-    if not fran_filtered_df.empty:
-        fran_daily = fran_filtered_df.groupby('date').agg({
-            'total_payments': 'sum',
-            'automated_count': 'sum',
-            'assigned_to_account': 'sum',
-            'invoices_assigned': 'sum'
-        }).reset_index()
-    
-    # Create a union of all dates from both systems
-    all_dates = set()
-    if not paco_daily.empty:
-        all_dates.update(paco_daily['date'].tolist())
-    if not fran_daily.empty:
-        all_dates.update(fran_daily['date'].tolist())
-    
-    # Prepare data for all metrics
-    paco_automated = []
-    paco_customers = []
-    paco_invoices = []
-    paco_invoices_count = []  # Actual invoice counts for bar chart
-    paco_payment_counts = []  # PACO payment counts
-    fran_automated = []
-    fran_customers = []
-    fran_invoices = []
-    fran_invoices_count = []  # Actual invoice counts for bar chart
-    fran_payment_counts = []  # FRAN payment counts
-    
-    # Generate labels and data for each date
-    for date_obj in sorted(all_dates):
-        # Format label
-        if period == 'week':
-            label = date_obj.strftime('%a %m/%d')
-        else:
-            label = date_obj.strftime('%m/%d')
-        labels.append(label)
-        
-        # Get PACO data for this date
-        paco_row = paco_daily[paco_daily['date'] == date_obj]
-        if not paco_row.empty:
-            paco_total = paco_row['total_payments'].iloc[0]
-            paco_auto = paco_row['automated_count'].iloc[0]
-            paco_cust = paco_row['assigned_to_account'].iloc[0]
-            paco_inv = paco_row['invoices_assigned'].iloc[0]
-            
-            paco_automated.append(round((paco_auto / paco_total * 100) if paco_total > 0 else 0, 1))
-            paco_customers.append(round((paco_cust / paco_total * 100) if paco_total > 0 else 0, 1))
-            paco_invoices.append(round((paco_inv / paco_total * 100) if paco_total > 0 else 0, 1))
-            paco_invoices_count.append(int(paco_inv))
-            paco_payment_counts.append(int(paco_total))
-        else:
-            paco_automated.append(0)
-            paco_customers.append(0)
-            paco_invoices.append(0)
-            paco_invoices_count.append(0)
-            paco_payment_counts.append(0)
-        
-        # Get FRAN data for this date
-        fran_row = fran_daily[fran_daily['date'] == date_obj] if not fran_daily.empty else pd.DataFrame()
-        if not fran_row.empty:
-            fran_total = fran_row['total_payments'].iloc[0]
-            fran_auto = fran_row['automated_count'].iloc[0]
-            fran_cust = fran_row['assigned_to_account'].iloc[0]
-            fran_inv = fran_row['invoices_assigned'].iloc[0]
-            
-            fran_automated.append(round((fran_auto / fran_total * 100) if fran_total > 0 else 0, 1))
-            fran_customers.append(round((fran_cust / fran_total * 100) if fran_total > 0 else 0, 1))
-            fran_invoices.append(round((fran_inv / fran_total * 100) if fran_total > 0 else 0, 1))
-            fran_invoices_count.append(int(fran_inv))
-            fran_payment_counts.append(int(fran_total))
-        else:
-            fran_automated.append(0)
-            fran_customers.append(0)
-            fran_invoices.append(0)
-            fran_invoices_count.append(0)
-            fran_payment_counts.append(0)
-    
-    # Note: payment_counts kept for backward compatibility but deprecated
-    # Use paco_payment_counts and fran_payment_counts instead
-    payment_counts = paco_payment_counts  # Use PACO as reference since they're the same payments
+        return {
+            'labels': [],
+            'paco_percentages': [],
+            'fran_percentages': [],
+            'payment_counts': []
+        }
     
-    return jsonify({
-        'labels': labels,
-        'paco_percentages': paco_automated,  # Legacy field for backward compatibility
-        'fran_percentages': fran_automated,  # Legacy field for backward compatibility
-        'paco_automated': paco_automated,
-        'paco_customers': paco_customers,
-        'paco_invoices': paco_invoices,
-        'paco_invoices_count': paco_invoices_count,
-        'paco_payment_counts': paco_payment_counts,
-        'fran_automated': fran_automated,
-        'fran_customers': fran_customers,
-        'fran_invoices': fran_invoices,
-        'fran_invoices_count': fran_invoices_count,
-        'fran_payment_counts': fran_payment_counts,
-        'payment_counts': payment_counts  # Deprecated - use paco_payment_counts/fran_payment_counts
-    })
+    # Daily series for the filtered slice, straight from the aggregate cubes
+    # Note: Charts show historical data only (up to yesterday)
+    trend = automation_trend(
+        spec, period, date.today(), get_daily_cube('paco', history), get_daily_cube('fran', fran_history),
+        (history.version, fran_history.version)
+    )
+    
+    return dict(
+        trend,
+        paco_percentages=trend['paco_automated'],  # Legacy field for backward compatibility
+        fran_percentages=trend['fran_automated'],  # Legacy field for backward compatibility
+        payment_counts=trend['paco_payment_counts']  # Deprecated - use paco_payment_counts/fran_payment_counts
+    )
 
 @app.route('/api/company-status')
 def get_company_status():
@@ -741,37 +692,29 @@ def get_company_status():
     - During Processing: Shows live progress from output files (In Process)
     - After Processing: Shows completion status (Done)
     
-    Auto-refreshes every 5 minutes on dashboard.
+    Updated on the dashboard from /api/status-stream deltas.
     Always displays all known bank account configurations.
     """
     automation_type = request.args.get('automation_type', 'PACO')
-    
-    # Get all unique bank account configurations from historical data
-    df = load_historical_data()
+    return jsonify(build_company_status(get_history_snapshot('paco'), get_live_snapshot(automation_type)))
+
+def build_company_status(history, live_snapshot):
+    """Company status section from the PACO history and a live snapshot"""
+    # Most recent historical record for every known bank account
     bank_accounts = {}
-    
-    if not df.empty:
-        # Get most recent data for each bank account from historical DB
-        for _, row in df.sort_values('date', ascending=False).iterrows():
-            # Keep company_code with leading zeros (e.g., 0010)
-            company_code = str(row['company_code']).zfill(4) if str(row['company_code']).isdigit() else str(row['company_code'])
-            housebank = str(row['housebank'])
-            currency = str(row['currency'])
-            key = (company_code, housebank, currency)
-            if key not in bank_accounts:
-                bank_accounts[key] = {
-                    'company_code': company_code,
-                    'housebank': housebank,
-                    'currency': currency,
-                    'total_payments': int(row['total_payments']),
-                    'automated_count': int(row['automated_count']),
-                    'date': row['date'],
-                    'is_live': False
-                }
+    for key, record in get_latest_accounts(history).items():
+        bank_accounts[key] = {
+            'company_code': record['company_code'],
+            'housebank': record['housebank'],
+            'currency': record['currency'],
+            'total_payments': int(record['total_payments']),
+            'automated_count': int(record['automated_count']),
+            'date': record['date'],
+            'is_live': False
+        }
     
     # Get live data from today and override historical data if available
-    live_records = get_live_data(automation_type)
-    for record in live_records:
+    for record in live_snapshot.records:
         key = (record['company_code'], record['housebank'], record['currency'])
         is_raw = record.get('is_raw', False)
         bank_accounts[key] = {
@@ -859,245 +802,363 @@ def get_company_status():
     # Sort by company code
     bank_account_status_list.sort(key=lambda x: (x['company_code'], x['housebank'], x['currency']))
     
-    return jsonify({
-        'company_statuses': bank_account_status_list
-    })
+    return {
+        'company_statuses': bank_account_status_list,
+        'live_data_age_seconds': get_snapshot_age_seconds(live_snapshot)
+    }
 
 @app.route('/api/recent-transactions')
 def get_recent_transactions():
     """
-    Get recent transactions from today's processing.
+    Get recent transactions from today's processing, newest first.
     
     Data Source: TODAY's live data ONLY (from processed output files)
-    Shows last 10 transactions across all bank accounts.
-    Auto-refreshes every 5 minutes on dashboard.
+    Query params: cursor (next_cursor of the previous page), limit,
+    bank_account (CCCC|HHHH|CUR), match (YES/NO), min_amount, max_amount
+    Reloaded on the dashboard whenever a status delta arrives.
     """
     automation_type = request.args.get('automation_type', 'PACO')
+    try:
+        return jsonify(build_recent_transactions(get_live_snapshot(automation_type), request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+def build_recent_transactions(live_snapshot, args=None):
+    """
+    Recent transactions section from a live snapshot: one page of the feed
+    merged across the per-file transaction indexes (raw count records have none).
+    Raises ValueError for malformed paging/filter parameters.
+    """
+    args = args or {}
+    account = None
+    if args.get('bank_account'):
+        parts = args['bank_account'].split('|')
+        if len(parts) != 3:
+            raise ValueError("bank_account must be CCCC|HHHH|CUR")
+        account = tuple(parts)
+    min_amount = args.get('min_amount')
+    max_amount = args.get('max_amount')
+    
+    indexes = [record['transactions'] for record in live_snapshot.records if 'transactions' in record]
+    page = feed_page(
+        indexes,
+        cursor=args.get('cursor') or None,
+        limit=int(args.get('limit', FEED_PAGE_SIZE)),
+        account=account,
+        match=args.get('match') or None,
+        min_amount=float(min_amount) if min_amount else None,
+        max_amount=float(max_amount) if max_amount else None
+    )
+    
+    return {
+        'transactions': page['transactions'],
+        'next_cursor': page['next_cursor'],
+        'live_data_age_seconds': get_snapshot_age_seconds(live_snapshot)
+    }
+
+@app.route('/api/status-stream')
+def status_stream():
+    """
+    Server-sent event stream of company status changes.
     
-    # Get live data
-    live_records = get_live_data(automation_type)
-    
-    # Collect all transactions
-    all_transactions = []
-    for record in live_records:
-        all_transactions.extend(record['transactions'])
+    Each `status` event carries only the bank accounts whose status changed
+    (`changed`) or disappeared (`removed`) since the previous refresh. A
+    reconnecting client resumes from its Last-Event-ID; if that event has
+    already been dropped from the backlog it gets a `reset` event and should
+    reload the full grid from /api/company-status.
+    """
+    automation_type = request.args.get('automation_type', 'PACO')
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
     
-    # Sort by most recent and limit to 10
-    all_transactions = sorted(all_transactions, key=lambda x: x.get('payment_date', ''), reverse=True)[:10]
+    def events():
+        with status_condition:
+            current_id = status_event_id
+            oldest_id = status_events[0][0] if status_events else current_id + 1
+        last_id = current_id if last_event_id is None else last_event_id
+        
+        yield f"retry: {STATUS_STREAM_KEEPALIVE_SECONDS * 1000}\n\n"
+        if last_id > current_id or last_id < oldest_id - 1:
+            # Missed deltas are gone (or the server restarted) - the client must reload the grid
+            yield f"id: {current_id}\nevent: reset\ndata: {{}}\n\n"
+            last_id = current_id
+        
+        while True:
+            with status_condition:
+                if status_event_id <= last_id:
+                    status_condition.wait(STATUS_STREAM_KEEPALIVE_SECONDS)
+                pending = [event for event in status_events if event[0] > last_id]
+            
+            if not pending:
+                yield ": keepalive\n\n"
+                continue
+            
+            for event_id, event_type, delta in pending:
+                last_id = event_id
+                if event_type == automation_type:
+                    yield f"id: {event_id}\nevent: status\ndata: {json.dumps(delta, default=str)}\n\n"
     
-    return jsonify({
-        'transactions': all_transactions
-    })
+    return app.response_class(events(), mimetype='text/event-stream',
+                              headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/filter-options')
 def get_filter_options():
     """Get unique bank account configurations for filters"""
-    bank_accounts = set()
-    
-    # Get from historical data
-    df = load_historical_data()
-    if not df.empty:
-        for _, row in df.iterrows():
-            # Keep company_code with leading zeros (e.g., 0010)
-            company_code = str(row['company_code']).zfill(4) if str(row['company_code']).isdigit() else str(row['company_code'])
-            bank_account = (company_code, str(row['housebank']), str(row['currency']))
-            bank_accounts.add(bank_account)
-    
-    # Get from live data
-    live_records = get_live_data('PACO')
-    for record in live_records:
-        bank_account = (record['company_code'], record['housebank'], record['currency'])
-        bank_accounts.add(bank_account)
-    
-    # Format for display - sort by converting to strings
+    return jsonify(build_filter_options())
+
+def build_filter_options():
+    """Filter options section from the bank-account dimension table"""
+    dimensions, live_snapshot = get_account_dimensions()
+    
+    # Format for display (dimensions are already sorted)
     bank_accounts_list = [
         {
             'value': f"{cc}|{hb}|{cur}",
-            'label': f"{cc} - {hb} - {cur}"
+            'label': f"{cc} - {hb} - {cur}",
+            'regions': account['regions'],
+            'first_seen': account['first_seen'].isoformat(),
+            'last_seen': account['last_seen'].isoformat()
         }
-        for cc, hb, cur in sorted(bank_accounts, key=lambda x: (str(x[0]), str(x[1]), str(x[2])))
+        for (cc, hb, cur), account in dimensions.accounts.items()
     ]
     
+    return {
+        'bank_accounts': bank_accounts_list,
+        'live_data_age_seconds': get_snapshot_age_seconds(live_snapshot)
+    }
+
+@app.route('/api/dashboard')
+def get_dashboard():
+    """
+    Get every dashboard section in one response (initial page load).
+    
+    Takes the same parameters as the individual endpoints; `period` drives the
+    overview cards and `chart_period` (default: period) the trend chart.
+    The history and live snapshots are read once and shared by all sections.
+    """
+    automation_type = request.args.get('automation_type', 'PACO')
+    history = get_history_snapshot('paco')
+    fran_history = get_history_snapshot('fran')
+    live_snapshot = get_live_snapshot(automation_type)
+    
+    chart_args = request.args.to_dict()
+    chart_args['period'] = request.args.get('chart_period', request.args.get('period', 'week'))
+    
     return jsonify({
-        'bank_accounts': bank_accounts_list
+        'overview': build_overview(request.args, history, live_snapshot),
+        'automation_trend': build_automation_trend(chart_args, history, fran_history),
+        'company_status': build_company_status(history, live_snapshot),
+        'recent_transactions': build_recent_transactions(live_snapshot),
+        'filter_options': build_filter_options(),
+        'live_data_age_seconds': get_snapshot_age_seconds(live_snapshot)
     })
 
 @app.route('/api/customer-exceptions', methods=['GET'])
 def get_customer_exceptions():
     """
-    Get all customer exceptions with optional filters.
-    Query params: company_code, housebank, currency, business_partner, partner_key, partner_ref
+    Get customer exceptions with optional filters, one page at a time.
+    Query params: company_code, housebank, currency (exact), business_partner,
+    partner_key, partner_ref (substring), page (1-based), page_size
     """
-    exceptions = load_customer_exceptions()
-
-    # Apply filters
-    company_code = request.args.get('company_code', '')
-    housebank = request.args.get('housebank', '')
-    currency = request.args.get('currency', '')
-    business_partner = request.args.get('business_partner', '')
-    partner_key = request.args.get('partner_key', '')
-    partner_ref = request.args.get('partner_ref', '')
-
-    filtered_exceptions = exceptions
-
-    if company_code:
-        filtered_exceptions = [e for e in filtered_exceptions if e.get('company_code', '').lower() == company_code.lower()]
-    if housebank:
-        filtered_exceptions = [e for e in filtered_exceptions if e.get('housebank', '').lower() == housebank.lower()]
-    if currency:
-        filtered_exceptions = [e for e in filtered_exceptions if e.get('currency', '').lower() == currency.lower()]
-    if business_partner:
-        filtered_exceptions = [e for e in filtered_exceptions if business_partner.lower() in e.get('business_partner', '').lower()]
-    if partner_key:
-        filtered_exceptions = [e for e in filtered_exceptions if partner_key.lower() in e.get('partner_key', '').lower()]
-    if partner_ref:
-        filtered_exceptions = [e for e in filtered_exceptions if partner_ref.lower() in e.get('partner_ref', '').lower()]
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = min(max(request.args.get('page_size', EXCEPTIONS_PAGE_SIZE, type=int), 1), EXCEPTIONS_MAX_PAGE_SIZE)
+
+    exceptions, total = exception_store.list_exceptions(
+        request.args, limit=page_size, offset=(page - 1) * page_size
+    )
 
     return jsonify({
-        'exceptions': filtered_exceptions,
-        'total': len(filtered_exceptions)
+        'exceptions': exceptions,
+        'total': total,
+        'page': page,
+        'page_size': page_size
     })
 
+@app.route('/api/customer-exceptions/<int:exception_id>', methods=['GET'])
+def get_customer_exception(exception_id):
+    """Get one customer exception"""
+    exception = exception_store.get_exception(exception_id)
+    if exception is None:
+        return jsonify({'error': 'Exception not found'}), 404
+    return jsonify(exception)
+
 @app.route('/api/customer-exceptions', methods=['POST'])
 def create_customer_exception():
     """Create a new customer exception"""
     data = request.get_json()
 
-    # Validate required fields
-    required_fields = ['company_code', 'housebank', 'currency', 'business_partner', 'exception_type']
-    for field in required_fields:
-        if not data.get(field):
-            return jsonify({'error': f'Missing required field: {field}'}), 400
-
-    # Validate exception_type
-    if data['exception_type'] not in ['included', 'excluded']:
-        return jsonify({'error': 'Invalid exception_type. Must be "included" or "excluded"'}), 400
-
-    exceptions = load_customer_exceptions()
-
-    # Generate new ID
-    max_id = max([e.get('id', 0) for e in exceptions], default=0)
-    new_exception = {
-        'id': max_id + 1,
-        'company_code': data['company_code'],
-        'housebank': data['housebank'],
-        'currency': data['currency'],
-        'business_partner': data['business_partner'],
-        'partner_key': data.get('partner_key', ''),
-        'partner_ref': data.get('partner_ref', ''),
-        'exception_type': data['exception_type'],
-        'created_at': datetime.now().isoformat(),
-        'updated_at': datetime.now().isoformat()
-    }
-
-    exceptions.append(new_exception)
+    error = exception_store.validate(data)
+    if error:
+        return jsonify({'error': error}), 400
 
-    if save_customer_exceptions(exceptions):
-        return jsonify(new_exception), 201
-    else:
+    try:
+        new_exception = exception_store.create_exception(data)
+    except Exception as e:
+        print(f"Error saving customer exception: {str(e)}")
         return jsonify({'error': 'Failed to save exception'}), 500
+    return jsonify(new_exception), 201
 
 @app.route('/api/customer-exceptions/<int:exception_id>', methods=['PUT'])
 def update_customer_exception(exception_id):
     """Update an existing customer exception"""
     data = request.get_json()
-    exceptions = load_customer_exceptions()
-
-    # Find exception by ID
-    exception_index = None
-    for i, e in enumerate(exceptions):
-        if e.get('id') == exception_id:
-            exception_index = i
-            break
 
-    if exception_index is None:
-        return jsonify({'error': 'Exception not found'}), 404
+    error = exception_store.validate(data, partial=True)
+    if error:
+        return jsonify({'error': error}), 400
 
-    # Validate exception_type if provided
-    if 'exception_type' in data and data['exception_type'] not in ['included', 'excluded']:
-        return jsonify({'error': 'Invalid exception_type. Must be "included" or "excluded"'}), 400
-
-    # Update exception
-    exception = exceptions[exception_index]
-    exception['company_code'] = data.get('company_code', exception['company_code'])
-    exception['housebank'] = data.get('housebank', exception['housebank'])
-    exception['currency'] = data.get('currency', exception['currency'])
-    exception['business_partner'] = data.get('business_partner', exception['business_partner'])
-    exception['partner_key'] = data.get('partner_key', exception.get('partner_key', ''))
-    exception['partner_ref'] = data.get('partner_ref', exception.get('partner_ref', ''))
-    exception['exception_type'] = data.get('exception_type', exception['exception_type'])
-    exception['updated_at'] = datetime.now().isoformat()
-
-    exceptions[exception_index] = exception
-
-    if save_customer_exceptions(exceptions):
-        return jsonify(exception)
-    else:
+    try:
+        exception = exception_store.update_exception(exception_id, data)
+    except Exception as e:
+        print(f"Error updating customer exception: {str(e)}")
         return jsonify({'error': 'Failed to update exception'}), 500
+    if exception is None:
+        return jsonify({'error': 'Exception not found'}), 404
+    return jsonify(exception)
 
 @app.route('/api/customer-exceptions/<int:exception_id>', methods=['DELETE'])
 def delete_customer_exception(exception_id):
     """Delete a customer exception"""
-    exceptions = load_customer_exceptions()
-
-    # Find and remove exception
-    exception_index = None
-    for i, e in enumerate(exceptions):
-        if e.get('id') == exception_id:
-            exception_index = i
-            break
-
-    if exception_index is None:
+    try:
+        deleted_exception = exception_store.delete_exception(exception_id)
+    except Exception as e:
+        print(f"Error deleting customer exception: {str(e)}")
+        return jsonify({'error': 'Failed to delete exception'}), 500
+    if deleted_exception is None:
         return jsonify({'error': 'Exception not found'}), 404
+    return jsonify({'message': 'Exception deleted', 'exception': deleted_exception})
 
-    deleted_exception = exceptions.pop(exception_index)
+def read_bulk_rows():
+    """
+    Exception rows of a bulk import request: a JSON list (or {"exceptions": [...]}),
+    a text/csv body or an uploaded CSV/JSON 'file'. Raises ValueError if unreadable.
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+        is_csv = not (upload.filename or '').lower().endswith('.json')
+    else:
+        text = request.get_data(as_text=True)
+        is_csv = request.mimetype in ('text/csv', 'text/plain')
 
-    if save_customer_exceptions(exceptions):
-        return jsonify({'message': 'Exception deleted', 'exception': deleted_exception})
+    if is_csv:
+        rows = exception_store.read_csv_rows(text)
     else:
-        return jsonify({'error': 'Failed to delete exception'}), 500
+        try:
+            rows = json.loads(text.lstrip('\ufeff'))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {str(e)}")
+        if isinstance(rows, dict):
+            rows = rows.get('exceptions')
+    if not isinstance(rows, list):
+        raise ValueError('Expected a list of exceptions')
+    return rows
+
+@app.route('/api/customer-exceptions/bulk', methods=['POST'])
+def bulk_import_customer_exceptions():
+    """
+    Create or update many customer exceptions at once (CSV or JSON, see read_bulk_rows).
+    All rows are validated first; if any is invalid nothing is written and the
+    per-row errors are returned. Otherwise the batch is upserted in one
+    transaction and the per-row results (created/updated, id) are returned.
+    """
+    try:
+        rows = read_bulk_rows()
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': str(e)}), 400
+    if len(rows) > EXCEPTIONS_BULK_MAX_ROWS:
+        return jsonify({'error': f"Too many rows ({len(rows)}), at most {EXCEPTIONS_BULK_MAX_ROWS} per import"}), 400
+
+    errors = [
+        {'row': position, 'error': error}
+        for position, error in enumerate(exception_store.validate_batch(rows)) if error
+    ]
+    if errors:
+        return jsonify({'error': f"{len(errors)} invalid row(s), nothing imported", 'errors': errors}), 400
+
+    try:
+        results = exception_store.upsert_exceptions(rows)
+    except Exception as e:
+        print(f"Error importing customer exceptions: {str(e)}")
+        return jsonify({'error': 'Failed to import exceptions'}), 500
+
+    return jsonify({
+        'created': sum(1 for result in results if result['status'] == 'created'),
+        'updated': sum(1 for result in results if result['status'] == 'updated'),
+        'results': results
+    })
+
+@app.route('/api/customer-exceptions/export')
+def export_customer_exceptions():
+    """
+    Download the customer exceptions matching the filters (same query params as
+    the list endpoint) as CSV (default) or JSON (?format=json), streamed in ID order.
+    """
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in ('csv', 'json'):
+        return jsonify({'error': f"Unsupported format: {export_format}"}), 400
+    filters = request.args.to_dict()
+    filename = f"customer_exceptions_{date.today().strftime('%Y%m%d')}.{export_format}"
+
+    def csv_lines():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=exception_store.FIELDS)
+        writer.writeheader()
+        for batch in exception_store.iter_exceptions(filters):
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def json_lines():
+        separator = '['
+        for batch in exception_store.iter_exceptions(filters):
+            yield separator + ',\n'.join(json.dumps(exception) for exception in batch)
+            separator = ',\n'
+        yield '[]' if separator == '[' else ']'
+
+    lines, mimetype = (csv_lines(), 'text/csv') if export_format == 'csv' else (json_lines(), 'application/json')
+    return app.response_class(lines, mimetype=mimetype,
+                              headers={'Content-Disposition': f'attachment; filename="{filename}"'})
 
 @app.route('/api/customer-exceptions/filter-options')
 def get_exception_filter_options():
     """Get unique values for filter dropdowns"""
-    exceptions = load_customer_exceptions()
-
-    # Get unique values from historical data and live data
-    df = load_historical_data()
-    live_records = get_live_data('PACO')
-
-    company_codes = set()
-    housebanks = set()
-    currencies = set()
-
-    # From historical data
-    if not df.empty:
-        df['company_code'] = df['company_code'].apply(lambda x: str(x).zfill(4) if str(x).isdigit() else str(x))
-        company_codes.update(df['company_code'].unique().tolist())
-        housebanks.update(df['housebank'].unique().tolist())
-        currencies.update(df['currency'].unique().tolist())
-
-    # From live data
-    for record in live_records:
-        company_codes.add(record['company_code'])
-        housebanks.add(record['housebank'])
-        currencies.add(record['currency'])
-
-    # From existing exceptions
-    for exc in exceptions:
-        if exc.get('company_code'):
-            company_codes.add(exc['company_code'])
-        if exc.get('housebank'):
-            housebanks.add(exc['housebank'])
-        if exc.get('currency'):
-            currencies.add(exc['currency'])
+    # Known values from historical and live data
+    dimensions, live_snapshot = get_account_dimensions()
+    company_codes = set(dimensions.company_codes)
+    housebanks = set(dimensions.housebanks)
+    currencies = set(dimensions.currencies)
+
+    # From existing exceptions (distinct values come straight from the indexes)
+    company_codes.update(exception_store.distinct_values('company_code'))
+    housebanks.update(exception_store.distinct_values('housebank'))
+    currencies.update(exception_store.distinct_values('currency'))
 
     return jsonify({
         'company_codes': sorted(list(company_codes)),
         'housebanks': sorted(list(housebanks)),
-        'currencies': sorted(list(currencies))
+        'currencies': sorted(list(currencies)),
+        'live_data_age_seconds': get_snapshot_age_seconds(live_snapshot)
     })
 
+@app.route('/api/history/export')
+def export_history():
+    """Download the consolidated history as an Excel workbook (on demand)"""
+    automation_type = request.args.get('automation_type', 'PACO')
+    source = 'fran' if automation_type == 'FRAN' else 'paco'
+    
+    df = get_history_store(source).load().sort_values(['date', 'company_code', 'housebank', 'currency'])
+    
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False, engine='openpyxl')
+    buffer.seek(0)
+    
+    return send_file(buffer, as_attachment=True,
+                     download_name=f"{source}_consolidated_{date.today().strftime('%Y%m%d')}.xlsx",
+                     mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
@@ -1106,8 +1167,12 @@ def health():
         'timestamp': datetime.now().isoformat(),
         'service': 'CashWeb',
         'data_sources': {
-            'historical_db': os.path.exists(CONSOLIDATED_DB_PATH),
+            'historical_db': get_history_store('paco').exists(),
             'paco_network': os.path.exists(PACO_NETWORK_PATH)
+        },
+        'live_data_age_seconds': {
+            automation_type: get_snapshot_age_seconds(get_live_snapshot(automation_type))
+            for automation_type in AUTOMATION_TYPES
         }
     })
 
@@ -1,15 +1,17 @@
 """
 Consolidate Daily Data Script
-Collects today's PACO output files and adds them to the consolidated database.
+Collects today's PACO output files and adds them to the consolidated history store.
 Checks for existing records and replaces them if they already exist.
 """
 import os
 import pandas as pd
 from datetime import datetime, date, timedelta
-from currency_converter import convert_to_eur
+from history_store import get_history_store, HISTORY_DB_PATH
+from dir_scanner import files
+from payment_metrics import AccountFrame, batch_metrics
+from workbook_reader import read_workbook, METRIC_COLUMNS
 
 # Configuration
-CONSOLIDATED_DB_PATH = "data/paco_consolidated.xlsx"
 PACO_OUTPUT_PATH = r"\\emea\central\SSC_GROUP\BPA\30_Automations\90_CashOps\02_Posting Cash\03_Output\2025"
 
 def parse_filename(filename):
@@ -25,21 +27,11 @@ def parse_filename(filename):
     
     return None, None, None
 
-def count_invoices(docnumbers_str):
-    """Count invoices from DocNumbers column (separated by ;)"""
-    if pd.isna(docnumbers_str) or docnumbers_str == '':
-        return 0
-    invoices = [inv.strip() for inv in str(docnumbers_str).split(';') if inv.strip()]
-    return len(invoices)
-
-def process_output_file(filepath, data_date):
-    """Process a single PACO output file and extract metrics."""
+def load_output_file(filepath):
+    """Read one PACO output file as an AccountFrame (None if it can't be used)."""
     try:
         print(f"  Processing: {os.path.basename(filepath)}")
         
-        df = pd.read_excel(filepath, engine='openpyxl')
-        df.columns = df.columns.str.strip()
-        
         filename = os.path.basename(filepath)
         company_code, housebank, currency = parse_filename(filename)
         
@@ -50,71 +42,35 @@ def process_output_file(filepath, data_date):
         # Normalize company code (remove leading zeros)
         company_code = str(int(company_code))
         
-        # Determine which DocNumbers column to use
-        docnumbers_col = None
-        if 'DocNumbers' in df.columns:
-            docnumbers_col = 'DocNumbers'
-        elif 'Docnumbers' in df.columns:
-            docnumbers_col = 'Docnumbers'
-        
-        # Calculate metrics
-        total_payments = len(df)
-        total_received = df['Amount'].sum() if 'Amount' in df.columns else 0
-        
-        # Automated count: Match == "Yes" (case insensitive) AND has invoices
-        automated_count = 0
-        if 'Match' in df.columns and docnumbers_col:
-            automated_mask = (df['Match'].str.upper() == 'YES') & (df[docnumbers_col].notna()) & (df[docnumbers_col] != '')
-            automated_count = len(df[automated_mask])
+        # Only the metric columns are read (headers are stripped)
+        df = read_workbook(filepath, METRIC_COLUMNS)
         
-        assigned_to_account = len(df[df['Business_Partner'].notna()]) if 'Business_Partner' in df.columns else 0
-        
-        invoices_assigned = 0
-        if docnumbers_col:
-            invoices_assigned = df[docnumbers_col].apply(count_invoices).sum()
-        
-        # Value assigned: Amount for rows where Match == "Yes" AND has invoices
-        value_assigned = 0
-        if 'Match' in df.columns and 'Amount' in df.columns and docnumbers_col:
-            value_mask = (df['Match'].str.upper() == 'YES') & (df[docnumbers_col].notna()) & (df[docnumbers_col] != '')
-            value_assigned = df[value_mask]['Amount'].sum()
-        
-        # Convert amounts to EUR
-        total_received_eur = convert_to_eur(total_received, currency)
-        value_assigned_eur = convert_to_eur(value_assigned, currency)
-        
-        # Get file timestamp for processing time calculation
         file_timestamp = datetime.fromtimestamp(os.path.getmtime(filepath))
-        start_of_day = datetime.combine(file_timestamp.date(), datetime.strptime('08:00', '%H:%M').time())
-        processing_minutes = int((file_timestamp - start_of_day).total_seconds() / 60)
-        
-        # Data date comes from the parent function's target_date - 1 day
-        # (Will be set by caller)
-        
-        record = {
-            'date': data_date,
-            'company_code': company_code,
-            'housebank': housebank,
-            'currency': currency,
-            'total_payments': total_payments,
-            'total_received': total_received,
-            'total_received_eur': total_received_eur,
-            'automated_count': automated_count,
-            'assigned_to_account': assigned_to_account,
-            'invoices_assigned': invoices_assigned,
-            'value_assigned': value_assigned,
-            'value_assigned_eur': value_assigned_eur,
-            'file_timestamp': file_timestamp,
-            'processing_minutes': processing_minutes
-        }
-        
-        print(f"  OK: {company_code}_{housebank}_{currency}: {total_payments} payments, {automated_count} automated ({(automated_count/total_payments*100):.1f}%)")
-        return record
+        return AccountFrame(company_code, housebank, currency, file_timestamp, df)
         
     except Exception as e:
         print(f"  ERROR: Error processing {os.path.basename(filepath)}: {str(e)}")
         return None
 
+def output_records(account_frames, data_date):
+    """Metrics records for a day's output files, computed in one batch pass."""
+    records = []
+    for record in batch_metrics(account_frames, rate_date=data_date):
+        record = {'date': data_date, **record}
+        total_payments = record['total_payments']
+        automated_count = record['automated_count']
+        automated_rate = automated_count / total_payments * 100 if total_payments else 0
+        print(f"  OK: {record['company_code']}_{record['housebank']}_{record['currency']}: {total_payments} payments, {automated_count} automated ({automated_rate:.1f}%)")
+        records.append(record)
+    return records
+
+def process_output_file(filepath, data_date):
+    """Process a single PACO output file and extract metrics."""
+    account_frame = load_output_file(filepath)
+    if account_frame is None:
+        return None
+    return output_records([account_frame], data_date)[0]
+
 def consolidate_today_data(target_date=None):
     """
     Consolidate today's data into the database.
@@ -142,9 +98,7 @@ def consolidate_today_data(target_date=None):
     print(f"Reading from: {output_folder}\n")
     
     # Process all Excel files
-    new_records = []
-    excel_files = [f for f in os.listdir(output_folder) 
-                   if f.endswith('.xlsx') and not f.startswith('~$')]
+    excel_files = [entry.name for entry in files(output_folder, '.xlsx')]
     
     if not excel_files:
         print(f"ERROR: No Excel files found in the output folder.")
@@ -155,11 +109,14 @@ def consolidate_today_data(target_date=None):
     # Calculate data date (yesterday's payments processed today)
     data_date = target_date - timedelta(days=1)
     
+    account_frames = []
     for filename in excel_files:
-        filepath = os.path.join(output_folder, filename)
-        record = process_output_file(filepath, data_date)
-        if record:
-            new_records.append(record)
+        account_frame = load_output_file(os.path.join(output_folder, filename))
+        if account_frame is not None:
+            account_frames.append(account_frame)
+    
+    # All of the day's files are aggregated in one columnar pass
+    new_records = output_records(account_frames, data_date)
     
     if not new_records:
         print(f"\nERROR: No records were successfully processed.")
@@ -169,43 +126,23 @@ def consolidate_today_data(target_date=None):
     print(f"Processed {len(new_records)} bank accounts successfully")
     print(f"{'='*60}\n")
     
-    # Load existing database
-    print(f"Loading consolidated database: {CONSOLIDATED_DB_PATH}")
-    
-    if os.path.exists(CONSOLIDATED_DB_PATH):
-        existing_df = pd.read_excel(CONSOLIDATED_DB_PATH, engine='openpyxl')
-        existing_df['date'] = pd.to_datetime(existing_df['date']).dt.date
-        print(f"   Current records: {len(existing_df)}")
-        
-        # Remove existing records for this date (to replace them)
-        # data_date was already calculated above
-        records_before = len(existing_df)
-        existing_df = existing_df[existing_df['date'] != data_date]
-        records_removed = records_before - len(existing_df)
-        
-        if records_removed > 0:
-            print(f"   WARNING: Removed {records_removed} existing records for {data_date.strftime('%Y-%m-%d')} (will be replaced)")
-    else:
-        print(f"   Creating new database file")
-        existing_df = pd.DataFrame()
-        records_removed = 0
+    # Replace this date's records in the history store
+    store = get_history_store('paco')
+    print(f"Saving to history store: {HISTORY_DB_PATH}")
     
-    # Add new records
     new_df = pd.DataFrame(new_records)
-    combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-    combined_df = combined_df.sort_values(['date', 'company_code', 'housebank', 'currency'])
+    records_removed, total_records = store.replace_date(data_date, new_df)
     
-    # Save to Excel
-    print(f"\nSaving to database...")
-    combined_df.to_excel(CONSOLIDATED_DB_PATH, index=False, engine='openpyxl')
+    if records_removed > 0:
+        print(f"   WARNING: Replaced {records_removed} existing records for {data_date.strftime('%Y-%m-%d')}")
     
     print(f"\n{'='*60}")
     print(f"SUCCESS: CONSOLIDATION COMPLETE")
     print(f"{'='*60}")
     print(f"   Records added: {len(new_records)}")
     print(f"   Records removed: {records_removed}")
-    print(f"   Total records: {len(combined_df)}")
-    print(f"   Database: {CONSOLIDATED_DB_PATH}")
+    print(f"   Total records: {total_records}")
+    print(f"   Database: {HISTORY_DB_PATH}")
     print(f"{'='*60}\n")
     
     return True
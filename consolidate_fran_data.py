@@ -1,16 +1,19 @@
 """
 Consolidate Daily FRAN Data Script
-Collects today's FRAN output files and adds them to the consolidated database.
+Collects today's FRAN output files and adds them to the consolidated history store.
 Checks for existing records and replaces them if they already exist.
 """
 import os
 import pandas as pd
 from datetime import datetime, date, timedelta
-from currency_converter import convert_to_eur
+from history_store import get_history_store, HISTORY_DB_PATH
+from dir_scanner import files
+from payment_metrics import AccountFrame, batch_metrics, merge_records
+from fran_reader import read_fran_csvs, iter_fran_chunks, FRAN_READ_WORKERS
 
 # Configuration
-CONSOLIDATED_DB_PATH = "data/fran_consolidated.xlsx"
 FRAN_OUTPUT_PATH = r"\\emea\central\SSC_GROUP\BPA\30_Automations\90_CashOps\02_Posting Cash\03_Output\2025"
+CHUNKED_READ_BYTES = 256 * 1024 * 1024  # CSVs larger than this are processed in chunks
 
 def parse_filename(filename):
     """Parse FRAN filename to extract company_code, housebank, and currency."""
@@ -26,103 +29,91 @@ def parse_filename(filename):
     
     return None, None, None
 
-def count_invoices(docnumbers_str):
-    """Count invoices from DocNumbers column (FRAN uses comma separator)"""
-    if pd.isna(docnumbers_str) or docnumbers_str == '':
-        return 0
-    # FRAN uses comma (,) as separator instead of semicolon (;)
-    invoices = [inv.strip() for inv in str(docnumbers_str).split(',') if inv.strip()]
-    return len(invoices)
+def parse_output_file(filepath):
+    """(company_code, housebank, currency, file_timestamp) of a FRAN output file, or None."""
+    filename = os.path.basename(filepath)
+    company_code, housebank, currency = parse_filename(filename)
+    
+    if not all([company_code, housebank, currency]):
+        print(f"  WARNING: Could not parse filename: {filename}")
+        return None
+    
+    # Normalize company code (remove leading zeros)
+    company_code = str(int(company_code))
+    
+    file_timestamp = datetime.fromtimestamp(os.path.getmtime(filepath))
+    return company_code, housebank, currency, file_timestamp
+
+def load_output_files(filepaths, workers=FRAN_READ_WORKERS):
+    """
+    Read FRAN CSV output files concurrently as AccountFrames.
+    Files that can't be parsed or read are reported and left out.
+    """
+    accounts = []
+    for filepath in filepaths:
+        print(f"  Processing: {os.path.basename(filepath)}")
+        try:
+            account = parse_output_file(filepath)
+        except Exception as e:
+            print(f"  ERROR: Error processing {os.path.basename(filepath)}: {str(e)}")
+            continue
+        if account:
+            accounts.append((filepath, account))
+    
+    # Typed, column-pruned reads; "2,602.90" amounts are parsed by the CSV parser
+    results = read_fran_csvs([filepath for filepath, _ in accounts], workers=workers)
+    
+    account_frames = []
+    for (filepath, account), (df, error) in zip(accounts, results):
+        if error is not None:
+            print(f"  ERROR: Error processing {os.path.basename(filepath)}: {str(error)}")
+            continue
+        account_frames.append(AccountFrame(*account, df))
+    return account_frames
+
+def print_record(record):
+    """One-line summary of a processed bank account."""
+    total_payments = record['total_payments']
+    automated_count = record['automated_count']
+    automated_rate = automated_count / total_payments * 100 if total_payments else 0
+    print(f"  OK: {record['company_code']}_{record['housebank']}_{record['currency']}: {total_payments} payments, {automated_count} automated ({automated_rate:.1f}%)")
+
+def output_records(account_frames, data_date):
+    """Metrics records for a day's output files, computed in one batch pass."""
+    records = []
+    for record in batch_metrics(account_frames, invoice_separator=',', rate_date=data_date):
+        record = {'date': data_date, **record}
+        print_record(record)
+        records.append(record)
+    return records
 
 def process_output_file(filepath, data_date):
-    """Process a single FRAN CSV output file and extract metrics."""
+    """Process a single FRAN output file and extract metrics."""
+    account_frames = load_output_files([filepath])
+    if not account_frames:
+        return None
+    return output_records(account_frames, data_date)[0]
+
+def process_large_output_file(filepath, data_date):
+    """Process a FRAN output file in FRAN_CHUNK_ROWS chunks, holding one chunk in memory at a time."""
+    print(f"  Processing in chunks: {os.path.basename(filepath)}")
     try:
-        print(f"  Processing: {os.path.basename(filepath)}")
-        
-        # FRAN files are CSV format with comma delimiter
-        # Amount field is quoted with US format: "2,602.90" (comma=thousands, period=decimal)
-        df = pd.read_csv(filepath, sep=',', quotechar='"')
-        df.columns = df.columns.str.strip()
-        
-        # Convert Amount column: remove thousand separators (comma) and convert to float
-        if 'Amount' in df.columns:
-            # Amount is like "2,602.90" - remove commas and convert
-            df['Amount'] = df['Amount'].astype(str).str.replace(',', '').astype(float)
-        
-        filename = os.path.basename(filepath)
-        company_code, housebank, currency = parse_filename(filename)
-        
-        if not all([company_code, housebank, currency]):
-            print(f"  WARNING: Could not parse filename: {filename}")
+        account = parse_output_file(filepath)
+        if account is None:
             return None
-        
-        # Normalize company code (remove leading zeros)
-        company_code = str(int(company_code))
-        
-        # Determine which DocNumbers column to use
-        docnumbers_col = None
-        if 'DocNumbers' in df.columns:
-            docnumbers_col = 'DocNumbers'
-        elif 'Docnumbers' in df.columns:
-            docnumbers_col = 'Docnumbers'
-        
-        # Calculate metrics
-        total_payments = len(df)
-        total_received = df['Amount'].sum() if 'Amount' in df.columns else 0
-        
-        # Automated count: Match == "Yes" (case insensitive) AND has invoices
-        automated_count = 0
-        if 'Match' in df.columns and docnumbers_col:
-            automated_mask = (df['Match'].str.upper() == 'YES') & (df[docnumbers_col].notna()) & (df[docnumbers_col] != '')
-            automated_count = len(df[automated_mask])
-        
-        assigned_to_account = len(df[df['Business_Partner'].notna()]) if 'Business_Partner' in df.columns else 0
-        
-        invoices_assigned = 0
-        if docnumbers_col:
-            invoices_assigned = df[docnumbers_col].apply(count_invoices).sum()
-        
-        # Value assigned: Amount for rows where Match == "Yes" AND has invoices
-        value_assigned = 0
-        if 'Match' in df.columns and 'Amount' in df.columns and docnumbers_col:
-            value_mask = (df['Match'].str.upper() == 'YES') & (df[docnumbers_col].notna()) & (df[docnumbers_col] != '')
-            value_assigned = df[value_mask]['Amount'].sum()
-        
-        # Convert amounts to EUR
-        total_received_eur = convert_to_eur(total_received, currency)
-        value_assigned_eur = convert_to_eur(value_assigned, currency)
-        
-        # Get file timestamp for processing time calculation
-        file_timestamp = datetime.fromtimestamp(os.path.getmtime(filepath))
-        start_of_day = datetime.combine(file_timestamp.date(), datetime.strptime('08:00', '%H:%M').time())
-        processing_minutes = int((file_timestamp - start_of_day).total_seconds() / 60)
-        
-        # Data date comes from the parent function's target_date - 1 day
-        # (Will be set by caller)
-        
-        record = {
-            'date': data_date,
-            'company_code': company_code,
-            'housebank': housebank,
-            'currency': currency,
-            'total_payments': total_payments,
-            'total_received': total_received,
-            'total_received_eur': total_received_eur,
-            'automated_count': automated_count,
-            'assigned_to_account': assigned_to_account,
-            'invoices_assigned': invoices_assigned,
-            'value_assigned': value_assigned,
-            'value_assigned_eur': value_assigned_eur,
-            'file_timestamp': file_timestamp,
-            'processing_minutes': processing_minutes
-        }
-        
-        print(f"  OK: {company_code}_{housebank}_{currency}: {total_payments} payments, {automated_count} automated ({(automated_count/total_payments*100):.1f}%)")
-        return record
-        
+        chunk_records = [
+            batch_metrics([AccountFrame(*account, chunk)], invoice_separator=',', rate_date=data_date)[0]
+            for chunk in iter_fran_chunks(filepath)
+        ]
     except Exception as e:
         print(f"  ERROR: Error processing {os.path.basename(filepath)}: {str(e)}")
         return None
+    if not chunk_records:
+        # Header only: zero counts
+        chunk_records = batch_metrics([AccountFrame(*account, pd.DataFrame())], invoice_separator=',', rate_date=data_date)
+    record = {'date': data_date, **merge_records(chunk_records)}
+    print_record(record)
+    return record
 
 def consolidate_today_data(target_date=None):
     """
@@ -151,9 +142,7 @@ def consolidate_today_data(target_date=None):
     print(f"Reading from: {output_folder}\n")
     
     # Process all CSV files (FRAN uses CSV format)
-    new_records = []
-    csv_files = [f for f in os.listdir(output_folder) 
-                 if f.endswith('.csv') and not f.startswith('~$')]
+    csv_files = files(output_folder, '.csv')
     
     if not csv_files:
         print(f"ERROR: No CSV files found in the FRAN output folder.")
@@ -164,9 +153,14 @@ def consolidate_today_data(target_date=None):
     # Calculate data date (yesterday's payments processed today)
     data_date = target_date - timedelta(days=1)
     
-    for filename in csv_files:
-        filepath = os.path.join(output_folder, filename)
-        record = process_output_file(filepath, data_date)
+    # Regular files are read concurrently and aggregated in one columnar pass;
+    # very large ones are streamed in chunks to keep memory bounded
+    small_files = [entry.path for entry in csv_files if entry.size <= CHUNKED_READ_BYTES]
+    large_files = [entry.path for entry in csv_files if entry.size > CHUNKED_READ_BYTES]
+    
+    new_records = output_records(load_output_files(small_files), data_date)
+    for filepath in large_files:
+        record = process_large_output_file(filepath, data_date)
         if record:
             new_records.append(record)
     
@@ -178,43 +172,23 @@ def consolidate_today_data(target_date=None):
     print(f"Processed {len(new_records)} FRAN bank accounts successfully")
     print(f"{'='*60}\n")
     
-    # Load existing database
-    print(f"Loading FRAN consolidated database: {CONSOLIDATED_DB_PATH}")
-    
-    if os.path.exists(CONSOLIDATED_DB_PATH):
-        existing_df = pd.read_excel(CONSOLIDATED_DB_PATH, engine='openpyxl')
-        existing_df['date'] = pd.to_datetime(existing_df['date']).dt.date
-        print(f"   Current records: {len(existing_df)}")
-        
-        # Remove existing records for this date (to replace them)
-        # data_date was already calculated above
-        records_before = len(existing_df)
-        existing_df = existing_df[existing_df['date'] != data_date]
-        records_removed = records_before - len(existing_df)
-        
-        if records_removed > 0:
-            print(f"   WARNING: Removed {records_removed} existing FRAN records for {data_date.strftime('%Y-%m-%d')} (will be replaced)")
-    else:
-        print(f"   Creating new FRAN database file")
-        existing_df = pd.DataFrame()
-        records_removed = 0
+    # Replace this date's records in the history store
+    store = get_history_store('fran')
+    print(f"Saving to FRAN history store: {HISTORY_DB_PATH}")
     
-    # Add new records
     new_df = pd.DataFrame(new_records)
-    combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-    combined_df = combined_df.sort_values(['date', 'company_code', 'housebank', 'currency'])
+    records_removed, total_records = store.replace_date(data_date, new_df)
     
-    # Save to Excel
-    print(f"\nSaving to database...")
-    combined_df.to_excel(CONSOLIDATED_DB_PATH, index=False, engine='openpyxl')
+    if records_removed > 0:
+        print(f"   WARNING: Replaced {records_removed} existing FRAN records for {data_date.strftime('%Y-%m-%d')}")
     
     print(f"\n{'='*60}")
     print(f"SUCCESS: FRAN CONSOLIDATION COMPLETE")
     print(f"{'='*60}")
     print(f"   Records added: {len(new_records)}")
     print(f"   Records removed: {records_removed}")
-    print(f"   Total records: {len(combined_df)}")
-    print(f"   Database: {CONSOLIDATED_DB_PATH}")
+    print(f"   Total records: {total_records}")
+    print(f"   Database: {HISTORY_DB_PATH}")
     print(f"{'='*60}\n")
     
     return True
@@ -1,11 +1,31 @@
 """
 Currency Converter for PACO/FRAN Data
 Converts all amounts to EUR for consistent reporting
-Exchange rates updated as of November 5, 2025
+
+Rates are date-effective: a rate applies from its date until the next one
+for the same currency. They come from a local ECB reference rates file
+(data/exchange_rates.xml or .csv, as published by the ECB - 1 EUR = X units)
+on top of the static EXCHANGE_RATES below, which apply before the file's
+first date and to currencies the ECB doesn't publish. The table is loaded
+once and reloaded when the file changes.
+
+Usage:
+    from currency_converter import convert_to_eur, convert_series_to_eur
+
+    eur = convert_to_eur(1000, 'USD', date(2025, 11, 5))
+    eur_column = convert_series_to_eur(df['amount'], df['currency'], df['date'])
+
+    python currency_converter.py update   # Download the ECB history into RATES_PATH
 """
+import os
+import threading
+import urllib.request
+import xml.etree.ElementTree as ET
+import numpy as np
+import pandas as pd
 
-# Exchange rates to EUR (1 unit = X EUR)
-# Update these rates as needed
+# Exchange rates to EUR (1 unit = X EUR) as of November 5, 2025
+# Used where the rates file has no rate (before its first date, or not published)
 EXCHANGE_RATES = {
     'EUR': 1.0,              # Base currency
     'USD': 0.92,             # US Dollar
@@ -17,76 +37,226 @@ EXCHANGE_RATES = {
     'NOK': 0.084,            # Norwegian Krone
     'NOK_2': 0.084,          # Norwegian Krone (variant naming)
     'SEK': 0.084,            # Swedish Krona
-    
+
     # Special account codes (assumed EUR-based)
     'OP272': 1.0,            # Operational account (EUR)
     'OP464': 1.0,            # Operational account (EUR)
 }
 
-def convert_to_eur(amount, currency):
+# Account currency codes that are variants of an ISO currency
+CURRENCY_ALIASES = {
+    'GBP2': 'GBP',
+    'NOK_2': 'NOK',
+    'OP272': 'EUR',
+    'OP464': 'EUR',
+}
+
+# Local rates file (ECB format, .xml or .csv) and where update_rates_from_api() gets it
+RATES_PATH = "data/exchange_rates.xml"
+ECB_RATES_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist.xml"
+STATIC_RATES_FROM = pd.Timestamp('1900-01-01').as_unit('ns')  # Effective date of EXCHANGE_RATES
+
+# Loaded rate table and the (path, mtime_ns) it was read from
+rate_table_cache = {'key': None, 'table': None}
+rate_table_lock = threading.Lock()
+warned_currencies = set()
+
+def normalize_currency(currency):
+    """Upper-case currency code with variants mapped to the ISO code"""
+    currency_upper = str(currency).strip().upper()
+    return CURRENCY_ALIASES.get(currency_upper, currency_upper)
+
+def read_ecb_xml(path):
+    """(currency, effective_date, eur_per_unit) rows of an ECB eurofxref XML file"""
+    rows = []
+    day = None
+    for _, element in ET.iterparse(path, events=('start',)):
+        if not element.tag.endswith('Cube'):
+            continue
+        if 'time' in element.attrib:
+            day = element.attrib['time']
+        elif 'currency' in element.attrib and day is not None:
+            rows.append((element.attrib['currency'], day, element.attrib['rate']))
+    return pd.DataFrame(rows, columns=['currency', 'effective_date', 'rate'])
+
+def read_ecb_csv(path):
+    """(currency, effective_date, eur_per_unit) rows of an ECB eurofxref CSV (one column per currency)"""
+    wide = pd.read_csv(path, dtype=str, skipinitialspace=True)
+    wide = wide.loc[:, [column for column in wide.columns if column.strip() and not column.startswith('Unnamed')]]
+    wide.columns = [column.strip() for column in wide.columns]
+    return wide.melt(id_vars='Date', var_name='currency', value_name='rate').rename(columns={'Date': 'effective_date'})
+
+def build_rate_table(path):
+    """
+    Rate table sorted by effective date: currency, effective_date, rate (1 unit = X EUR).
+    Static EXCHANGE_RATES come first; file rates (inverted from 1 EUR = X units) follow.
+    """
+    static = pd.DataFrame({
+        'currency': [code for code in EXCHANGE_RATES if code not in CURRENCY_ALIASES],
+        'effective_date': STATIC_RATES_FROM,
+        'rate': [rate for code, rate in EXCHANGE_RATES.items() if code not in CURRENCY_ALIASES],
+    })
+    tables = [static]
+
+    if path and os.path.exists(path):
+        published = read_ecb_csv(path) if path.lower().endswith('.csv') else read_ecb_xml(path)
+        units_per_eur = pd.to_numeric(published['rate'], errors='coerce')
+        published = pd.DataFrame({
+            'currency': published['currency'].str.strip().str.upper(),
+            'effective_date': pd.to_datetime(published['effective_date'], errors='coerce').astype('datetime64[ns]'),
+            'rate': 1.0 / units_per_eur.where(units_per_eur > 0),
+        }).dropna()
+        tables.append(published)
+
+    # Both parts are datetime64[ns] - concat refuses to mix resolutions
+    table = pd.concat(tables, ignore_index=True)
+    return table.drop_duplicates(['currency', 'effective_date'], keep='last').sort_values('effective_date', ignore_index=True)
+
+def get_rate_table(path=None):
+    """The cached rate table, reloaded when the rates file changes"""
+    path = path or RATES_PATH
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except OSError:
+        key = (path, None)
+    with rate_table_lock:
+        if rate_table_cache['key'] != key:
+            rate_table_cache['table'] = build_rate_table(path if key[1] is not None else None)
+            rate_table_cache['key'] = key
+        return rate_table_cache['table']
+
+def warn_unknown(currencies):
+    """Warn once per process for each currency without any rate"""
+    for currency in set(currencies) - warned_currencies:
+        print(f"Warning: Unknown currency '{currency}', assuming EUR (1.0)")
+        warned_currencies.add(currency)
+
+def eur_rates(currencies, dates=None, path=None):
+    """
+    Rate to EUR (1 unit = X EUR) for each row, in one vectorized lookup.
+
+    Args:
+        currencies: Currency codes (array-like)
+        dates: Date of each row (array-like, missing = latest rate); None for latest rates
+
+    Returns:
+        numpy.ndarray: One rate per row (1.0 for unknown currencies)
+    """
+    table = get_rate_table(path)
+    currencies = pd.Series(currencies, dtype=object).reset_index(drop=True)
+    codes = currencies.map(normalize_currency)
+    if dates is None:
+        when = pd.Series(pd.NaT, index=codes.index, dtype='datetime64[ns]')
+    else:
+        when = pd.Series(pd.to_datetime(pd.Series(dates).reset_index(drop=True), errors='coerce')).astype('datetime64[ns]')
+
+    rows = pd.DataFrame({
+        'currency': codes,
+        'effective_date': when.fillna(pd.Timestamp.max.normalize()),
+        'position': np.arange(len(codes)),
+    }).sort_values('effective_date', kind='stable')
+    matched = pd.merge_asof(rows, table, on='effective_date', by='currency', direction='backward')
+
+    rates = np.empty(len(codes))
+    rates[matched['position'].to_numpy()] = matched['rate'].to_numpy(dtype=float)
+    unknown = np.isnan(rates)
+    if unknown.any():
+        warn_unknown(currencies[unknown].astype(str))
+        rates[unknown] = 1.0
+    return rates
+
+def convert_series_to_eur(amounts, currencies, dates=None, path=None):
+    """
+    Convert a column of amounts to EUR at the rate of each row's date.
+
+    Args:
+        amounts: Amounts in their original currency (Series or array-like)
+        currencies: Currency code of each amount
+        dates: Date of each amount (None for latest rates)
+
+    Returns:
+        Amounts in EUR (a Series with the input's index if amounts is a Series)
+    """
+    rates = eur_rates(currencies, dates, path)
+    values = pd.to_numeric(pd.Series(amounts), errors='coerce').fillna(0.0).to_numpy(dtype=float) * rates
+    if isinstance(amounts, pd.Series):
+        return pd.Series(values, index=amounts.index, name=amounts.name)
+    return values
+
+def convert_to_eur(amount, currency, on_date=None):
     """
     Convert amount from given currency to EUR
-    
+
     Args:
         amount (float): Amount in original currency
         currency (str): Currency code (e.g., 'USD', 'GBP', 'EUR')
-    
+        on_date (date): Date of the rate to apply (None for the latest rate)
+
     Returns:
         float: Amount converted to EUR
     """
     if amount is None or amount == 0:
         return 0.0
-    
-    # Normalize currency code
-    currency_upper = str(currency).strip().upper()
-    
-    # Get exchange rate
-    rate = EXCHANGE_RATES.get(currency_upper, None)
-    
-    if rate is None:
-        print(f"Warning: Unknown currency '{currency}', assuming EUR (1.0)")
-        rate = 1.0
-    
-    return float(amount) * rate
+    return float(amount) * get_exchange_rate(currency, on_date)
 
-def get_exchange_rate(currency):
+def get_exchange_rate(currency, on_date=None):
     """
     Get exchange rate for a currency to EUR
-    
+
     Args:
         currency (str): Currency code
-    
+        on_date (date): Date of the rate (None for the latest rate)
+
     Returns:
         float: Exchange rate (1 unit = X EUR)
     """
-    currency_upper = str(currency).strip().upper()
-    return EXCHANGE_RATES.get(currency_upper, 1.0)
+    return float(eur_rates([currency], None if on_date is None else [on_date])[0])
 
 def format_amount_eur(amount):
     """
     Format EUR amount for display
-    
+
     Args:
         amount (float): Amount in EUR
-    
+
     Returns:
         str: Formatted string (e.g., "€1,234.56")
     """
     return f"€{amount:,.2f}"
 
-def update_rates_from_api():
+def update_rates_from_api(url=ECB_RATES_URL, path=None):
     """
-    Placeholder for future API integration to fetch live rates
-    Could integrate with ECB, exchangerate-api, or similar
+    Download the ECB reference rates history into the local rates file
+    (replaced atomically; the next lookup reloads the table).
+
+    Returns:
+        int: Number of rates in the new file
     """
-    # TODO: Implement API integration if needed
-    pass
+    path = path or RATES_PATH
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.download"
+    with urllib.request.urlopen(url, timeout=60) as response, open(temp_path, 'wb') as f:
+        f.write(response.read())
+
+    # Reject a broken download before it replaces a working file
+    count = len(read_ecb_csv(temp_path) if path.lower().endswith('.csv') else read_ecb_xml(temp_path))
+    if count == 0:
+        os.remove(temp_path)
+        raise ValueError(f"No exchange rates in {url}")
+    os.replace(temp_path, path)
+    return count
 
 if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'update':
+        print(f"Downloaded {update_rates_from_api()} exchange rates to {RATES_PATH}")
+        sys.exit(0)
+
     # Test conversions
     print("Currency Conversion Tests:")
     print("-" * 50)
-    
+
     test_cases = [
         (1000, 'USD'),
         (1000, 'GBP2'),
@@ -97,9 +267,8 @@ if __name__ == '__main__':
         (1000, 'EUR'),
         (1000, 'OP272'),
     ]
-    
+
     for amount, currency in test_cases:
         eur_amount = convert_to_eur(amount, currency)
         rate = get_exchange_rate(currency)
         print(f"{amount:>8,.0f} {currency:<6} = {format_amount_eur(eur_amount)} (rate: {rate})")
-
@@ -0,0 +1,136 @@
+"""
+Directory Scanner
+os.scandir-based listings of the automation share (\\emea\central\...).
+
+One scandir call per directory returns names, types and stat info together
+(on Windows/SMB the stat fields come with the listing, no per-file round
+trip). Folder-only listings (the YYYYMM/YYYYMMDD tree) are memoized by the
+directory's mtime, so an unchanged month costs a single stat on the next
+scan; folders holding files are always re-listed, since rewriting a file in
+place leaves the directory mtime alone. Entries are typed by their role in
+the YYYYMM/YYYYMMDD/<account> layout.
+
+Usage:
+    from dir_scanner import scan, folders, files, DAY_FOLDER
+
+    for day in folders(month_path, DAY_FOLDER):
+        for entry in files(day.path, '.xlsx'):
+            print(entry.name, entry.size, entry.mtime_ns)
+"""
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+SCAN_CACHE_SIZE = 1024  # Max memoized directory listings
+
+# Entry kinds
+MONTH_FOLDER = 'month_folder'      # YYYYMM
+DAY_FOLDER = 'day_folder'          # YYYYMMDD
+ACCOUNT_FOLDER = 'account_folder'  # CCCC_HHHH_CUR (raw data per bank account)
+FOLDER = 'folder'
+EXCEL_FILE = 'excel_file'          # .xlsx / .xls (output files, raw payment files)
+CSV_FILE = 'csv_file'              # .csv (FRAN output)
+TEMP_FILE = 'temp_file'            # ~$ Office lock files
+FILE = 'file'
+FOLDER_KINDS = (MONTH_FOLDER, DAY_FOLDER, ACCOUNT_FOLDER, FOLDER)
+
+ScanEntry = namedtuple('ScanEntry', [
+    'kind',
+    'name',
+    'path',
+    'ext',       # Lower-case extension ('' for folders)
+    'size',
+    'mtime_ns'
+])
+
+# path -> (directory mtime_ns, entries), least recently used first
+scan_cache = OrderedDict()
+scan_cache_lock = threading.Lock()
+
+def classify(name, is_dir):
+    """Kind of a directory entry from its name and type"""
+    if is_dir:
+        if re.match(r'^\d{6}$', name):
+            return MONTH_FOLDER
+        if re.match(r'^\d{8}$', name):
+            return DAY_FOLDER
+        if len(name.split('_')) >= 3:
+            return ACCOUNT_FOLDER
+        return FOLDER
+
+    if name.startswith('~$'):
+        return TEMP_FILE
+    ext = os.path.splitext(name)[1].lower()
+    if ext in ('.xlsx', '.xls'):
+        return EXCEL_FILE
+    if ext == '.csv':
+        return CSV_FILE
+    return FILE
+
+def read_listing(path):
+    """One scandir pass: typed entries sorted by name"""
+    entries = []
+    with os.scandir(path) as it:
+        for dir_entry in it:
+            try:
+                is_dir = dir_entry.is_dir()
+                stat = dir_entry.stat()
+            except OSError:
+                continue  # Removed while listing
+            entries.append(ScanEntry(
+                kind=classify(dir_entry.name, is_dir),
+                name=dir_entry.name,
+                path=dir_entry.path,
+                ext='' if is_dir else os.path.splitext(dir_entry.name)[1].lower(),
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns
+            ))
+    entries.sort(key=lambda entry: entry.name)
+    return tuple(entries)
+
+def scan(path):
+    """
+    Get the typed entries of a directory, sorted by name.
+    Folder-only listings (months, days) are memoized by the directory's mtime.
+    Directories holding files are re-listed on every call: rewriting a file in
+    place leaves the directory mtime alone, and one scandir refreshes every
+    file's size/mtime in a single round trip (a stat per file would be N).
+    Raises FileNotFoundError (like os.scandir) if the directory does not exist.
+    """
+    dir_mtime_ns = os.stat(path).st_mtime_ns
+
+    with scan_cache_lock:
+        cached = scan_cache.get(path)
+        if cached is not None and cached[0] == dir_mtime_ns:
+            scan_cache.move_to_end(path)
+            return cached[1]
+
+    entries = read_listing(path)
+
+    with scan_cache_lock:
+        if all(entry.kind in FOLDER_KINDS for entry in entries):
+            scan_cache[path] = (dir_mtime_ns, entries)
+            scan_cache.move_to_end(path)
+            while len(scan_cache) > SCAN_CACHE_SIZE:
+                scan_cache.popitem(last=False)
+        else:
+            scan_cache.pop(path, None)
+
+    return entries
+
+def folders(path, kind=None):
+    """
+    Sub-folders of path, optionally only those of one kind.
+    A folder entry's size/mtime may lag behind its contents; scan() the
+    folder itself for an up-to-date view.
+    """
+    kinds = (kind,) if kind else FOLDER_KINDS
+    return [entry for entry in scan(path) if entry.kind in kinds]
+
+def files(path, *extensions):
+    """Files in path (Office lock files excluded), optionally only the given extensions"""
+    return [
+        entry for entry in scan(path)
+        if entry.kind in (EXCEL_FILE, CSV_FILE, FILE) and (not extensions or entry.ext in extensions)
+    ]
@@ -0,0 +1,433 @@
+"""
+Exception Store
+Storage layer for the customer exceptions (included/excluded business
+partners per bank account).
+
+SQLite is the system of record (data/customer_exceptions.db). Every write is
+a single-row transaction and IDs come from AUTOINCREMENT, so concurrent edits
+can neither lose each other's changes nor hand out the same ID twice. The
+legacy data/customer_exceptions.json is imported once, on first use, with its
+IDs preserved.
+
+Lookups: the code fields have (case-insensitive) B-tree indexes for exact
+matches; business_partner, partner_key and partner_ref are covered by an
+FTS5 trigram index, so substring searches of 3+ characters don't scan the
+table. Results are paginated with a total count.
+
+Batches (bulk import) are validated in one pass and upserted in a single
+transaction; exports are streamed in ID order with keyset paging.
+
+Usage:
+    python exception_store.py import [path.json]   # (Re-)import a JSON export
+    python exception_store.py export [path.json]   # Write a JSON export
+"""
+import os
+import io
+import csv
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+# Configuration
+EXCEPTIONS_DB_PATH = "data/customer_exceptions.db"
+LEGACY_JSON_PATH = "data/customer_exceptions.json"
+
+EXCEPTIONS_TABLE = "customer_exceptions"
+META_TABLE = "customer_exceptions_meta"
+SEARCH_TABLE = "customer_exceptions_search"  # FTS5 trigram index over SUBSTRING_FILTERS
+SEARCH_MIN_LENGTH = 3  # Trigram searches need 3+ characters; shorter ones scan
+EXCEPTION_TYPES = ('included', 'excluded')
+REQUIRED_FIELDS = ['company_code', 'housebank', 'currency', 'business_partner', 'exception_type']
+EDITABLE_FIELDS = REQUIRED_FIELDS[:4] + ['partner_key', 'partner_ref', 'exception_type']
+FIELDS = ['id'] + EDITABLE_FIELDS + ['created_at', 'updated_at']
+NATURAL_KEY = EDITABLE_FIELDS[:-1]  # Bulk rows without an id update the exception with the same key
+EXPORT_BATCH_SIZE = 1000  # Rows per read when streaming an export
+
+# Exact-match (case-insensitive) and substring filters accepted by list_exceptions
+EXACT_FILTERS = ['company_code', 'housebank', 'currency']
+SUBSTRING_FILTERS = ['business_partner', 'partner_key', 'partner_ref']
+
+# Database paths whose schema/import was already checked by this process,
+# and those with a working trigram search index (needs SQLite 3.34+)
+initialized_paths = set()
+search_paths = set()
+initialized_lock = threading.Lock()
+
+def connect(db_path=None):
+    """Open the store, creating the schema and importing the legacy JSON on first use"""
+    db_path = db_path or EXCEPTIONS_DB_PATH
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    with initialized_lock:
+        if db_path not in initialized_paths:
+            create_schema(conn)
+            if create_search_index(conn):
+                search_paths.add(db_path)
+            import_legacy_json(conn)
+            initialized_paths.add(db_path)
+    return conn
+
+def create_schema(conn):
+    with conn:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {EXCEPTIONS_TABLE} (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                company_code TEXT NOT NULL COLLATE NOCASE,
+                housebank TEXT NOT NULL COLLATE NOCASE,
+                currency TEXT NOT NULL COLLATE NOCASE,
+                business_partner TEXT NOT NULL COLLATE NOCASE,
+                partner_key TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+                partner_ref TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+                exception_type TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )""")
+        for column in ['company_code', 'housebank', 'currency', 'business_partner']:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{EXCEPTIONS_TABLE}_{column} ON {EXCEPTIONS_TABLE} ({column})")
+        # Store-wide version (bumped by every write) for ETags, plus one-time import marker
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {META_TABLE} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )""")
+
+def create_search_index(conn):
+    """
+    Create the trigram index over the partner fields, kept in sync by
+    triggers. Returns False if this SQLite build has no FTS5 trigram tokenizer.
+    """
+    columns = ', '.join(SUBSTRING_FILTERS)
+    new_columns = ', '.join(f'new.{field}' for field in SUBSTRING_FILTERS)
+    old_columns = ', '.join(f'old.{field}' for field in SUBSTRING_FILTERS)
+    try:
+        with conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (SEARCH_TABLE,)
+            ).fetchone()
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+                    {columns}, content='{EXCEPTIONS_TABLE}', content_rowid='id', tokenize='trigram'
+                )""")
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {EXCEPTIONS_TABLE}_search_insert AFTER INSERT ON {EXCEPTIONS_TABLE} BEGIN
+                    INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES (new.id, {new_columns});
+                END""")
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {EXCEPTIONS_TABLE}_search_delete AFTER DELETE ON {EXCEPTIONS_TABLE} BEGIN
+                    INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+                END""")
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {EXCEPTIONS_TABLE}_search_update AFTER UPDATE ON {EXCEPTIONS_TABLE} BEGIN
+                    INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+                    INSERT INTO {SEARCH_TABLE} (rowid, {columns}) VALUES (new.id, {new_columns});
+                END""")
+            if not exists:
+                # Stores created before the index existed
+                conn.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('rebuild')")
+        return True
+    except sqlite3.OperationalError as e:
+        print(f"Customer exception search index unavailable ({str(e)}), falling back to table scans")
+        return False
+
+def to_dict(row):
+    return {field: row[field] for field in FIELDS}
+
+def bump_version(conn):
+    """Stamp a new store version (inside the caller's transaction)"""
+    conn.execute(f"""
+        INSERT INTO {META_TABLE} (key, value) VALUES ('version', '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1""")
+    conn.execute(f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES ('updated_at', ?)",
+                 (datetime.now().isoformat(),))
+
+def import_rows(conn, exceptions):
+    """Insert or update exception dicts (IDs kept when present) - caller owns the transaction"""
+    now = datetime.now().isoformat()
+    for exception in exceptions:
+        values = {field: exception.get(field) or '' for field in EDITABLE_FIELDS}
+        values['id'] = exception.get('id')
+        values['created_at'] = exception.get('created_at') or now
+        values['updated_at'] = exception.get('updated_at') or now
+        # Upsert rather than INSERT OR REPLACE: REPLACE's implicit delete skips the search index triggers
+        conn.execute(
+            f"INSERT INTO {EXCEPTIONS_TABLE} ({', '.join(FIELDS)}) VALUES ({', '.join('?' for _ in FIELDS)}) "
+            f"ON CONFLICT(id) DO UPDATE SET {', '.join(f'{field} = excluded.{field}' for field in FIELDS[1:])}",
+            [values[field] for field in FIELDS]
+        )
+
+def import_legacy_json(conn, json_path=None, force=False):
+    """Import the legacy JSON file once (force=True re-imports). Returns the number of rows imported"""
+    json_path = json_path or LEGACY_JSON_PATH
+    if not os.path.exists(json_path):
+        return 0
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")  # One importer at a time (other processes wait)
+        imported = conn.execute(f"SELECT 1 FROM {META_TABLE} WHERE key = 'json_imported'").fetchone()
+        if imported and not force:
+            return 0
+        with open(json_path, 'r') as f:
+            exceptions = json.load(f)
+        import_rows(conn, exceptions)
+        conn.execute(f"INSERT OR REPLACE INTO {META_TABLE} (key, value) VALUES ('json_imported', ?)",
+                     (datetime.now().isoformat(),))
+        bump_version(conn)
+    print(f"Imported {len(exceptions)} customer exceptions from {json_path}")
+    return len(exceptions)
+
+def validate(data, partial=False):
+    """Error message for invalid exception fields, or None"""
+    if not partial:
+        for field in REQUIRED_FIELDS:
+            if not data.get(field):
+                return f'Missing required field: {field}'
+    if 'exception_type' in data and data['exception_type'] not in EXCEPTION_TYPES:
+        return 'Invalid exception_type. Must be "included" or "excluded"'
+    return None
+
+def filter_clause(filters, db_path):
+    """(WHERE clause, params) for list_exceptions-style filters"""
+    where = "WHERE 1=1"
+    params = []
+    for field in EXACT_FILTERS:
+        if filters.get(field):
+            where += f" AND {field} = ?"
+            params.append(filters[field])
+
+    search_terms = []
+    for field in SUBSTRING_FILTERS:
+        value = filters.get(field)
+        if not value:
+            continue
+        if db_path in search_paths and len(value) >= SEARCH_MIN_LENGTH:
+            # Column-scoped trigram phrase = case-insensitive substring match
+            search_terms.append(f'{field} : "{value.replace(chr(34), chr(34) * 2)}"')
+        else:
+            where += f" AND instr(lower({field}), ?) > 0"
+            params.append(value.lower())
+    if search_terms:
+        where += f" AND id IN (SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?)"
+        params.append(' AND '.join(search_terms))
+    return where, params
+
+def list_exceptions(filters=None, limit=None, offset=0, db_path=None):
+    """
+    Exceptions matching the filters, by ID, and how many match in total.
+    Code fields match exactly, partner fields by substring (both
+    case-insensitive). Returns (exceptions, total); limit=None returns all.
+    """
+    db_path = db_path or EXCEPTIONS_DB_PATH
+    conn = connect(db_path)
+    where, params = filter_clause(filters or {}, db_path)
+
+    page = ""
+    page_params = []
+    if limit is not None:
+        page = " LIMIT ? OFFSET ?"
+        page_params = [int(limit), int(offset)]
+
+    try:
+        # Count and page from the same snapshot
+        conn.execute("BEGIN")
+        total = conn.execute(f"SELECT COUNT(*) FROM {EXCEPTIONS_TABLE} {where}", params).fetchone()[0]
+        rows = conn.execute(f"SELECT * FROM {EXCEPTIONS_TABLE} {where} ORDER BY id{page}", params + page_params).fetchall()
+        conn.execute("COMMIT")
+        return [to_dict(row) for row in rows], total
+    finally:
+        conn.close()
+
+def iter_exceptions(filters=None, batch_size=EXPORT_BATCH_SIZE, db_path=None):
+    """
+    Yield every exception matching the filters, by ID, in batches of
+    batch_size (keyset paging - one short read per batch, nothing held open
+    between batches).
+    """
+    db_path = db_path or EXCEPTIONS_DB_PATH
+    where, params = filter_clause(filters or {}, db_path)
+    last_id = 0
+    while True:
+        conn = connect(db_path)
+        try:
+            rows = conn.execute(
+                f"SELECT * FROM {EXCEPTIONS_TABLE} {where} AND id > ? ORDER BY id LIMIT ?",
+                params + [last_id, batch_size]
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return
+        yield [to_dict(row) for row in rows]
+        last_id = rows[-1]['id']
+
+def get_exception(exception_id, db_path=None):
+    """One exception by ID (None if not found)"""
+    conn = connect(db_path)
+    try:
+        row = conn.execute(f"SELECT * FROM {EXCEPTIONS_TABLE} WHERE id = ?", (exception_id,)).fetchone()
+        return to_dict(row) if row else None
+    finally:
+        conn.close()
+
+def create_exception(data, db_path=None):
+    """Insert a new exception (validated by the caller) and return it with its new ID"""
+    now = datetime.now().isoformat()
+    values = {field: data.get(field) or '' for field in EDITABLE_FIELDS}
+    conn = connect(db_path)
+    try:
+        with conn:
+            cursor = conn.execute(
+                f"INSERT INTO {EXCEPTIONS_TABLE} ({', '.join(EDITABLE_FIELDS)}, created_at, updated_at) "
+                f"VALUES ({', '.join('?' for _ in EDITABLE_FIELDS)}, ?, ?)",
+                [values[field] for field in EDITABLE_FIELDS] + [now, now]
+            )
+            bump_version(conn)
+            row = conn.execute(f"SELECT * FROM {EXCEPTIONS_TABLE} WHERE id = ?", (cursor.lastrowid,)).fetchone()
+        return to_dict(row)
+    finally:
+        conn.close()
+
+def update_exception(exception_id, data, db_path=None):
+    """Update the given fields of one exception. Returns the updated exception (None if not found)"""
+    changes = {field: data[field] for field in EDITABLE_FIELDS if field in data}
+    changes['updated_at'] = datetime.now().isoformat()
+    conn = connect(db_path)
+    try:
+        with conn:
+            updated = conn.execute(
+                f"UPDATE {EXCEPTIONS_TABLE} SET {', '.join(f'{field} = ?' for field in changes)} WHERE id = ?",
+                list(changes.values()) + [exception_id]
+            ).rowcount
+            if not updated:
+                return None
+            bump_version(conn)
+            row = conn.execute(f"SELECT * FROM {EXCEPTIONS_TABLE} WHERE id = ?", (exception_id,)).fetchone()
+        return to_dict(row)
+    finally:
+        conn.close()
+
+def delete_exception(exception_id, db_path=None):
+    """Delete one exception. Returns the deleted exception (None if not found)"""
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(f"SELECT * FROM {EXCEPTIONS_TABLE} WHERE id = ?", (exception_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(f"DELETE FROM {EXCEPTIONS_TABLE} WHERE id = ?", (exception_id,))
+            bump_version(conn)
+        return to_dict(row)
+    finally:
+        conn.close()
+
+def read_csv_rows(text):
+    """Exception dicts from CSV text with a header row (column names as in FIELDS)"""
+    reader = csv.DictReader(io.StringIO(text.lstrip('\ufeff')))
+    return [
+        {(name or '').strip(): (value or '').strip() for name, value in row.items() if name}
+        for row in reader
+    ]
+
+def validate_batch(rows):
+    """Per-row error messages (None for valid rows) - one pass over the batch"""
+    errors = []
+    for row in rows:
+        if not isinstance(row, dict):
+            errors.append('Row must be an object')
+            continue
+        error = validate(row)
+        if error is None and row.get('id') not in (None, ''):
+            try:
+                int(row['id'])
+            except (TypeError, ValueError):
+                error = f"Invalid id: {row['id']}"
+        errors.append(error)
+    return errors
+
+def upsert_exceptions(rows, db_path=None):
+    """
+    Insert or update a validated batch in one transaction.
+    Rows with an id update that exception (created if the id is free); rows
+    without one update the exception with the same NATURAL_KEY, or create
+    one. Returns [{'row', 'status': 'created'/'updated', 'id'}] in input order.
+    """
+    now = datetime.now().isoformat()
+    results = []
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for position, row in enumerate(rows):
+                values = {field: row.get(field) or '' for field in EDITABLE_FIELDS}
+                if row.get('id') not in (None, ''):
+                    existing = conn.execute(
+                        f"SELECT id FROM {EXCEPTIONS_TABLE} WHERE id = ?", (int(row['id']),)
+                    ).fetchone()
+                    exception_id = int(row['id'])
+                else:
+                    existing = conn.execute(
+                        f"SELECT id FROM {EXCEPTIONS_TABLE} WHERE {' AND '.join(f'{field} = ?' for field in NATURAL_KEY)} ORDER BY id LIMIT 1",
+                        [values[field] for field in NATURAL_KEY]
+                    ).fetchone()
+                    exception_id = existing['id'] if existing else None
+
+                if existing:
+                    conn.execute(
+                        f"UPDATE {EXCEPTIONS_TABLE} SET {', '.join(f'{field} = ?' for field in EDITABLE_FIELDS)}, updated_at = ? WHERE id = ?",
+                        [values[field] for field in EDITABLE_FIELDS] + [now, exception_id]
+                    )
+                    results.append({'row': position, 'status': 'updated', 'id': exception_id})
+                else:
+                    cursor = conn.execute(
+                        f"INSERT INTO {EXCEPTIONS_TABLE} (id, {', '.join(EDITABLE_FIELDS)}, created_at, updated_at) "
+                        f"VALUES (?, {', '.join('?' for _ in EDITABLE_FIELDS)}, ?, ?)",
+                        [exception_id] + [values[field] for field in EDITABLE_FIELDS] + [now, now]
+                    )
+                    results.append({'row': position, 'status': 'created', 'id': cursor.lastrowid})
+            if rows:
+                bump_version(conn)
+        return results
+    finally:
+        conn.close()
+
+def distinct_values(field, db_path=None):
+    """Distinct non-empty values of a code field (served from its index)"""
+    conn = connect(db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            f"SELECT DISTINCT {field} FROM {EXCEPTIONS_TABLE} WHERE {field} != '' ORDER BY {field}"
+        )]
+    finally:
+        conn.close()
+
+def store_version(db_path=None):
+    """(version, updated_at datetime or None) of the whole store - changes on every write"""
+    conn = connect(db_path)
+    try:
+        meta = dict(conn.execute(f"SELECT key, value FROM {META_TABLE} WHERE key IN ('version', 'updated_at')").fetchall())
+    finally:
+        conn.close()
+    updated_at = datetime.fromisoformat(meta['updated_at']) if 'updated_at' in meta else None
+    return int(meta.get('version', 0)), updated_at
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('import', 'export'):
+        print(__doc__)
+        sys.exit(1)
+
+    json_path = sys.argv[2] if len(sys.argv) > 2 else LEGACY_JSON_PATH
+    if sys.argv[1] == 'import':
+        conn = connect()
+        try:
+            import_legacy_json(conn, json_path, force=True)
+        finally:
+            conn.close()
+    else:
+        exceptions, _ = list_exceptions()
+        with open(json_path, 'w') as f:
+            json.dump(exceptions, f, indent=2)
+        print(f"Exported {len(exceptions)} customer exceptions to {json_path}")
@@ -0,0 +1,96 @@
+"""
+FRAN Reader
+Typed, column-pruned reads of the FRAN `_FINAL_OUTPUT.csv` files.
+
+The header row is read first to resolve the requested columns by stripped
+name; the file is then parsed with an explicit schema and only those
+columns. Amounts like "2,602.90" (quoted, comma = thousands) are read as
+text with the separators removed; payment_metrics coerces them to numbers,
+so a bad amount counts as 0 (with a warning) instead of failing the file.
+
+Usage:
+    from fran_reader import read_fran_csv, iter_fran_chunks, read_fran_csvs
+
+    df = read_fran_csv(filepath)                     # whole file
+    for chunk in iter_fran_chunks(filepath):         # bounded memory
+        ...
+    frames = read_fran_csvs(filepaths, workers=4)    # many files concurrently
+"""
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from workbook_reader import METRIC_COLUMNS
+
+FRAN_CHUNK_ROWS = 200_000  # Rows per chunk for iter_fran_chunks
+FRAN_READ_WORKERS = 4  # Concurrent file reads in read_fran_csvs
+
+# Explicit schema (stripped header -> dtype); text columns stay text, so
+# single numeric DocNumbers are not turned into floats
+FRAN_SCHEMA = {
+    'Amount': str,
+    'Match': str,
+    'DocNumbers': str,
+    'Docnumbers': str,
+    'Business_Partner': str,
+    'Payment_Number': str,
+    'Payment Date': str,
+}
+
+CSV_OPTIONS = {'sep': ',', 'quotechar': '"', 'thousands': ','}
+THOUSANDS_SEPARATOR = ','
+
+def resolve_columns(filepath, columns):
+    """Raw header names of the requested columns (first match wins) -> stripped names"""
+    header = pd.read_csv(filepath, nrows=0, **CSV_OPTIONS).columns
+    names = {}
+    for raw in header:
+        name = raw.strip() if isinstance(raw, str) else raw
+        if name in columns and name not in names.values():
+            names[raw] = name
+    return names
+
+def read_options(filepath, columns):
+    """(read_csv keyword arguments, raw -> stripped rename map) for the requested columns"""
+    names = resolve_columns(filepath, columns)
+    dtype = {raw: FRAN_SCHEMA[name] for raw, name in names.items() if name in FRAN_SCHEMA}
+    return dict(CSV_OPTIONS, usecols=list(names), dtype=dtype), names
+
+def strip_thousands(df):
+    """Amount text without thousands separators ('2,602.90' -> '2602.90'), left as text"""
+    if 'Amount' in df.columns:
+        df['Amount'] = df['Amount'].str.replace(THOUSANDS_SEPARATOR, '', regex=False).str.strip()
+    return df
+
+def read_fran_csv(filepath, columns=METRIC_COLUMNS):
+    """
+    Read only `columns` of a FRAN CSV into a DataFrame with stripped headers.
+    Columns missing from the file are left out (check `in df.columns`).
+    """
+    options, names = read_options(filepath, columns)
+    return strip_thousands(pd.read_csv(filepath, **options).rename(columns=names))
+
+def iter_fran_chunks(filepath, columns=METRIC_COLUMNS, chunksize=FRAN_CHUNK_ROWS):
+    """Yield a FRAN CSV as DataFrames of at most `chunksize` rows (see read_fran_csv)"""
+    options, names = read_options(filepath, columns)
+    with pd.read_csv(filepath, chunksize=chunksize, **options) as reader:
+        for chunk in reader:
+            yield strip_thousands(chunk.rename(columns=names))
+
+def read_fran_result(job):
+    """(filepath, columns) -> (DataFrame, None) or (None, exception)"""
+    filepath, columns = job
+    try:
+        return read_fran_csv(filepath, columns), None
+    except Exception as e:
+        return None, e
+
+def read_fran_csvs(filepaths, columns=METRIC_COLUMNS, workers=FRAN_READ_WORKERS):
+    """
+    Read many FRAN CSVs concurrently (the parser releases the GIL, and the
+    share's I/O latency overlaps). Returns [(DataFrame, None) or (None,
+    exception)] in input order, so one bad file doesn't sink the batch.
+    """
+    jobs = [(filepath, columns) for filepath in filepaths]
+    if workers <= 1 or len(jobs) <= 1:
+        return [read_fran_result(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(read_fran_result, jobs))
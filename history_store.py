@@ -0,0 +1,403 @@
+"""
+History Store
+Storage layer for the consolidated PACO/FRAN history.
+
+SQLite is the system of record (data/history.db). The legacy consolidated
+workbooks (paco_consolidated.xlsx / fran_consolidated.xlsx) are migrated once
+and remain available as an on-demand Excel export for business users.
+
+Usage:
+    python history_store.py migrate [paco|fran]   # One-shot import from .xlsx
+    python history_store.py export [paco|fran]    # Write .xlsx export
+    python history_store.py reprice [paco|fran]   # Recompute EUR columns from current rates
+"""
+import os
+import sqlite3
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from currency_converter import eur_rates
+
+# Configuration
+HISTORY_BACKEND = "sqlite"  # "sqlite" (system of record) or "excel" (legacy)
+HISTORY_DB_PATH = "data/history.db"
+EXCEL_PATHS = {
+    'paco': "data/paco_consolidated.xlsx",
+    'fran': "data/fran_consolidated.xlsx",
+}
+
+# One record per bank account per day
+KEY_COLUMNS = ['date', 'company_code', 'housebank', 'currency']
+COLUMN_TYPES = {
+    'date': 'TEXT NOT NULL',
+    'company_code': 'TEXT NOT NULL',
+    'housebank': 'TEXT NOT NULL',
+    'currency': 'TEXT NOT NULL',
+    'total_payments': 'INTEGER',
+    'total_received': 'REAL',
+    'total_received_eur': 'REAL',
+    'automated_count': 'INTEGER',
+    'assigned_to_account': 'INTEGER',
+    'invoices_assigned': 'INTEGER',
+    'value_assigned': 'REAL',
+    'value_assigned_eur': 'REAL',
+    'file_timestamp': 'TEXT',
+    'processing_minutes': 'INTEGER',
+}
+COLUMNS = list(COLUMN_TYPES)
+# EUR column -> amount column it is converted from
+EUR_COLUMNS = {
+    'total_received_eur': 'total_received',
+    'value_assigned_eur': 'value_assigned',
+}
+
+def normalize_company_code(value):
+    """Normalize company code to the 4-digit form used by the dashboard (10 -> 0010)"""
+    value = str(value).strip()
+    return value.zfill(4) if value.isdigit() else value
+
+def normalize_history(df):
+    """
+    Bring a history DataFrame into canonical form: known columns only,
+    date as datetime.date, file_timestamp as datetime, string key columns.
+    """
+    df = df.copy()
+    for column in COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+    df = df[COLUMNS]
+
+    if df.empty:
+        return df
+
+    df['date'] = pd.to_datetime(df['date'], format='ISO8601').dt.date
+    df['file_timestamp'] = pd.to_datetime(df['file_timestamp'], format='ISO8601')
+    df['company_code'] = df['company_code'].map(normalize_company_code)
+    df['housebank'] = df['housebank'].astype(str)
+    df['currency'] = df['currency'].astype(str)
+    return df
+
+class ExcelHistoryStore:
+    """Legacy backend: the whole history lives in one workbook"""
+
+    def __init__(self, source, path=None):
+        self.source = source
+        self.path = path or EXCEL_PATHS[source]
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        """Load the full history (empty DataFrame if none)"""
+        if not self.exists():
+            return normalize_history(pd.DataFrame())
+        return normalize_history(pd.read_excel(self.path, engine='openpyxl'))
+
+    def version(self):
+        """Workbook mtime - any change to the file changes every date"""
+        return os.stat(self.path).st_mtime_ns if self.exists() else 0
+
+    def load_changes(self, known_versions=None):
+        """
+        Load the whole workbook if it changed since known_versions.
+        Returns (df, versions) like SqliteHistoryStore.load_changes().
+        """
+        version = self.version()
+        if known_versions and set(known_versions.values()) == {version}:
+            return normalize_history(pd.DataFrame()), known_versions
+        df = self.load()
+        return df, {d: version for d in df['date'].unique()}
+
+    def save(self, df):
+        """Replace the full history"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        df = normalize_history(df).sort_values(KEY_COLUMNS)
+        df.to_excel(self.path, index=False, engine='openpyxl')
+
+    def upsert(self, df):
+        """Insert or replace records by (date, company_code, housebank, currency)"""
+        merged = pd.concat([self.load(), normalize_history(df)], ignore_index=True)
+        merged = merged.drop_duplicates(subset=KEY_COLUMNS, keep='last')
+        self.save(merged)
+        return len(merged)
+
+    def replace_date(self, data_date, df):
+        """Replace every record for one date. Returns (records_removed, total_records)"""
+        existing = self.load()
+        keep = existing[existing['date'] != data_date]
+        combined = pd.concat([keep, normalize_history(df)], ignore_index=True)
+        self.save(combined)
+        return len(existing) - len(keep), len(combined)
+
+class SqliteHistoryStore:
+    """
+    SQLite backend: the history is partitioned by date.
+    Each date partition is replaced atomically (DELETE + INSERT in one
+    transaction) and stamped with a new version in {source}_partitions, so
+    writers only touch the day they own and readers can fetch just the
+    partitions that changed since they last looked.
+    """
+
+    def __init__(self, source, db_path=None):
+        self.source = source
+        self.db_path = db_path or HISTORY_DB_PATH
+        self.table = f"{source}_history"
+        self.partitions_table = f"{source}_partitions"
+
+    def connect(self):
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def exists(self):
+        if not os.path.exists(self.db_path):
+            return False
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            row = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (self.table,)
+            ).fetchone()
+            return row is not None
+        finally:
+            conn.close()
+
+    def create_table(self, conn):
+        columns = ',\n    '.join(f"{name} {sql_type}" for name, sql_type in COLUMN_TYPES.items())
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                {columns},
+                PRIMARY KEY ({', '.join(KEY_COLUMNS)})
+            )""")
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.partitions_table} (
+                date TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                row_count INTEGER NOT NULL,
+                updated_at TEXT NOT NULL
+            )""")
+
+        # Stores created before partitions existed: stamp every date once
+        has_partitions = conn.execute(f"SELECT 1 FROM {self.partitions_table} LIMIT 1").fetchone()
+        if not has_partitions:
+            dates = [row[0] for row in conn.execute(f"SELECT DISTINCT date FROM {self.table}")]
+            self.bump_partitions(conn, dates)
+
+    def to_rows(self, df):
+        """Convert a history DataFrame into SQLite parameter tuples"""
+        df = normalize_history(df)
+        rows = []
+        for record in df.to_dict('records'):
+            record['date'] = record['date'].isoformat()
+            timestamp = record['file_timestamp']
+            record['file_timestamp'] = None if pd.isna(timestamp) else timestamp.isoformat()
+            rows.append(tuple(None if pd.isna(record[c]) else record[c] for c in COLUMNS))
+        return rows
+
+    def insert_rows(self, conn, df):
+        """Insert rows and return the ISO dates they touched"""
+        rows = self.to_rows(df)
+        placeholders = ', '.join('?' for _ in COLUMNS)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {self.table} ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+            rows
+        )
+        return {row[0] for row in rows}
+
+    def bump_partitions(self, conn, dates):
+        """Stamp the given ISO dates with a new version (inside the caller's transaction)"""
+        if not dates:
+            return
+        version = conn.execute(f"SELECT COALESCE(MAX(version), 0) + 1 FROM {self.partitions_table}").fetchone()[0]
+        updated_at = datetime.now().isoformat()
+        for iso_date in dates:
+            row_count = conn.execute(
+                f"SELECT COUNT(*) FROM {self.table} WHERE date = ?", (iso_date,)
+            ).fetchone()[0]
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.partitions_table} (date, version, row_count, updated_at) VALUES (?, ?, ?, ?)",
+                (iso_date, version, row_count, updated_at)
+            )
+
+    def count(self, conn):
+        return conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def ensure_migrated(self):
+        """On first use, import the legacy workbook if there is one"""
+        if not self.exists() and os.path.exists(EXCEL_PATHS.get(self.source, '')):
+            migrate_from_excel(self.source)
+
+    def load(self):
+        """Load the full history (empty DataFrame if none)"""
+        df, _ = self.load_changes()
+        return df
+
+    def partition_versions(self, conn=None):
+        """
+        Get {date: version} for every partition. Emptied partitions are kept:
+        their version is part of the store version, which must never go back.
+        """
+        if conn is None:
+            self.ensure_migrated()
+            if not self.exists():
+                return {}
+            conn = self.connect()
+            try:
+                with conn:
+                    self.create_table(conn)
+                return self.partition_versions(conn)
+            finally:
+                conn.close()
+
+        rows = conn.execute(f"SELECT date, version FROM {self.partitions_table}")
+        return {date.fromisoformat(iso_date): version for iso_date, version in rows}
+
+    def version(self):
+        """Monotonic version of the whole store (changes on every write)"""
+        return max(self.partition_versions().values(), default=0)
+
+    def load_changes(self, known_versions=None):
+        """
+        Load only the partitions whose version differs from known_versions.
+        Returns (df, versions): the rows of new/changed partitions (everything if
+        known_versions is None) and the current {date: version} map. Both are read
+        in one transaction so they are consistent with each other.
+        """
+        self.ensure_migrated()
+        if not self.exists():
+            return normalize_history(pd.DataFrame()), {}
+
+        conn = self.connect()
+        try:
+            with conn:
+                self.create_table(conn)
+            conn.execute("BEGIN")
+            versions = self.partition_versions(conn)
+            if known_versions is None:
+                df = pd.read_sql_query(f"SELECT * FROM {self.table}", conn)
+            else:
+                changed = [d.isoformat() for d, v in versions.items() if known_versions.get(d) != v]
+                if not changed:
+                    df = pd.DataFrame()
+                else:
+                    placeholders = ', '.join('?' for _ in changed)
+                    df = pd.read_sql_query(
+                        f"SELECT * FROM {self.table} WHERE date IN ({placeholders})", conn, params=changed
+                    )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        return normalize_history(df), versions
+
+    def save(self, df):
+        """Replace the full history in a single transaction"""
+        conn = self.connect()
+        try:
+            with conn:
+                self.create_table(conn)
+                old_dates = {row[0] for row in conn.execute(f"SELECT DISTINCT date FROM {self.table}")}
+                conn.execute(f"DELETE FROM {self.table}")
+                new_dates = self.insert_rows(conn, df)
+                self.bump_partitions(conn, old_dates | new_dates)
+        finally:
+            conn.close()
+
+    def upsert(self, df):
+        """Insert or replace records by (date, company_code, housebank, currency)"""
+        self.ensure_migrated()
+        conn = self.connect()
+        try:
+            with conn:
+                self.create_table(conn)
+                self.bump_partitions(conn, self.insert_rows(conn, df))
+            return self.count(conn)
+        finally:
+            conn.close()
+
+    def replace_date(self, data_date, df):
+        """
+        Atomically replace the partition for one date - the rest of the history
+        is not read or rewritten. Returns (records_removed, total_records)
+        """
+        self.ensure_migrated()
+        conn = self.connect()
+        try:
+            with conn:
+                self.create_table(conn)
+                removed = conn.execute(
+                    f"DELETE FROM {self.table} WHERE date = ?", (data_date.isoformat(),)
+                ).rowcount
+                self.insert_rows(conn, df)
+                self.bump_partitions(conn, {data_date.isoformat()})
+            return removed, self.count(conn)
+        finally:
+            conn.close()
+
+def get_history_store(source, backend=None):
+    """Get the configured history store for 'paco' or 'fran'"""
+    backend = backend or HISTORY_BACKEND
+    if backend == 'excel':
+        return ExcelHistoryStore(source)
+    return SqliteHistoryStore(source)
+
+def migrate_from_excel(source, excel_path=None):
+    """One-shot import of a legacy consolidated workbook into SQLite"""
+    excel_path = excel_path or EXCEL_PATHS[source]
+    if not os.path.exists(excel_path):
+        print(f"Nothing to migrate: {excel_path} not found")
+        return 0
+
+    print(f"Migrating {excel_path} -> {HISTORY_DB_PATH} ({source}_history)")
+    df = ExcelHistoryStore(source, excel_path).load()
+    SqliteHistoryStore(source).save(df)
+    print(f"   Migrated {len(df)} records")
+    return len(df)
+
+def export_to_excel(source, excel_path=None):
+    """Write the current history to an Excel workbook for business users"""
+    excel_path = excel_path or EXCEL_PATHS[source]
+    df = get_history_store(source).load()
+    ExcelHistoryStore(source, excel_path).save(df)
+    print(f"Exported {len(df)} {source.upper()} records to {excel_path}")
+    return excel_path
+
+def reprice_history(source, rates_path=None):
+    """
+    Recompute the EUR columns of the whole history at the rate effective on
+    each record's date (one vectorized pass, no source files re-read).
+    Only records whose EUR values changed are written, so only their date
+    partitions get new versions. Returns the number of records updated.
+    """
+    store = get_history_store(source)
+    df = store.load()
+    if df.empty:
+        return 0
+
+    rates = eur_rates(df['currency'], df['date'], rates_path)
+    changed = pd.Series(False, index=df.index)
+    for eur_column, amount_column in EUR_COLUMNS.items():
+        repriced = pd.to_numeric(df[amount_column], errors='coerce').to_numpy(dtype=float) * rates
+        current = pd.to_numeric(df[eur_column], errors='coerce').to_numpy(dtype=float)
+        changed |= ~np.isclose(repriced, current, rtol=1e-9, atol=1e-6, equal_nan=True)
+        df[eur_column] = repriced
+
+    if changed.any():
+        store.upsert(df[changed])
+    print(f"Repriced {int(changed.sum())} of {len(df)} {source.upper()} records")
+    return int(changed.sum())
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ('migrate', 'export', 'reprice'):
+        print(__doc__)
+        sys.exit(1)
+
+    sources = sys.argv[2:] or list(EXCEL_PATHS)
+    for source in sources:
+        if sys.argv[1] == 'migrate':
+            migrate_from_excel(source)
+        elif sys.argv[1] == 'reprice':
+            reprice_history(source)
+        else:
+            export_to_excel(source)
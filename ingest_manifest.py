@@ -0,0 +1,139 @@
+"""
+Ingest Manifest
+Tracks which PACO output files have been ingested into the history store.
+
+Each source file is recorded with its path, size, mtime, SHA-256 content hash
+and the record it produced, so re-runs of process_paco_data.py only open new
+or modified files.
+
+Usage:
+    python ingest_manifest.py                         # Everything ingested
+    python ingest_manifest.py --since 2025-11-01      # Ingested on/after a day
+    python ingest_manifest.py --date 2025-11-04       # Files for one data date
+"""
+import os
+import json
+import hashlib
+import sqlite3
+from datetime import datetime
+import pandas as pd
+from history_store import HISTORY_DB_PATH
+
+MANIFEST_TABLE = "ingest_manifest"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def connect(db_path=None):
+    db_path = db_path or HISTORY_DB_PATH
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            processing_date TEXT,
+            record TEXT,
+            ingested_at TEXT NOT NULL
+        )""")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{MANIFEST_TABLE}_date ON {MANIFEST_TABLE} (processing_date)")
+    return conn
+
+def hash_file(filepath):
+    """SHA-256 of a file's content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(db_path=None):
+    """Get {path: {'size', 'mtime_ns', 'sha256', 'record'}} for every ingested file"""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(f"SELECT path, size, mtime_ns, sha256, record FROM {MANIFEST_TABLE}").fetchall()
+    finally:
+        conn.close()
+    return {
+        path: {'size': size, 'mtime_ns': mtime_ns, 'sha256': sha256, 'record': record}
+        for path, size, mtime_ns, sha256, record in rows
+    }
+
+def is_unchanged(entry, size, mtime_ns):
+    """True if a manifest entry still matches the file's size and mtime"""
+    return entry is not None and entry['size'] == size and entry['mtime_ns'] == mtime_ns
+
+def serialize_record(record):
+    """JSON-encode a processed record (dates/timestamps as ISO strings)"""
+    if record is None:
+        return None
+    return json.dumps(record, default=lambda value: value.isoformat())
+
+def record_ingest(entries, db_path=None):
+    """
+    Insert or replace manifest entries in one transaction.
+    Each entry is a dict with path, size, mtime_ns, sha256, processing_date and record.
+    """
+    if not entries:
+        return
+    ingested_at = datetime.now().isoformat()
+    rows = [
+        (
+            entry['path'],
+            entry['size'],
+            entry['mtime_ns'],
+            entry['sha256'],
+            entry['processing_date'].isoformat() if entry.get('processing_date') else None,
+            entry['record'] if isinstance(entry.get('record'), str) else serialize_record(entry.get('record')),
+            ingested_at
+        )
+        for entry in entries
+    ]
+    conn = connect(db_path)
+    try:
+        with conn:
+            conn.executemany(f"""
+                INSERT OR REPLACE INTO {MANIFEST_TABLE}
+                (path, size, mtime_ns, sha256, processing_date, record, ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""", rows)
+    finally:
+        conn.close()
+
+def query_manifest(since=None, processing_date=None, db_path=None):
+    """
+    Query what was ingested when.
+    since: only files ingested on/after this date; processing_date: only files for this data date.
+    """
+    sql = f"SELECT path, processing_date, size, mtime_ns, sha256, ingested_at, record FROM {MANIFEST_TABLE} WHERE 1=1"
+    params = []
+    if since:
+        sql += " AND ingested_at >= ?"
+        params.append(since.isoformat())
+    if processing_date:
+        sql += " AND processing_date = ?"
+        params.append(processing_date.isoformat())
+    sql += " ORDER BY ingested_at DESC, path"
+
+    conn = connect(db_path)
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show ingested PACO output files")
+    parser.add_argument('--since', help="Ingested on/after YYYY-MM-DD")
+    parser.add_argument('--date', help="Data date YYYY-MM-DD")
+    args = parser.parse_args()
+
+    since = datetime.strptime(args.since, '%Y-%m-%d') if args.since else None
+    processing_date = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else None
+
+    df = query_manifest(since=since, processing_date=processing_date)
+    if df.empty:
+        print("No ingested files match.")
+    else:
+        print(df.drop(columns=['record', 'mtime_ns']).to_string(index=False))
+        print(f"\n{len(df)} files")
@@ -0,0 +1,176 @@
+"""
+Payment Metrics
+One vectorized kernel for the per-bank-account metrics of the automation
+output files, shared by the live view, the PACO backfill and the daily
+PACO/FRAN consolidation.
+
+Output file frames are tagged with their bank account, concatenated and
+reduced in a single groupby pass; the Match/DocNumbers mask is computed once
+per row. A single file is just a batch of one.
+
+Rules:
+- automated_count / value_assigned: Match == "Yes" (case-insensitive) AND DocNumbers
+  filled; with require_docnumbers=False (PACO backfill) Match == "Yes" alone
+- assigned_to_account: Business_Partner filled
+- invoices_assigned: valid invoice numbers listed in DocNumbers (or Docnumbers),
+  separated by ';' (PACO) or ',' (FRAN)
+- *_eur: converted at the exchange rate effective on the record's data date
+  (rate_date - the day before the output file's processing day; the file's
+  own date if not given)
+
+Usage:
+    from payment_metrics import AccountFrame, batch_metrics, file_metrics, merge_records
+
+    records = batch_metrics([AccountFrame('0010', '1050D', 'EUR', file_timestamp, df), ...])
+    record = file_metrics(df, '0010', '1050D', 'EUR', file_timestamp)
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime, time
+from collections import namedtuple
+from currency_converter import eur_rates
+
+START_OF_DAY = time(8, 0)  # processing_minutes are counted from 8:00
+# A DocNumbers token is an invoice if it has 3+ characters including a digit
+# (drops OUTGOING/INCOMING/NAN markers and stray fragments)
+INVOICE_PATTERN = r'(?=.*\d).{3,}'
+
+# Metrics that add up across parts of a file (see merge_records)
+ADDITIVE_FIELDS = [
+    'total_received', 'total_received_eur', 'total_payments', 'automated_count',
+    'assigned_to_account', 'invoices_assigned', 'value_assigned', 'value_assigned_eur'
+]
+
+AccountFrame = namedtuple('AccountFrame', [
+    'company_code',
+    'housebank',
+    'currency',
+    'file_timestamp',  # Output file mtime (datetime)
+    'frame'            # Output file rows (stripped headers)
+])
+
+def tokenize_invoices(docnumbers, separator=';', pattern=INVOICE_PATTERN):
+    """
+    Valid invoice numbers of a DocNumbers column, one token per row, indexed by
+    the source row (the input index must be unique). Tokens are split on
+    `separator` and stripped; with pattern=None every non-empty token counts.
+    """
+    tokens = docnumbers.dropna().astype(str).str.split(separator, regex=False).explode().str.strip()
+    valid = tokens.str.fullmatch(pattern) if pattern else tokens.ne('')
+    return tokens[valid.fillna(False).astype(bool)]
+
+def count_invoices(docnumbers, separator=';', pattern=INVOICE_PATTERN, return_tokens=False):
+    """
+    Invoices per row of a DocNumbers column (see tokenize_invoices).
+    With return_tokens=True returns (counts, tokens).
+    """
+    tokens = tokenize_invoices(docnumbers, separator, pattern)
+    counts = tokens.groupby(level=0).size().reindex(docnumbers.index, fill_value=0)
+    return (counts, tokens) if return_tokens else counts
+
+def processing_minutes(file_timestamp):
+    """Minutes between 8:00 and the output file's timestamp on the same day"""
+    start_of_day = datetime.combine(file_timestamp.date(), START_OF_DAY)
+    return int((file_timestamp - start_of_day).total_seconds() / 60)
+
+def metric_columns(df):
+    """The metric columns of one output file; missing ones are all-NaN, DocNumbers under one name"""
+    if 'DocNumbers' in df.columns:
+        docnumbers = df['DocNumbers']
+    elif 'Docnumbers' in df.columns:
+        docnumbers = df['Docnumbers']
+    else:
+        docnumbers = np.nan
+    return pd.DataFrame({
+        'Amount': df['Amount'] if 'Amount' in df.columns else np.nan,
+        'Match': df['Match'] if 'Match' in df.columns else np.nan,
+        'DocNumbers': docnumbers,
+        'Business_Partner': df['Business_Partner'] if 'Business_Partner' in df.columns else np.nan,
+    }, index=df.index)
+
+def batch_metrics(account_frames, invoice_separator=';', invoice_pattern=INVOICE_PATTERN, rate_date=None,
+                  require_docnumbers=True):
+    """
+    Compute the metrics of many output files in one pass.
+    require_docnumbers: only Match == "Yes" rows with DocNumbers filled count as
+    automated (False: Match alone, the PACO backfill's rule).
+    rate_date: data date of the records, whose exchange rates apply (the
+    same date history_store.reprice_history uses); None = each file's date.
+    Returns one record per AccountFrame, in input order (empty files give
+    zero counts).
+    """
+    account_frames = list(account_frames)
+    if not account_frames:
+        return []
+
+    rows = pd.concat(
+        [metric_columns(account.frame).assign(account=position) for position, account in enumerate(account_frames)],
+        ignore_index=True
+    )
+
+    # A stray text cell must not sink the whole batch: it counts as no amount
+    amount = pd.to_numeric(rows['Amount'], errors='coerce')
+    unparsed = amount.isna() & rows['Amount'].notna()
+    if unparsed.any():
+        counts = unparsed.groupby(rows['account']).sum()
+        for position, count in counts[counts > 0].items():
+            account = account_frames[position]
+            print(f"Warning: {count} non-numeric Amount value(s) in {account.company_code}_{account.housebank}_{account.currency}, counted as 0")
+
+    docnumbers = rows['DocNumbers']
+    matched = rows['Match'].astype(str).str.strip().str.upper().eq('YES')
+    if require_docnumbers:
+        matched &= docnumbers.notna() & (docnumbers != '')
+
+    totals = pd.DataFrame({
+        'account': rows['account'],
+        'total_payments': 1,
+        'total_received': amount,
+        'automated_count': matched,
+        'assigned_to_account': rows['Business_Partner'].notna(),
+        'invoices_assigned': count_invoices(docnumbers, invoice_separator, invoice_pattern),
+        'value_assigned': amount.where(matched, 0.0),
+    }).groupby('account').sum().reindex(range(len(account_frames)), fill_value=0)
+
+    # One vectorized lookup at the rates effective on the data date
+    rates = eur_rates(
+        [account.currency for account in account_frames],
+        [rate_date or account.file_timestamp.date() for account in account_frames]
+    )
+
+    records = []
+    for account, rate, row in zip(account_frames, rates, totals.itertuples(index=False)):
+        total_received = float(row.total_received)
+        value_assigned = float(row.value_assigned)
+        records.append({
+            'company_code': account.company_code,
+            'housebank': account.housebank,
+            'currency': account.currency,
+            'total_received': total_received,
+            'total_received_eur': total_received * rate,
+            'total_payments': int(row.total_payments),
+            'automated_count': int(row.automated_count),
+            'assigned_to_account': int(row.assigned_to_account),
+            'invoices_assigned': int(row.invoices_assigned),
+            'value_assigned': value_assigned,
+            'value_assigned_eur': value_assigned * rate,
+            'file_timestamp': account.file_timestamp,
+            'processing_minutes': processing_minutes(account.file_timestamp)
+        })
+    return records
+
+def file_metrics(df, company_code, housebank, currency, file_timestamp, **options):
+    """Metrics record of a single output file (see batch_metrics for options)"""
+    return batch_metrics([AccountFrame(company_code, housebank, currency, file_timestamp, df)], **options)[0]
+
+def merge_records(records):
+    """
+    Combine metrics records of the same output file computed piecewise
+    (e.g. per CSV chunk). All metrics are additive; identity fields, the
+    file timestamp and processing_minutes come from the first record.
+    """
+    records = list(records)
+    merged = dict(records[0])
+    for field in ADDITIVE_FIELDS:
+        merged[field] = sum(record[field] for record in records)
+    return merged
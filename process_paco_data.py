@@ -1,18 +1,24 @@
 """
 PACO Data Processor
-Consolidates historical PACO automation data from Excel files into a single database.
+Consolidates historical PACO automation data from Excel files into the history store.
 Processes all 2025 data except today's files.
 """
 import os
 import pandas as pd
 from datetime import datetime, date, timedelta
 from pathlib import Path
-import re
-from currency_converter import convert_to_eur
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from history_store import get_history_store, HISTORY_DB_PATH
+from ingest_manifest import load_manifest, is_unchanged, hash_file, record_ingest
+from dir_scanner import folders, files, MONTH_FOLDER, DAY_FOLDER
+from workbook_reader import read_workbook, METRIC_COLUMNS
+from payment_metrics import file_metrics
 
 # Configuration
 NETWORK_PATH = r"\\emea\central\SSC_GROUP\BPA\30_Automations\90_CashOps\02_Posting Cash\03_Output\2025"
-LOCAL_DB_PATH = "data/paco_consolidated.xlsx"
+DEFAULT_WORKERS = 1  # Parallel parse processes (0 = one per CPU)
 
 def parse_filename(filename):
     """
@@ -33,47 +39,12 @@ def parse_filename(filename):
     
     return None, None, None
 
-def count_invoices(docnumbers_str):
-    """
-    Count invoices from DocNumbers column.
-    Invoices are separated by semicolon (;)
-    Excludes OUTGOING, INCOMING, and other non-invoice values
-    """
-    if pd.isna(docnumbers_str) or docnumbers_str == '':
-        return 0
-    
-    # Skip OUTGOING, INCOMING and other non-numeric patterns
-    docnumbers_str = str(docnumbers_str).strip()
-    if docnumbers_str.upper() in ['OUTGOING', 'INCOMING', 'NAN', 'NONE']:
-        return 0
-    
-    # Split by semicolon and count only numeric invoice numbers
-    invoices = []
-    for inv in docnumbers_str.split(';'):
-        inv = inv.strip()
-        # Only count if it looks like an invoice number (contains digits)
-        if inv and any(c.isdigit() for c in inv):
-            # Exclude if it's obviously not an invoice (too short or all letters)
-            if len(inv) > 2 and not inv.isalpha():
-                invoices.append(inv)
-    
-    return len(invoices)
-
 def process_excel_file(filepath, processing_date):
     """
     Process a single Excel file and extract metrics.
     Returns a dictionary with aggregated data.
     """
     try:
-        # Read Excel file
-        df = pd.read_excel(filepath, engine='openpyxl')
-        
-        # Normalize column names (strip whitespace only, keep original casing for exact matches)
-        df.columns = df.columns.str.strip() if hasattr(df.columns, 'str') else df.columns
-        
-        # Filter out non-string columns (some Excel files have float column names)
-        valid_columns = [col for col in df.columns if isinstance(col, str)]
-        
         # Parse filename to get bank account configuration
         filename = os.path.basename(filepath)
         company_code, housebank, currency = parse_filename(filename)
@@ -82,137 +53,158 @@ def process_excel_file(filepath, processing_date):
             print(f"Warning: Could not parse filename: {filename}")
             return None
         
-        # Calculate metrics
-        total_payments = len(df)
+        # Read only the metric columns (headers are stripped; non-string headers never match)
+        df = read_workbook(filepath, METRIC_COLUMNS)
         
-        # Total received (sum of Amount column)
-        total_received = df['Amount'].sum() if 'Amount' in valid_columns else 0
-        
-        # Automated count (Match = "Yes" - case-sensitive!)
-        automated_count = 0
-        if 'Match' in valid_columns:
-            # Use case-insensitive matching to handle both "Yes" and "YES"
-            automated_count = len(df[df['Match'].str.strip().str.upper() == 'YES'])
-        
-        # Assigned to account (Business_Partner is filled)
-        assigned_to_account = len(df[df['Business_Partner'].notna()]) if 'Business_Partner' in valid_columns else 0
-        
-        # Invoices assigned (count total invoices from DocNumbers)
-        invoices_assigned = 0
-        if 'DocNumbers' in valid_columns:
-            invoices_assigned = df['DocNumbers'].apply(count_invoices).sum()
-        
-        # Value assigned (sum of amounts where Match = "Yes")
-        value_assigned = 0
-        if 'Match' in valid_columns and 'Amount' in valid_columns:
-            # Use case-insensitive matching
-            value_assigned = df[df['Match'].str.strip().str.upper() == 'YES']['Amount'].sum()
-        
-        # Get file timestamp
         file_timestamp = datetime.fromtimestamp(os.path.getmtime(filepath))
-        
-        # Calculate processing time (minutes since 8:00 AM)
-        start_of_day = datetime.combine(file_timestamp.date(), datetime.strptime('08:00', '%H:%M').time())
-        processing_minutes = int((file_timestamp - start_of_day).total_seconds() / 60)
-        
-        # Convert amounts to EUR for consistent reporting
-        total_received_eur = convert_to_eur(total_received, currency)
-        value_assigned_eur = convert_to_eur(value_assigned, currency)
-        
-        return {
-            'date': processing_date,
-            'company_code': company_code,
-            'housebank': housebank,
-            'currency': currency,
-            'total_received': float(total_received),
-            'total_received_eur': float(total_received_eur),
-            'total_payments': int(total_payments),
-            'automated_count': int(automated_count),
-            'assigned_to_account': int(assigned_to_account),
-            'invoices_assigned': int(invoices_assigned),
-            'value_assigned': float(value_assigned),
-            'value_assigned_eur': float(value_assigned_eur),
-            'file_timestamp': file_timestamp,
-            'processing_minutes': processing_minutes
-        }
+        record = file_metrics(df, company_code, housebank, currency, file_timestamp, rate_date=processing_date,
+                              require_docnumbers=False)
+        return {'date': processing_date, **record}
         
     except Exception as e:
         print(f"Error processing file {filepath}: {str(e)}")
         return None
 
-def scan_and_process(network_path, exclude_today=True):
+def process_file_timed(job):
     """
-    Scan network path for all Excel files and process them.
-    Returns a list of processed records.
+    Process one (filepath, processing_date, known_sha256) job and time it.
+    If the content hash still matches known_sha256 the file is not parsed.
+    Module-level so it can be shipped to worker processes.
+    Returns (record, elapsed_seconds, sha256, unchanged).
+    """
+    filepath, processing_date, known_sha256 = job
+    start = time.perf_counter()
+    sha256 = hash_file(filepath)
+    if known_sha256 == sha256:
+        # Touched (new mtime) but same content - nothing to re-parse
+        return None, time.perf_counter() - start, sha256, True
+    record = process_excel_file(filepath, processing_date)
+    return record, time.perf_counter() - start, sha256, False
+
+def find_files_to_process(network_path, exclude_today=True):
+    """
+    Walk YYYYMM/YYYYMMDD folders and collect (file entry, processing_date) jobs.
+    Each folder is listed once with os.scandir (see dir_scanner.py); the entries
+    carry size/mtime, so no per-file stat is needed.
+    Folders and files are visited in sorted order so output is deterministic.
     Note: Since bank payments from yesterday are received today, we exclude both today and yesterday.
     """
-    records = []
+    jobs = []
     today = date.today()
     yesterday = today - timedelta(days=1)
     
-    print(f"Scanning network path: {network_path}")
-    
-    if not os.path.exists(network_path):
-        print(f"Error: Network path does not exist: {network_path}")
-        return records
-    
     # Iterate through YYYYMM folders
-    for month_folder in os.listdir(network_path):
-        month_path = os.path.join(network_path, month_folder)
-        
-        if not os.path.isdir(month_path):
-            continue
-        
-        # Check if folder matches YYYYMM format
-        if not re.match(r'^\d{6}$', month_folder):
-            continue
-        
-        print(f"Processing month: {month_folder}")
+    for month_folder in folders(network_path, MONTH_FOLDER):
+        print(f"Scanning month: {month_folder.name}")
         
         # Iterate through YYYYMMDD folders
-        for day_folder in os.listdir(month_path):
-            day_path = os.path.join(month_path, day_folder)
-            
-            if not os.path.isdir(day_path):
-                continue
-            
-            # Check if folder matches YYYYMMDD format
-            if not re.match(r'^\d{8}$', day_folder):
-                continue
-            
+        for day_folder in folders(month_folder.path, DAY_FOLDER):
             # Parse date from folder name
             try:
-                processing_date = datetime.strptime(day_folder, '%Y%m%d').date()
+                processing_date = datetime.strptime(day_folder.name, '%Y%m%d').date()
             except ValueError:
                 continue
             
             # Skip today and yesterday's data (yesterday is today's live data)
             if exclude_today and (processing_date == today or processing_date == yesterday):
-                print(f"Skipping live data: {day_folder}")
+                print(f"Skipping live data: {day_folder.name}")
                 continue
             
-            print(f"  Processing day: {day_folder}")
-            
-            # Process all Excel files in this day folder
-            for filename in os.listdir(day_path):
-                if filename.endswith('.xlsx') and not filename.startswith('~$'):
-                    filepath = os.path.join(day_path, filename)
-                    
-                    record = process_excel_file(filepath, processing_date)
-                    if record:
-                        records.append(record)
-                        print(f"    Processed: {filename}")
+            # Queue all Excel files in this day folder
+            for entry in files(day_folder.path, '.xlsx'):
+                jobs.append((entry, processing_date))
     
-    return records
+    return jobs
 
-def update_consolidated_database(records, db_path):
+def scan_and_process(network_path, exclude_today=True, workers=DEFAULT_WORKERS, incremental=True):
     """
-    Update consolidated database with new records.
-    If database exists, merge with existing data.
+    Scan network path for Excel files and process the new or modified ones.
+    Returns (records, manifest_entries): processed records in folder/file order
+    regardless of worker count, plus the ingest manifest entries to record once
+    the records are safely in the history store.
+    
+    With incremental=True files whose size/mtime (or content hash) match the
+    ingest manifest are skipped. With workers > 1 files are parsed in a process
+    pool; workers=0 uses one per CPU.
     """
-    # Create data directory if it doesn't exist
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    records = []
+    manifest_entries = []
+    
+    print(f"Scanning network path: {network_path}")
+    
+    if not os.path.exists(network_path):
+        print(f"Error: Network path does not exist: {network_path}")
+        return records, manifest_entries
+    
+    manifest = load_manifest() if incremental else {}
+    
+    # Only queue files that are new or changed since they were last ingested
+    jobs = []
+    file_entries = {}
+    skipped = 0
+    for file_entry, processing_date in find_files_to_process(network_path, exclude_today):
+        filepath = file_entry.path
+        entry = manifest.get(filepath)
+        if is_unchanged(entry, file_entry.size, file_entry.mtime_ns):
+            skipped += 1
+            continue
+        file_entries[filepath] = file_entry
+        jobs.append((filepath, processing_date, entry['sha256'] if entry else None))
+    
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    
+    print(f"Skipping {skipped} unchanged files")
+    print(f"Found {len(jobs)} new or modified files, processing with {workers} worker(s)")
+    
+    wall_start = time.perf_counter()
+    timings = []
+    
+    if workers > 1 and len(jobs) > 1:
+        # map() yields results in submission order, keeping output deterministic
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(process_file_timed, jobs, chunksize=4))
+    else:
+        results = map(process_file_timed, jobs)
+    
+    for (filepath, processing_date, _), (record, elapsed, sha256, unchanged) in zip(jobs, results):
+        filename = os.path.basename(filepath)
+        timings.append((elapsed, filepath))
+        file_entry = file_entries[filepath]
+        entry = {
+            'path': filepath,
+            'size': file_entry.size,
+            'mtime_ns': file_entry.mtime_ns,
+            'sha256': sha256,
+            'processing_date': processing_date,
+        }
+        if unchanged:
+            # Same content: keep the previously ingested record, refresh size/mtime
+            entry['record'] = manifest[filepath]['record']
+            manifest_entries.append(entry)
+            print(f"    Unchanged content: {processing_date} {filename}")
+        elif record:
+            entry['record'] = record
+            manifest_entries.append(entry)
+            records.append(record)
+            print(f"    Processed: {processing_date} {filename} ({elapsed:.2f}s)")
+    
+    wall_seconds = time.perf_counter() - wall_start
+    parse_seconds = sum(elapsed for elapsed, _ in timings)
+    print(f"Parsed {len(jobs)} files in {wall_seconds:.1f}s wall time ({parse_seconds:.1f}s total parse time)")
     
+    if timings:
+        print("Slowest files:")
+        for elapsed, filepath in sorted(timings, reverse=True)[:5]:
+            print(f"    {elapsed:.2f}s  {filepath}")
+    
+    return records, manifest_entries
+
+def update_consolidated_database(records, source='paco'):
+    """
+    Update consolidated history store with new records.
+    Existing records for the same date + bank account are replaced.
+    """
     # Convert records to DataFrame
     new_df = pd.DataFrame(records)
     
@@ -220,39 +212,24 @@ def update_consolidated_database(records, db_path):
         print("No records to update.")
         return
     
-    # Check if database exists
-    if os.path.exists(db_path):
-        print(f"Loading existing database: {db_path}")
-        existing_df = pd.read_excel(db_path, engine='openpyxl')
-        
-        # Convert date columns to date objects for comparison
-        existing_df['date'] = pd.to_datetime(existing_df['date']).dt.date
-        new_df['date'] = pd.to_datetime(new_df['date']).dt.date
-        
-        # Merge: Remove duplicates based on date + company_code + housebank + currency
-        # Keep new records (they are more recent/updated)
-        merged_df = pd.concat([existing_df, new_df], ignore_index=True)
-        merged_df = merged_df.drop_duplicates(
-            subset=['date', 'company_code', 'housebank', 'currency'],
-            keep='last'
-        )
-        
-        # Sort by date
-        merged_df = merged_df.sort_values('date', ascending=False)
-        
-        print(f"Merged {len(new_df)} new records with {len(existing_df)} existing records")
-        print(f"Total records after merge: {len(merged_df)}")
-    else:
-        print(f"Creating new database: {db_path}")
-        merged_df = new_df.sort_values('date', ascending=False)
+    store = get_history_store(source)
+    print(f"Updating history store: {HISTORY_DB_PATH}")
+    
+    # Merge: new records replace existing ones (they are more recent/updated)
+    total_records = store.upsert(new_df)
     
-    # Save to Excel
-    merged_df.to_excel(db_path, index=False, engine='openpyxl')
-    print(f"Database saved: {db_path}")
-    print(f"Total records: {len(merged_df)}")
+    print(f"Merged {len(new_df)} new records")
+    print(f"Total records: {total_records}")
 
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="Consolidate historical PACO output files")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Number of parallel parse processes (0 = one per CPU)")
+    parser.add_argument('--full', action='store_true',
+                        help="Reprocess every file, ignoring the ingest manifest")
+    args = parser.parse_args()
+    
     print("=" * 80)
     print("PACO Data Processor")
     print("=" * 80)
@@ -260,17 +237,22 @@ def main():
     print()
     
     # Scan and process Excel files
-    records = scan_and_process(NETWORK_PATH, exclude_today=True)
+    records, manifest_entries = scan_and_process(NETWORK_PATH, exclude_today=True,
+                                                 workers=args.workers, incremental=not args.full)
     
     print()
     print(f"Processed {len(records)} files")
     
     # Update consolidated database
     if records:
-        update_consolidated_database(records, LOCAL_DB_PATH)
+        update_consolidated_database(records)
     else:
         print("No records to process. Database not updated.")
     
+    # Only mark files as ingested once their records are stored
+    record_ingest(manifest_entries)
+    print(f"Ingest manifest updated: {len(manifest_entries)} files")
+    
     print()
     print(f"End time: {datetime.now()}")
     print("=" * 80)
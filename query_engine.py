@@ -0,0 +1,204 @@
+"""
+Query Engine
+Shared filter and aggregation logic for the dashboard endpoints.
+
+A request's filters are parsed once into a FilterSpec. Historical data is
+read from the daily aggregate cubes and live data from a frame built once
+per live snapshot, both filtered with vectorized masks. Results are
+memoized on (query, filter spec, period, data versions), so identical
+filter combinations from many dashboards are computed once per data change.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+import pandas as pd
+
+# Region to company codes mapping (frontend REGION_MAP)
+REGION_MAP = {
+    'Iberia': ['0040', '0041'],
+    'France': ['0043'],
+    'NDX': ['0019', '0022', '0023', '0024'],
+    'UK': ['0014'],
+    'BNX': ['0012', '0018'],
+    'GerAus': ['0010', '0033'],
+    'PLN': ['0023']
+}
+
+QUERY_CACHE_SIZE = 512  # Max memoized query results
+
+LIVE_COLUMNS = [
+    'company_code', 'housebank', 'currency', 'total_payments', 'total_received_eur',
+    'automated_count', 'assigned_to_account', 'invoices_assigned', 'value_assigned_eur',
+    'processing_minutes'
+]
+
+# bank_account: (company_code, housebank, currency) or None - overrides region/company_code
+FilterSpec = namedtuple('FilterSpec', ['bank_account', 'region', 'company_code'])
+
+def parse_filter_spec(args):
+    """Build a FilterSpec from request args (bank_account as "0010|1050D|EUR")"""
+    bank_account = args.get('bank_account', '')
+    account = None
+    if bank_account:
+        parts = bank_account.split('|')
+        # A malformed bank account matches nothing
+        account = tuple(parts) if len(parts) == 3 else ('', '', '')
+    return FilterSpec(account, args.get('region', ''), args.get('company_code', ''))
+
+def overview_range(period, today):
+    """
+    Historical date range for the overview cards.
+    "Today" is live data only, so its range is empty (start after end).
+    """
+    yesterday = today - timedelta(days=1)
+    days = {'week': 7, 'month': 30, 'quarter': 90}.get(period)
+    if days is None:
+        return today, yesterday
+    return today - timedelta(days=days), yesterday  # Exclude today (it's live)
+
+def trend_range(period, today):
+    """Historical date range for the trend chart (up to yesterday)"""
+    yesterday = today - timedelta(days=1)
+    days = {'week': 7, 'month': 30, 'quarter': 90}.get(period, 7)
+    return yesterday - timedelta(days=days), yesterday
+
+def account_mask(df, spec):
+    """Vectorized FilterSpec mask over any frame with company_code/housebank/currency"""
+    if spec.bank_account:
+        company_code, housebank, currency = spec.bank_account
+        return (df['company_code'] == company_code) & \
+               (df['housebank'] == housebank) & \
+               (df['currency'] == currency)
+
+    mask = pd.Series(True, index=df.index)
+    # Apply region filter (if set)
+    if spec.region and spec.region in REGION_MAP:
+        mask &= df['company_code'].isin(REGION_MAP[spec.region])
+    # Apply company code filter (can combine with region)
+    if spec.company_code:
+        mask &= (df['company_code'] == spec.company_code)
+    return mask
+
+def cube_filters(spec):
+    """FilterSpec as keyword arguments for DailyCube.daily()/total()"""
+    return {'bank_account': spec.bank_account, 'region': spec.region, 'company_code': spec.company_code}
+
+class QueryCache:
+    """Bounded LRU memo of query results keyed on (query, spec, period, versions)"""
+
+    def __init__(self, max_size=QUERY_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        # Compute outside the lock; a concurrent duplicate computation is harmless
+        result = compute()
+
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return result
+
+query_cache = QueryCache()
+
+def live_frame(records, live_version):
+    """Live snapshot records as a frame - built once per snapshot version"""
+    def build():
+        if not records:
+            return pd.DataFrame(columns=LIVE_COLUMNS)
+        return pd.DataFrame.from_records(list(records), columns=LIVE_COLUMNS)
+    return query_cache.get_or_compute(('live_frame', live_version), build)
+
+def overview_metrics(spec, period, today, cube, history_version, live_records, live_version):
+    """
+    Overview card metrics: historical totals from the cube plus today's live
+    records, both filtered by spec. Returns a dict (shared - do not modify).
+    """
+    def compute():
+        start_date, end_date = overview_range(period, today)
+
+        # Historical totals (empty range for "today")
+        totals = cube.total(start_date, end_date, **cube_filters(spec))
+
+        # Today's live data
+        live = live_frame(live_records, live_version)
+        live = live[account_mask(live, spec)]
+
+        total_payments = totals['total_payments'] + live['total_payments'].sum()
+        total_received = totals['total_received_eur'] + live['total_received_eur'].sum()  # EUR amounts
+        automated_count = totals['automated_count'] + live['automated_count'].sum()
+        assigned_to_account = totals['assigned_to_account'] + live['assigned_to_account'].sum()
+        total_invoices_assigned = totals['invoices_assigned'] + live['invoices_assigned'].sum()
+        total_assigned_value = totals['value_assigned_eur'] + live['value_assigned_eur'].sum()  # EUR amounts
+
+        processing_minutes_sum = totals['processing_minutes_sum'] + live['processing_minutes'].sum()
+        processing_minutes_count = totals['processing_minutes_count'] + live['processing_minutes'].notna().sum()
+
+        # Calculate percentages
+        automation_percentage = (automated_count / total_payments * 100) if total_payments > 0 else 0
+        assigned_percentage = (assigned_to_account / total_payments * 100) if total_payments > 0 else 0
+        value_assigned_percentage = (total_assigned_value / total_received * 100) if total_received > 0 else 0
+
+        # Average processing time (8:00 AM to file generation)
+        avg_auto_time_minutes = float(processing_minutes_sum / processing_minutes_count) if processing_minutes_count else 0.0
+
+        return {
+            'total_payments': int(total_payments),
+            'total_received': float(total_received),
+            'automation_percentage': round(float(automation_percentage), 1),
+            'automated_count': int(automated_count),
+            'manual_count': int(total_payments - automated_count),
+            'unassigned_count': int(total_payments - assigned_to_account),
+            'unassigned_value': float(total_received - total_assigned_value),
+            'assigned_percentage': round(float(assigned_percentage), 1),
+            'assigned_count': int(assigned_to_account),
+            'total_invoices_assigned': int(total_invoices_assigned),
+            'total_assigned_value': float(total_assigned_value),
+            'value_assigned_percentage': round(float(value_assigned_percentage), 1),
+            'avg_auto_time_minutes': avg_auto_time_minutes,
+        }
+
+    key = ('overview', spec, period, today, history_version, live_version)
+    return query_cache.get_or_compute(key, compute)
+
+def percentages(counts, totals):
+    return [round((count / total * 100) if total > 0 else 0, 1) for count, total in zip(counts, totals)]
+
+def automation_trend(spec, period, today, paco_cube, fran_cube, versions):
+    """
+    Daily PACO/FRAN trend series for the chart, filtered by spec.
+    versions identifies the cube contents (e.g. PACO and FRAN history versions).
+    Returns a dict of lists (shared - do not modify).
+    """
+    def compute():
+        start_date, end_date = trend_range(period, today)
+        paco_daily = paco_cube.daily(start_date, end_date, **cube_filters(spec))
+        fran_daily = fran_cube.daily(start_date, end_date, **cube_filters(spec))
+
+        # Align both systems on the union of their dates (missing days count as 0)
+        all_dates = paco_daily.index.union(fran_daily.index)
+        paco_daily = paco_daily.reindex(all_dates, fill_value=0)
+        fran_daily = fran_daily.reindex(all_dates, fill_value=0)
+
+        label_format = '%a %m/%d' if period == 'week' else '%m/%d'
+        result = {'labels': [date_obj.strftime(label_format) for date_obj in all_dates]}
+
+        for prefix, daily in (('paco', paco_daily), ('fran', fran_daily)):
+            totals = daily['total_payments'].tolist()
+            result[f'{prefix}_automated'] = percentages(daily['automated_count'].tolist(), totals)
+            result[f'{prefix}_customers'] = percentages(daily['assigned_to_account'].tolist(), totals)
+            result[f'{prefix}_invoices'] = percentages(daily['invoices_assigned'].tolist(), totals)
+            result[f'{prefix}_invoices_count'] = [int(count) for count in daily['invoices_assigned']]
+            result[f'{prefix}_payment_counts'] = [int(total) for total in totals]
+        return result
+
+    key = ('trend', spec, period, today, versions)
+    return query_cache.get_or_compute(key, compute)
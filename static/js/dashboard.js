@@ -12,6 +12,12 @@ let currentBankAccount = '';  // Combined filter: "company_code|housebank|curren
 let currentRegion = '';  // Region filter
 let currentCompanyCode = '';  // Company code filter
 let allBankAccounts = [];  // Store all bank accounts for cascading filters
+let transactionsNextCursor = null;  // Cursor of the next recent-transactions page (null = end of feed)
+let transactionsFilters = {};  // Filters of the feed on screen (bank_account, match, min_amount, max_amount) - every page uses the same
+let transactionsLoadingMore = false;
+let transactionsObserver = null;  // Loads the next page when the list end scrolls into view
+let exceptionsPage = 1;  // Current page of the customer exceptions table (1-based)
+const EXCEPTIONS_PAGE_SIZE = 50;
 
 // Format currency with EUR formatting
 function formatCurrency(amount) {
@@ -40,38 +46,66 @@ async function loadOverview() {
         const response = await fetch(`/api/overview?${params}`);
         const data = await response.json();
 
-        // 1. Update Total Payments Received (Amount)
-        updateStatValue('totalReceived', formatCurrency(data.total_received));
+        renderOverview(data);
+    } catch (error) {
+        console.error('Error loading overview:', error);
+        showNotification('Error loading overview data', 'error');
+    }
+}
+
+// Render overview cards
+function renderOverview(data) {
+    // 1. Update Total Payments Received (Amount)
+    updateStatValue('totalReceived', formatCurrency(data.total_received));
 
-        // 2. Update Total Payments (Number)
-        updateStatValue('totalPayments', formatNumber(data.total_payments));
+    // 2. Update Total Payments (Number)
+    updateStatValue('totalPayments', formatNumber(data.total_payments));
 
-        // 3. Update Processed Automatically
-        updateStatValue('automationPercentage', `${data.automation_percentage}%`);
-        document.getElementById('automationDetail').innerHTML =
-            `<span>${formatNumber(data.automated_count)} / ${formatNumber(data.total_payments)} payments</span>`;
+    // 3. Update Processed Automatically
+    updateStatValue('automationPercentage', `${data.automation_percentage}%`);
+    document.getElementById('automationDetail').innerHTML =
+        `<span>${formatNumber(data.automated_count)} / ${formatNumber(data.total_payments)} payments</span>`;
 
-        // 4. Update Payments Posted to Customer Accounts
-        updateStatValue('assignedAccountPercentage', `${data.assigned_percentage}%`);
-        document.getElementById('assignedAccountDetail').innerHTML =
-            `<span>${formatNumber(data.assigned_count)} / ${formatNumber(data.total_payments)} payments</span>`;
+    // 4. Update Payments Posted to Customer Accounts
+    updateStatValue('assignedAccountPercentage', `${data.assigned_percentage}%`);
+    document.getElementById('assignedAccountDetail').innerHTML =
+        `<span>${formatNumber(data.assigned_count)} / ${formatNumber(data.total_payments)} payments</span>`;
 
-        // 5. Update Number of Invoices Cleared
-        updateStatValue('totalInvoices', formatNumber(data.total_invoices_assigned));
+    // 5. Update Number of Invoices Cleared
+    updateStatValue('totalInvoices', formatNumber(data.total_invoices_assigned));
 
-        // 6. Update Invoices Amount Cleared (%)
-        updateStatValue('valueAssignedPercentage', `${data.value_assigned_percentage}%`);
-        document.getElementById('valueAssignedAmount').innerHTML =
-            `<span>${formatCurrency(data.total_assigned_value)} of total</span>`;
+    // 6. Update Invoices Amount Cleared (%)
+    updateStatValue('valueAssignedPercentage', `${data.value_assigned_percentage}%`);
+    document.getElementById('valueAssignedAmount').innerHTML =
+        `<span>${formatCurrency(data.total_assigned_value)} of total</span>`;
 
-        // 7. Update Average Time (Automation)
-        updateStatValue('avgAutoTime', data.avg_auto_time_minutes > 0
-            ? data.avg_auto_time_minutes.toFixed(1)
-            : '0');
+    // 7. Update Average Time (Automation)
+    updateStatValue('avgAutoTime', data.avg_auto_time_minutes > 0
+        ? data.avg_auto_time_minutes.toFixed(1)
+        : '0');
+}
+
+// Load every dashboard section with one request (initial page load)
+async function loadDashboard() {
+    try {
+        const params = new URLSearchParams({
+            period: currentPeriod,
+            chart_period: currentChartPeriod,
+            bank_account: currentBankAccount,
+            region: currentRegion,
+            company_code: currentCompanyCode
+        });
+        const response = await fetch(`/api/dashboard?${params}`, { cache: 'no-cache' });
+        const data = await response.json();
 
+        applyFilterOptions(data.filter_options);
+        renderOverview(data.overview);
+        renderAutomationChart(data.automation_trend);
+        renderCompanyStatus(data.company_status);
+        renderRecentTransactions(data.recent_transactions);
     } catch (error) {
-        console.error('Error loading overview:', error);
-        showNotification('Error loading overview data', 'error');
+        console.error('Error loading dashboard:', error);
+        showNotification('Error loading dashboard data', 'error');
     }
 }
 
@@ -474,18 +508,23 @@ async function loadFilterOptions() {
         const response = await fetch('/api/filter-options');
         const data = await response.json();
         
-        console.log(`Loaded ${data.bank_accounts.length} bank accounts for filters`);
-        
-        // Store all bank accounts globally for cascading filters
-        allBankAccounts = data.bank_accounts;
-        
-        // Populate filters
-        updateFilterDropdowns();
+        applyFilterOptions(data);
     } catch (error) {
         console.error('Error loading filter options:', error);
     }
 }
 
+// Store filter options and populate the filter dropdowns
+function applyFilterOptions(data) {
+    console.log(`Loaded ${data.bank_accounts.length} bank accounts for filters`);
+    
+    // Store all bank accounts globally for cascading filters
+    allBankAccounts = data.bank_accounts;
+    
+    // Populate filters
+    updateFilterDropdowns();
+}
+
 // Update filter dropdowns based on current selections (cascading filters)
 function updateFilterDropdowns() {
     const regionFilter = document.getElementById('regionFilter')?.value || '';
@@ -749,12 +788,9 @@ document.addEventListener('DOMContentLoaded', () => {
     setupCustomerExceptionsNav();
     setupCustomerExceptionsListeners();
 
-    // Load initial data
-    loadFilterOptions();
-    loadOverview();
-    loadAutomationTrend();
-    loadCompanyStatus();
-    loadRecentTransactions();
+    // Load initial data (all sections in one request) and subscribe to status changes
+    startStatusStream();
+    loadDashboard();
 
     console.log('Dashboard loaded successfully');
 });
@@ -762,175 +798,300 @@ document.addEventListener('DOMContentLoaded', () => {
 // Load company code processing status
 async function loadCompanyStatus() {
     try {
-        // Add cache buster to ensure fresh data
-        const cacheBuster = new Date().getTime();
-        const response = await fetch(`/api/company-status?_=${cacheBuster}`);
+        // Revalidate with the server (ETag) - unchanged data comes back as a cheap 304
+        const response = await fetch('/api/company-status', { cache: 'no-cache' });
         const data = await response.json();
 
-        const timestamp = new Date().toLocaleTimeString();
-        console.log(`Company status loaded: ${data.company_statuses.length} accounts at ${timestamp}`);
+        renderCompanyStatus(data);
+    } catch (error) {
+        console.error('Error loading company status:', error);
+        showNotification('Error loading company status', 'error');
+    }
+}
 
-        // Update timestamp display
-        const timestampElement = document.getElementById('companyStatusTimestamp');
-        if (timestampElement) {
-            timestampElement.textContent = timestamp;
-        }
+// Render company code status cards
+function renderCompanyStatus(data) {
+    const timestamp = new Date().toLocaleTimeString();
+    console.log(`Company status loaded: ${data.company_statuses.length} accounts at ${timestamp}`);
 
-        const grid = document.getElementById('companyStatusGrid');
-        grid.innerHTML = '';
-        
-        // Add a subtle flash effect to show refresh
-        grid.style.opacity = '0.5';
-        setTimeout(() => { grid.style.opacity = '1'; }, 100);
-
-        data.company_statuses.forEach(company => {
-            const statusClass = company.status.toLowerCase().replace(' ', '-');
-            const card = document.createElement('div');
-            card.className = `company-status-card ${statusClass}`;
-            
-            // Store company code as data attribute for filtering
-            card.setAttribute('data-company-code', company.company_code);
+    // Update timestamp display
+    const timestampElement = document.getElementById('companyStatusTimestamp');
+    if (timestampElement) {
+        timestampElement.textContent = timestamp;
+    }
 
-            // Use real start/end times from API
-            const startTime = company.start_time ? new Date(company.start_time) : null;
-            const endTime = company.end_time ? new Date(company.end_time) : null;
-            
-            const formatTime = (date) => date ? date.toLocaleTimeString('en-US', {hour: '2-digit', minute: '2-digit'}) : '--:--';
+    const grid = document.getElementById('companyStatusGrid');
+    grid.innerHTML = '';
+    
+    // Add a subtle flash effect to show refresh
+    grid.style.opacity = '0.5';
+    setTimeout(() => { grid.style.opacity = '1'; }, 100);
 
-            const matchedPercentage = company.matched_percentage || 0;
-            const valuePercentage = company.value_assigned_percentage || 0;
-            
-            card.innerHTML = `
-                <div class="company-status-header">
-                    <div class="company-code-label">
-                        <div class="company-code-main">
-                            <i class="fas fa-building"></i>
-                            ${company.company_code}
-                        </div>
-                        <div class="company-code-details">
-                            ${company.housebank} • ${company.currency}
-                        </div>
-                    </div>
-                    <span class="status-badge ${statusClass}">${company.status}</span>
-                </div>
-                <div class="company-progress">
-                    <div class="progress-info">
-                        <span>Processed Automatically</span>
-                        <span><strong>${matchedPercentage}%</strong></span>
-                    </div>
-                    <div class="progress-bar-container">
-                        <div class="progress-bar" style="width: ${matchedPercentage}%"></div>
-                    </div>
-                </div>
-                <div class="company-progress" style="margin-top: 8px;">
-                    <div class="progress-info">
-                        <span>Invoices Amount Cleared</span>
-                        <span><strong>${valuePercentage}%</strong></span>
-                    </div>
-                    <div class="progress-bar-container">
-                        <div class="progress-bar" style="width: ${valuePercentage}%; background: linear-gradient(90deg, #fd5d93 0%, #ec250d 100%);"></div>
-                    </div>
-                </div>
-                <div class="company-time-info">
-                    <span><span class="time-label">Start:</span>${formatTime(startTime)}</span>
-                    <span><span class="time-label">End:</span>${formatTime(endTime)}</span>
-                </div>
-                <div class="company-details">
-                    <span><i class="fas fa-user-check"></i> Posted to Customer Accounts: ${company.customers_assigned || 0}</span>
-                    <span><i class="fas fa-file-invoice"></i> Invoices Cleared: ${company.invoices_assigned || 0}</span>
-                </div>
-                <div class="company-details">
-                    <span><i class="fas fa-list"></i> Total Payments Received: ${company.total}</span>
+    data.company_statuses.forEach(company => {
+        grid.appendChild(createCompanyStatusCard(company));
+    });
+    
+    // Apply any active filters after cards are loaded
+    filterCompanyStatus();
+}
+
+// Build the status card for one bank account
+function createCompanyStatusCard(company) {
+    const statusClass = company.status.toLowerCase().replace(' ', '-');
+    const card = document.createElement('div');
+    card.className = `company-status-card ${statusClass}`;
+    
+    // Store company code as data attribute for filtering
+    card.setAttribute('data-company-code', company.company_code);
+    // Bank account identifies the card when a status delta arrives
+    card.setAttribute('data-bank-account', company.bank_account);
+    card.setAttribute('data-housebank', company.housebank);
+    card.setAttribute('data-currency', company.currency);
+
+    // Use real start/end times from API
+    const startTime = company.start_time ? new Date(company.start_time) : null;
+    const endTime = company.end_time ? new Date(company.end_time) : null;
+    
+    const formatTime = (date) => date ? date.toLocaleTimeString('en-US', {hour: '2-digit', minute: '2-digit'}) : '--:--';
+
+    const matchedPercentage = company.matched_percentage || 0;
+    const valuePercentage = company.value_assigned_percentage || 0;
+    
+    card.innerHTML = `
+        <div class="company-status-header">
+            <div class="company-code-label">
+                <div class="company-code-main">
+                    <i class="fas fa-building"></i>
+                    ${company.company_code}
                 </div>
-                <div class="sap-login-hint">
-                    <i class="fas fa-info-circle"></i> Ready for SAP login
+                <div class="company-code-details">
+                    ${company.housebank} • ${company.currency}
                 </div>
-            `;
+            </div>
+            <span class="status-badge ${statusClass}">${company.status}</span>
+        </div>
+        <div class="company-progress">
+            <div class="progress-info">
+                <span>Processed Automatically</span>
+                <span><strong>${matchedPercentage}%</strong></span>
+            </div>
+            <div class="progress-bar-container">
+                <div class="progress-bar" style="width: ${matchedPercentage}%"></div>
+            </div>
+        </div>
+        <div class="company-progress" style="margin-top: 8px;">
+            <div class="progress-info">
+                <span>Invoices Amount Cleared</span>
+                <span><strong>${valuePercentage}%</strong></span>
+            </div>
+            <div class="progress-bar-container">
+                <div class="progress-bar" style="width: ${valuePercentage}%; background: linear-gradient(90deg, #fd5d93 0%, #ec250d 100%);"></div>
+            </div>
+        </div>
+        <div class="company-time-info">
+            <span><span class="time-label">Start:</span>${formatTime(startTime)}</span>
+            <span><span class="time-label">End:</span>${formatTime(endTime)}</span>
+        </div>
+        <div class="company-details">
+            <span><i class="fas fa-user-check"></i> Posted to Customer Accounts: ${company.customers_assigned || 0}</span>
+            <span><i class="fas fa-file-invoice"></i> Invoices Cleared: ${company.invoices_assigned || 0}</span>
+        </div>
+        <div class="company-details">
+            <span><i class="fas fa-list"></i> Total Payments Received: ${company.total}</span>
+        </div>
+        <div class="sap-login-hint">
+            <i class="fas fa-info-circle"></i> Ready for SAP login
+        </div>
+    `;
+
+    return card;
+}
 
-            grid.appendChild(card);
-        });
+// Load recent transactions from today's live data (first page); filters are
+// kept for the following pages (undefined = keep the current ones)
+async function loadRecentTransactions(filters) {
+    if (filters !== undefined) transactionsFilters = filters;
+    try {
+        // Revalidate with the server (ETag) - unchanged data comes back as a cheap 304
+        const params = new URLSearchParams(transactionsFilters);
+        const response = await fetch(`/api/recent-transactions?${params}`, { cache: 'no-cache' });
+        const data = await response.json();
         
-        // Apply any active filters after cards are loaded
-        filterCompanyStatus();
+        renderRecentTransactions(data);
     } catch (error) {
-        console.error('Error loading company status:', error);
-        showNotification('Error loading company status', 'error');
+        console.error('Error loading recent transactions:', error);
+        const listElement = document.getElementById('transactionList');
+        listElement.innerHTML = `
+            <li class="loading">
+                <p style="color: var(--danger-color);">Error loading transactions</p>
+            </li>
+        `;
     }
 }
 
-// Load recent transactions from today's live data
-async function loadRecentTransactions() {
+// Append the next page of the feed (older payments)
+async function loadMoreTransactions() {
+    if (!transactionsNextCursor || transactionsLoadingMore) return;
+    transactionsLoadingMore = true;
     try {
-        // Add cache buster to ensure fresh data
-        const cacheBuster = new Date().getTime();
-        const response = await fetch(`/api/recent-transactions?_=${cacheBuster}`);
+        // Same filters as the first page, or the cursor would page through a different feed
+        const params = new URLSearchParams({ ...transactionsFilters, cursor: transactionsNextCursor });
+        const response = await fetch(`/api/recent-transactions?${params}`, { cache: 'no-cache' });
         const data = await response.json();
         
-        console.log(`Recent transactions loaded: ${data.transactions.length} transactions at ${new Date().toLocaleTimeString()}`);
+        renderRecentTransactions(data, true);
+    } catch (error) {
+        console.error('Error loading more transactions:', error);
+    } finally {
+        transactionsLoadingMore = false;
+    }
+}
 
-        const listElement = document.getElementById('transactionList');
+// Render the recent transactions list (append = add a further page below the current one)
+function renderRecentTransactions(data, append = false) {
+    console.log(`Recent transactions loaded: ${data.transactions.length} transactions at ${new Date().toLocaleTimeString()}`);
+
+    const listElement = document.getElementById('transactionList');
+    if (append) {
+        const moreElement = listElement.querySelector('.transaction-load-more');
+        if (moreElement) moreElement.remove();
+    } else {
         listElement.innerHTML = '';
+    }
+    transactionsNextCursor = data.next_cursor || null;
 
-        if (data.transactions.length === 0) {
-            listElement.innerHTML = `
-                <li class="loading">
-                    <p>No transactions found</p>
-                </li>
-            `;
-            return;
-        }
+    if (!append && data.transactions.length === 0) {
+        listElement.innerHTML = `
+            <li class="loading">
+                <p>No transactions found</p>
+            </li>
+        `;
+        return;
+    }
 
-        data.transactions.forEach(transaction => {
-            const li = document.createElement('li');
-            const isMatch = transaction.match === 'YES';
-            const typeClass = isMatch ? 'income' : 'expense';
-            const icon = isMatch ? '✓' : '⏳';
+    data.transactions.forEach(transaction => {
+        const li = document.createElement('li');
+        const isMatch = transaction.match === 'YES';
+        const typeClass = isMatch ? 'income' : 'expense';
+        const icon = isMatch ? '✓' : '⏳';
 
-            // Determine automation badge
-            let automationBadge = '';
-            if (transaction.match === 'YES') {
-                automationBadge = '<span style="background: rgba(0, 242, 195, 0.2); color: var(--success-color); padding: 3px 8px; border-radius: 4px; font-size: 0.7rem; margin-left: 8px;">AUTO</span>';
-            } else {
-                automationBadge = '<span style="background: rgba(255, 141, 114, 0.2); color: var(--warning-color); padding: 3px 8px; border-radius: 4px; font-size: 0.7rem; margin-left: 8px;">PENDING</span>';
-            }
+        // Determine automation badge
+        let automationBadge = '';
+        if (transaction.match === 'YES') {
+            automationBadge = '<span style="background: rgba(0, 242, 195, 0.2); color: var(--success-color); padding: 3px 8px; border-radius: 4px; font-size: 0.7rem; margin-left: 8px;">AUTO</span>';
+        } else {
+            automationBadge = '<span style="background: rgba(255, 141, 114, 0.2); color: var(--warning-color); padding: 3px 8px; border-radius: 4px; font-size: 0.7rem; margin-left: 8px;">PENDING</span>';
+        }
 
-            const bankAccount = `${transaction.company_code}-${transaction.housebank}-${transaction.currency}`;
-            const description = `Payment ${transaction.payment_number} - ${bankAccount}${transaction.business_partner ? ' - ' + transaction.business_partner : ''}`;
+        const bankAccount = `${transaction.company_code}-${transaction.housebank}-${transaction.currency}`;
+        const description = `Payment ${transaction.payment_number} - ${bankAccount}${transaction.business_partner ? ' - ' + transaction.business_partner : ''}`;
 
-            li.className = `transaction-item ${typeClass}`;
-            li.innerHTML = `
-                <div class="transaction-info">
-                    <div class="transaction-date">
-                        <i class="far fa-calendar"></i> ${transaction.payment_date}
-                    </div>
-                    <div class="transaction-description">
-                        ${icon} ${description} ${automationBadge}
-                    </div>
+        li.className = `transaction-item ${typeClass}`;
+        li.innerHTML = `
+            <div class="transaction-info">
+                <div class="transaction-date">
+                    <i class="far fa-calendar"></i> ${transaction.payment_date}
                 </div>
-                <div class="transaction-amount ${typeClass}">
-                    ${formatCurrency(Math.abs(transaction.amount))}
+                <div class="transaction-description">
+                    ${icon} ${description} ${automationBadge}
                 </div>
-            `;
-
-            listElement.appendChild(li);
-        });
-    } catch (error) {
-        console.error('Error loading recent transactions:', error);
-        const listElement = document.getElementById('transactionList');
-        listElement.innerHTML = `
-            <li class="loading">
-                <p style="color: var(--danger-color);">Error loading transactions</p>
-            </li>
+            </div>
+            <div class="transaction-amount ${typeClass}">
+                ${formatCurrency(Math.abs(transaction.amount))}
+            </div>
         `;
+
+        listElement.appendChild(li);
+    });
+
+    if (transactionsNextCursor) {
+        // End-of-list marker: scrolling it into view loads the next page
+        const moreElement = document.createElement('li');
+        moreElement.className = 'loading transaction-load-more';
+        moreElement.innerHTML = '<p>Loading more transactions...</p>';
+        moreElement.addEventListener('click', loadMoreTransactions);
+        listElement.appendChild(moreElement);
+
+        if (window.IntersectionObserver) {
+            if (!transactionsObserver) {
+                transactionsObserver = new IntersectionObserver(entries => {
+                    if (entries.some(entry => entry.isIntersecting)) loadMoreTransactions();
+                });
+            }
+            transactionsObserver.disconnect();
+            transactionsObserver.observe(moreElement);
+        }
     }
 }
 
-// Live data polling (every 5 minutes for company status and recent transactions)
-setInterval(() => {
-    console.log('Polling live data (5-minute interval)...');
-    loadCompanyStatus();
+// Sort order of the status grid (same as the server: company code, housebank, currency)
+function compareCompanyStatus(a, b) {
+    const keyA = [a.company_code, a.housebank, a.currency];
+    const keyB = [b.company_code, b.housebank, b.currency];
+    for (let i = 0; i < 3; i++) {
+        if (keyA[i] !== keyB[i]) return keyA[i] < keyB[i] ? -1 : 1;
+    }
+    return 0;
+}
+
+// Apply a status delta from the server: replace changed cards, drop removed ones
+function applyStatusDelta(delta) {
+    const grid = document.getElementById('companyStatusGrid');
+    const findCard = (bankAccount) => grid.querySelector(`[data-bank-account="${CSS.escape(bankAccount)}"]`);
+
+    delta.removed.forEach(bankAccount => {
+        const card = findCard(bankAccount);
+        if (card) card.remove();
+    });
+
+    delta.changed.forEach(company => {
+        const card = createCompanyStatusCard(company);
+        const existing = findCard(company.bank_account);
+        if (existing) {
+            existing.replaceWith(card);
+            return;
+        }
+        // New bank account - insert in sort order
+        const next = Array.from(grid.querySelectorAll('.company-status-card')).find(other => compareCompanyStatus({
+            company_code: other.getAttribute('data-company-code'),
+            housebank: other.getAttribute('data-housebank'),
+            currency: other.getAttribute('data-currency')
+        }, company) > 0);
+        grid.insertBefore(card, next || null);
+    });
+
+    const timestamp = new Date().toLocaleTimeString();
+    console.log(`Status delta applied: ${delta.changed.length} changed, ${delta.removed.length} removed at ${timestamp}`);
+    const timestampElement = document.getElementById('companyStatusTimestamp');
+    if (timestampElement) {
+        timestampElement.textContent = timestamp;
+    }
+
+    filterCompanyStatus();
     loadRecentTransactions();
-}, 300000); // 5 minutes = 300,000 milliseconds
+}
+
+// Live status updates: the server pushes per-account deltas as soon as its
+// refresher sees a change. Falls back to polling every 5 minutes without EventSource.
+function startStatusStream() {
+    if (!window.EventSource) {
+        setInterval(() => {
+            console.log('Polling live data (5-minute interval)...');
+            loadCompanyStatus();
+            loadRecentTransactions();
+        }, 300000); // 5 minutes = 300,000 milliseconds
+        return;
+    }
+
+    const source = new EventSource('/api/status-stream');
+    source.addEventListener('status', (event) => applyStatusDelta(JSON.parse(event.data)));
+    source.addEventListener('reset', () => {
+        // Missed deltas - reload the full grid
+        loadCompanyStatus();
+        loadRecentTransactions();
+    });
+    source.onerror = () => console.warn('Status stream interrupted - reconnecting...');
+}
 
 // Handle window resize
 let resizeTimer;
@@ -1125,8 +1286,8 @@ async function loadExceptionFilterOptions() {
     }
 }
 
-// Load customer exceptions with optional filters
-async function loadCustomerExceptions() {
+// Load a page of customer exceptions with optional filters (filtering starts over at page 1)
+function exceptionFilterParams() {
     const bankAccount = document.getElementById('exceptionBankAccount').value;
     const businessPartner = document.getElementById('exceptionBusinessPartner').value;
     const partnerKey = document.getElementById('exceptionPartnerKey').value;
@@ -1145,12 +1306,54 @@ async function loadCustomerExceptions() {
     if (businessPartner) params.append('business_partner', businessPartner);
     if (partnerKey) params.append('partner_key', partnerKey);
     if (partnerRef) params.append('partner_ref', partnerRef);
+    return params;
+}
+
+function exportCustomerExceptions() {
+    // Streamed download of everything matching the current filters
+    const params = exceptionFilterParams();
+    params.append('format', 'csv');
+    window.location.href = `/api/customer-exceptions/export?${params.toString()}`;
+}
+
+async function importCustomerExceptions(file) {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    try {
+        const response = await fetch('/api/customer-exceptions/bulk', {
+            method: 'POST',
+            body: formData
+        });
+        const result = await response.json();
+
+        if (response.ok) {
+            alert(`Import complete: ${result.created} created, ${result.updated} updated`);
+            loadCustomerExceptions(exceptionsPage);
+        } else {
+            // Rows are numbered from 1 after the header line
+            const details = (result.errors || []).slice(0, 10)
+                .map(item => `Row ${item.row + 1}: ${item.error}`).join('\n');
+            alert(`Import failed: ${result.error}${details ? '\n\n' + details : ''}`);
+        }
+    } catch (error) {
+        console.error('Error importing customer exceptions:', error);
+        alert('Error importing exceptions');
+    }
+}
+
+async function loadCustomerExceptions(page = 1) {
+    exceptionsPage = page;
+    const params = exceptionFilterParams();
+    params.append('page', page);
+    params.append('page_size', EXCEPTIONS_PAGE_SIZE);
 
     try {
         const response = await fetch(`/api/customer-exceptions?${params.toString()}`);
         const data = await response.json();
 
         renderExceptionsTable(data.exceptions);
+        renderExceptionsPager(data);
     } catch (error) {
         console.error('Error loading customer exceptions:', error);
         document.getElementById('exceptionsTableBody').innerHTML = `
@@ -1207,6 +1410,26 @@ function renderExceptionsTable(exceptions) {
     });
 }
 
+// Render the pager below the exceptions table ("1-50 of 1,234" with previous/next)
+function renderExceptionsPager(data) {
+    const pager = document.getElementById('exceptionsPager');
+    if (!pager) return;
+
+    const first = data.total === 0 ? 0 : (data.page - 1) * data.page_size + 1;
+    const last = Math.min(data.page * data.page_size, data.total);
+    const lastPage = Math.max(1, Math.ceil(data.total / data.page_size));
+
+    pager.innerHTML = `
+        <button class="action-btn" ${data.page <= 1 ? 'disabled' : ''} onclick="loadCustomerExceptions(${data.page - 1})">
+            <i class="fas fa-chevron-left"></i>
+        </button>
+        <span>${formatNumber(first)}-${formatNumber(last)} of ${formatNumber(data.total)}</span>
+        <button class="action-btn" ${data.page >= lastPage ? 'disabled' : ''} onclick="loadCustomerExceptions(${data.page + 1})">
+            <i class="fas fa-chevron-right"></i>
+        </button>
+    `;
+}
+
 // Open modal for adding exception
 function openAddExceptionModal() {
     console.log('⚠️ openAddExceptionModal() called!');
@@ -1227,15 +1450,12 @@ function openAddExceptionModal() {
 // Edit exception
 async function editException(id) {
     try {
-        // Get all exceptions and find the one to edit
-        const response = await fetch('/api/customer-exceptions');
-        const data = await response.json();
-        const exception = data.exceptions.find(e => e.id === id);
-
-        if (!exception) {
+        const response = await fetch(`/api/customer-exceptions/${id}`);
+        if (!response.ok) {
             alert('Exception not found');
             return;
         }
+        const exception = await response.json();
 
         // Populate modal with exception data
         document.getElementById('exceptionModalTitle').innerHTML = '<i class="fas fa-user-shield"></i> Edit Customer Exception';
@@ -1267,7 +1487,7 @@ async function deleteException(id) {
 
         if (response.ok) {
             alert('Exception deleted successfully');
-            loadCustomerExceptions();
+            loadCustomerExceptions(exceptionsPage);
         } else {
             const error = await response.json();
             alert(`Error deleting exception: ${error.error}`);
@@ -1330,7 +1550,7 @@ async function saveException() {
         if (response.ok) {
             alert(id ? 'Exception updated successfully' : 'Exception created successfully');
             closeExceptionModal();
-            loadCustomerExceptions();
+            loadCustomerExceptions(exceptionsPage);
         } else {
             const error = await response.json();
             alert(`Error saving exception: ${error.error}`);
@@ -1369,12 +1589,41 @@ function setupCustomerExceptionsListeners() {
             console.log('⚠️ Add Exception button not found');
         }
 
+        // Bulk import (CSV/JSON file) and export buttons
+        const importBtn = document.getElementById('importExceptionsBtn');
+        const importFile = document.getElementById('importExceptionsFile');
+        if (importBtn && importFile) {
+            importBtn.addEventListener('click', () => importFile.click());
+            importFile.addEventListener('change', () => {
+                if (importFile.files.length) {
+                    importCustomerExceptions(importFile.files[0]);
+                    importFile.value = '';
+                }
+            });
+        }
+        const exportBtn = document.getElementById('exportExceptionsBtn');
+        if (exportBtn) {
+            exportBtn.addEventListener('click', exportCustomerExceptions);
+        }
+
         // Apply filters button
         const applyFiltersBtn = document.getElementById('applyExceptionFiltersBtn');
         if (applyFiltersBtn) {
-            applyFiltersBtn.addEventListener('click', loadCustomerExceptions);
+            applyFiltersBtn.addEventListener('click', () => loadCustomerExceptions());
         }
 
+        // Search as you type in the partner fields (debounced; the server searches its index)
+        let exceptionSearchTimer;
+        ['exceptionBusinessPartner', 'exceptionPartnerKey', 'exceptionPartnerRef'].forEach(inputId => {
+            const input = document.getElementById(inputId);
+            if (input) {
+                input.addEventListener('input', () => {
+                    clearTimeout(exceptionSearchTimer);
+                    exceptionSearchTimer = setTimeout(() => loadCustomerExceptions(), 300);
+                });
+            }
+        });
+
         // Clear filters button
         const clearFiltersBtn = document.getElementById('clearExceptionFiltersBtn');
         if (clearFiltersBtn) {
@@ -0,0 +1,60 @@
+"""Rate table loading and date-effective conversion from a local ECB rates file"""
+from datetime import date
+import pytest
+import currency_converter
+
+ECB_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<gesmes:Envelope xmlns:gesmes="http://www.gesmes.org/xml/2002-08-01" xmlns="http://www.ecb.int/vocabulary/2002-08-01/eurofxref">
+    <gesmes:subject>Reference rates</gesmes:subject>
+    <Cube>
+        <Cube time="2025-11-05">
+            <Cube currency="USD" rate="1.25"/>
+            <Cube currency="GBP" rate="0.8"/>
+        </Cube>
+        <Cube time="2025-11-03">
+            <Cube currency="USD" rate="1.1"/>
+        </Cube>
+    </Cube>
+</gesmes:Envelope>
+"""
+
+ECB_CSV = """Date, USD, GBP, JPY,
+2025-11-05, 1.25, 0.8, N/A,
+2025-11-03, 1.1, N/A, N/A,
+"""
+
+@pytest.fixture(params=[('exchange_rates.xml', ECB_XML), ('exchange_rates.csv', ECB_CSV)], ids=['xml', 'csv'])
+def rates_path(request, tmp_path):
+    filename, content = request.param
+    path = tmp_path / filename
+    path.write_text(content)
+    return str(path)
+
+def test_rate_table_loads(rates_path):
+    table = currency_converter.build_rate_table(rates_path)
+    assert str(table['effective_date'].dtype) == 'datetime64[ns]'
+    usd = table[table['currency'] == 'USD']
+    assert len(usd) == 3  # Static rate + two published days
+
+def test_rates_are_date_effective(rates_path):
+    rates = currency_converter.eur_rates(
+        ['USD', 'USD', 'USD', 'USD', 'GBP2', 'EUR'],
+        [date(2025, 1, 1), date(2025, 11, 3), date(2025, 11, 4), date(2025, 11, 5), date(2025, 11, 6), date(2025, 11, 5)],
+        path=rates_path
+    )
+    expected = [currency_converter.EXCHANGE_RATES['USD'], 1 / 1.1, 1 / 1.1, 1 / 1.25, 1 / 0.8, 1.0]
+    assert rates == pytest.approx(expected)
+
+def test_convert_series_keeps_index(rates_path):
+    import pandas as pd
+
+    amounts = pd.Series([100.0, 'n/a'], index=[10, 11])
+    converted = currency_converter.convert_series_to_eur(
+        amounts, ['USD', 'USD'], [date(2025, 11, 5), date(2025, 11, 5)], path=rates_path
+    )
+    assert list(converted.index) == [10, 11]
+    assert converted.tolist() == pytest.approx([80.0, 0.0])
+
+def test_unknown_currency_falls_back_to_eur(rates_path):
+    rates = currency_converter.eur_rates(['XYZ'], [date(2025, 11, 5)], path=rates_path)
+    assert rates.tolist() == [1.0]
@@ -0,0 +1,138 @@
+"""Customer exception store on a temporary SQLite database"""
+import json
+import pytest
+import exception_store
+
+def exception(business_partner, exception_type='included', **fields):
+    return dict({
+        'company_code': '0010',
+        'housebank': '1050D',
+        'currency': 'EUR',
+        'business_partner': business_partner,
+        'partner_key': '',
+        'partner_ref': '',
+        'exception_type': exception_type,
+    }, **fields)
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    legacy = tmp_path / 'customer_exceptions.json'
+    legacy.write_text(json.dumps([
+        dict(exception('Legacy Partner One'), id=7, created_at='2025-01-01T00:00:00', updated_at='2025-01-01T00:00:00'),
+        dict(exception('Legacy Partner Two', 'excluded'), id=9),
+    ]))
+    monkeypatch.setattr(exception_store, 'LEGACY_JSON_PATH', str(legacy))
+    return str(tmp_path / 'customer_exceptions.db')
+
+def search(db_path, **filters):
+    rows, total = exception_store.list_exceptions(filters, db_path=db_path)
+    assert total == len(rows)
+    return [row['business_partner'] for row in rows]
+
+def assert_search_index_consistent(db_path):
+    if db_path not in exception_store.search_paths:
+        return  # SQLite without the FTS5 trigram tokenizer: searches scan the table
+    conn = exception_store.connect(db_path)
+    try:
+        table = exception_store.SEARCH_TABLE
+        conn.execute(f"INSERT INTO {table} ({table}) VALUES ('integrity-check')")
+    finally:
+        conn.close()
+
+def test_legacy_json_is_imported_once_with_ids(db_path):
+    rows, total = exception_store.list_exceptions(db_path=db_path)
+    assert total == 2
+    assert [row['id'] for row in rows] == [7, 9]
+    assert rows[0]['created_at'] == '2025-01-01T00:00:00'
+
+    exception_store.delete_exception(7, db_path=db_path)
+    exception_store.initialized_paths.discard(db_path)  # As if the app restarted
+    assert [row['id'] for row in exception_store.list_exceptions(db_path=db_path)[0]] == [9]
+
+def test_new_ids_follow_imported_ones(db_path):
+    created = exception_store.create_exception(exception('New Partner'), db_path=db_path)
+    assert created['id'] > 9
+
+def test_writes_keep_the_search_index_in_sync(db_path):
+    created = exception_store.create_exception(exception('Globex Corporation'), db_path=db_path)
+    assert search(db_path, business_partner='globex') == ['Globex Corporation']
+
+    exception_store.update_exception(created['id'], {'business_partner': 'Initech Ltd'}, db_path=db_path)
+    assert search(db_path, business_partner='globex') == []
+    assert search(db_path, business_partner='INITECH') == ['Initech Ltd']
+
+    exception_store.delete_exception(created['id'], db_path=db_path)
+    assert search(db_path, business_partner='initech') == []
+    assert_search_index_consistent(db_path)
+
+def test_search_combines_exact_and_substring_filters(db_path):
+    exception_store.create_exception(exception('Acme Germany', partner_key='K-100', currency='USD'), db_path=db_path)
+    exception_store.create_exception(exception('Acme France', partner_key='K-200'), db_path=db_path)
+    assert search(db_path, business_partner='acme', currency='usd') == ['Acme Germany']
+    assert search(db_path, partner_key='k-2') == ['Acme France']
+    assert search(db_path, business_partner='cm') == ['Acme Germany', 'Acme France']  # Short term: scan
+
+def test_pagination_counts_every_match(db_path):
+    for number in range(5):
+        exception_store.create_exception(exception(f'Paged Partner {number}'), db_path=db_path)
+    rows, total = exception_store.list_exceptions({'business_partner': 'paged'}, limit=2, offset=2, db_path=db_path)
+    assert total == 5
+    assert [row['business_partner'] for row in rows] == ['Paged Partner 2', 'Paged Partner 3']
+
+def test_validate_batch_reports_every_bad_row(db_path):
+    errors = exception_store.validate_batch([
+        exception('Fine'),
+        exception(''),
+        exception('Bad Type', 'maybe'),
+        'not an object',
+        exception('Bad Id', id='abc'),
+    ])
+    assert errors[0] is None
+    assert errors[1] == 'Missing required field: business_partner'
+    assert 'exception_type' in errors[2]
+    assert errors[3] == 'Row must be an object'
+    assert errors[4] == 'Invalid id: abc'
+
+def test_upsert_updates_by_id_and_natural_key(db_path):
+    results = exception_store.upsert_exceptions([
+        exception('Legacy Partner One', 'excluded'),            # Same natural key as id 7
+        dict(exception('Renamed Partner'), id=9),              # By id
+        exception('Brand New Partner'),                        # Created
+        dict(exception('Imported With Id'), id=500),           # Free id: created with it
+    ], db_path=db_path)
+    assert [(result['row'], result['status']) for result in results] == [
+        (0, 'updated'), (1, 'updated'), (2, 'created'), (3, 'created')
+    ]
+    assert results[0]['id'] == 7 and results[1]['id'] == 9 and results[3]['id'] == 500
+
+    assert exception_store.get_exception(7, db_path=db_path)['exception_type'] == 'excluded'
+    assert exception_store.get_exception(9, db_path=db_path)['business_partner'] == 'Renamed Partner'
+    assert exception_store.list_exceptions(db_path=db_path)[1] == 4
+    assert search(db_path, business_partner='renamed') == ['Renamed Partner']
+    assert_search_index_consistent(db_path)
+
+def test_upsert_bumps_the_version_once(db_path):
+    before, _ = exception_store.store_version(db_path=db_path)
+    exception_store.upsert_exceptions([exception(f'Batch {number}') for number in range(3)], db_path=db_path)
+    after, updated_at = exception_store.store_version(db_path=db_path)
+    assert after == before + 1
+    assert updated_at is not None
+
+def test_read_csv_rows(db_path):
+    rows = exception_store.read_csv_rows(
+        '﻿company_code, business_partner ,exception_type\n0010, Acme ,included\n'
+    )
+    assert rows == [{'company_code': '0010', 'business_partner': 'Acme', 'exception_type': 'included'}]
+
+def test_export_streams_matches_in_id_order(db_path):
+    exception_store.upsert_exceptions(
+        [exception(f'Export Partner {number}') for number in range(7)] + [exception('Other')],
+        db_path=db_path
+    )
+    batches = list(exception_store.iter_exceptions({'business_partner': 'export'}, batch_size=3, db_path=db_path))
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    exported = [row for batch in batches for row in batch]
+    assert [row['business_partner'] for row in exported] == [f'Export Partner {number}' for number in range(7)]
+    ids = [row['id'] for row in exported]
+    assert ids == sorted(ids)
+    assert list(exported[0]) == exception_store.FIELDS
@@ -0,0 +1,83 @@
+"""Transaction feed: per-file indexes, cursor paging across files and filters"""
+import pandas as pd
+import pytest
+from transaction_feed import file_transactions, feed_page, decode_cursor, encode_cursor
+
+def output_frame(rows):
+    return pd.DataFrame(rows, columns=['Payment_Number', 'Amount', 'Match', 'DocNumbers', 'Business_Partner', 'Payment Date'])
+
+@pytest.fixture
+def indexes():
+    # Both files share timestamps, so ties are broken by account and row
+    first = output_frame([
+        ['A1', 100.0, 'YES', 'INV1', 'ACME', '05/11/2025 09:00'],
+        ['A2', 200.0, 'NO', None, None, '05/11/2025 10:00'],
+        ['A3', 300.0, 'YES', 'INV3', 'ACME', '05/11/2025 10:00'],
+        ['A4', 400.0, 'yes', 'INV4', 'ACME', '05/11/2025 11:00'],
+    ])
+    second = output_frame([
+        ['B1', 50.0, 'NO', None, None, '05/11/2025 10:00'],
+        ['B2', 60.0, 'YES', 'INV6', 'Beta', '05/11/2025 10:00'],
+        ['B3', 70.0, 'YES', 'INV7', 'Beta', '05/11/2025 11:00'],
+        ['B4', 80.0, 'NO', None, None, 'not a date'],
+    ])
+    return [
+        file_transactions(first, '0010', '1050D', 'EUR'),
+        file_transactions(second, '0020', '2050D', 'USD'),
+    ]
+
+def all_pages(indexes, limit, **filters):
+    seen, cursor = [], None
+    while True:
+        page = feed_page(indexes, cursor=cursor, limit=limit, **filters)
+        seen.extend(transaction['payment_number'] for transaction in page['transactions'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return seen
+
+def test_pages_cover_the_feed_without_duplicates_or_gaps(indexes):
+    whole = feed_page(indexes, limit=100)['transactions']
+    expected = [transaction['payment_number'] for transaction in whole]
+    assert len(expected) == 8
+    for limit in (1, 2, 3, 7):
+        assert all_pages(indexes, limit) == expected
+
+def test_feed_is_newest_first_with_undated_last(indexes):
+    numbers = [transaction['payment_number'] for transaction in feed_page(indexes, limit=100)['transactions']]
+    assert set(numbers[:2]) == {'A4', 'B3'}
+    assert numbers[-1] == 'B4'
+
+def test_filters_apply_before_paging(indexes):
+    expected = [
+        transaction['payment_number']
+        for transaction in feed_page(indexes, limit=100)['transactions']
+        if transaction['match'] == 'YES' and transaction['amount'] >= 60
+    ]
+    assert all_pages(indexes, 2, match='yes', min_amount=60) == expected
+    # Equal timestamps: later rows first (the feed is newest first by (timestamp, account, row))
+    assert all_pages(indexes, 1, account=('0020', '2050D', 'USD')) == ['B3', 'B2', 'B1', 'B4']
+
+def test_cursor_round_trip(indexes):
+    key = indexes[0].keys[-1]
+    assert decode_cursor(encode_cursor(key)) == key
+
+@pytest.mark.parametrize('cursor', ['garbage', '1|2|3', 'x|0010|1050D|EUR|1', '1|0010|1050D|EUR|row'])
+def test_malformed_cursor_raises(indexes, cursor):
+    with pytest.raises(ValueError):
+        feed_page(indexes, cursor=cursor)
+
+def test_mixed_iso_and_dayfirst_dates():
+    df = output_frame([
+        ['P1', 1.0, 'YES', 'INV1', 'ACME', '2025-11-05 09:30:00'],
+        ['P2', 1.0, 'YES', 'INV2', 'ACME', '04/11/2025 08:00'],
+        ['P3', 1.0, 'YES', 'INV3', 'ACME', '2025-11-03'],
+        ['P4', 1.0, 'YES', 'INV4', 'ACME', '02.11.2025'],
+    ])
+    index = file_transactions(df, '0010', '1050D', 'EUR')
+    parsed = {transaction['payment_number']: transaction['payment_timestamp'] for transaction in index.transactions}
+    assert parsed == {
+        'P1': '2025-11-05T09:30:00',
+        'P2': '2025-11-04T08:00:00',
+        'P3': '2025-11-03T00:00:00',
+        'P4': '2025-11-02T00:00:00',
+    }
@@ -0,0 +1,39 @@
+"""read_workbook must match pd.read_excel restricted to the requested columns"""
+from datetime import datetime
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from workbook_reader import read_workbook, METRIC_COLUMNS, TRANSACTION_COLUMNS
+
+COLUMNS = METRIC_COLUMNS + TRANSACTION_COLUMNS
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['Payment_Number', ' Amount ', 'Match', 'Other', 'DocNumbers', 'Business_Partner', 'Payment Date'])
+    sheet.append(['P1', 1250.5, 'YES', 'x', 'INV001;INV002', 'ACME', datetime(2025, 11, 5, 9, 30)])
+    sheet.append(['P2', 100, 'no', None, None, None, datetime(2025, 11, 4)])
+    sheet.append([3, '2,602.90', 'Yes', 'y', 4711, 'Beta GmbH', '05/11/2025'])
+    sheet.append([None, None, None, 'only unrequested', None, None, None])
+    sheet.append(['P4', None, '#N/A', None, '', None, None])
+    sheet['C6'].data_type = 'e'
+    sheet.append([None] * 7)  # Trailing blank rows are dropped
+    sheet.append([None] * 7)
+    path = tmp_path / 'output.xlsx'
+    workbook.save(path)
+    return str(path)
+
+def expected_frame(path, columns):
+    df = pd.read_excel(path, engine='openpyxl')
+    df.columns = [name.strip() if isinstance(name, str) else name for name in df.columns]
+    return df[[name for name in columns if name in df.columns]]
+
+def test_matches_read_excel(workbook_path):
+    df = read_workbook(workbook_path, COLUMNS, engine='openpyxl')
+    pd.testing.assert_frame_equal(df, expected_frame(workbook_path, COLUMNS))
+
+def test_no_requested_column_keeps_row_count(workbook_path):
+    df = read_workbook(workbook_path, ['Missing'], engine='openpyxl')
+    assert len(df) == len(expected_frame(workbook_path, COLUMNS))
+    assert list(df.columns) == []
@@ -0,0 +1,135 @@
+"""
+Transaction Feed
+Newest-first feed of today's payments across all live output files.
+
+Each output file's rows are turned into a FileTransactions index when the
+file is parsed: transactions with a typed payment timestamp, sorted by
+sort key (payment timestamp, bank account, row). A feed page k-way merges
+the per-file indexes with a heap, starting just below the cursor, and stops
+as soon as the page is full - no request materializes the whole day.
+
+Usage:
+    from transaction_feed import file_transactions, feed_page
+
+    index = file_transactions(df, '0010', '1050D', 'EUR')
+    page = feed_page([index, ...], cursor=None, limit=10, match='YES')
+    page = feed_page([index, ...], cursor=page['next_cursor'])
+"""
+import heapq
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import islice
+import numpy as np
+import pandas as pd
+
+FEED_PAGE_SIZE = 10  # Default transactions per page
+FEED_MAX_PAGE_SIZE = 200
+NO_TIMESTAMP = -1  # Sort key of payments without a parseable Payment Date (oldest)
+CURSOR_SEPARATOR = '|'
+
+FileTransactions = namedtuple('FileTransactions', [
+    'account',       # (company_code, housebank, currency)
+    'keys',          # Ascending sort keys: (timestamp ns, company_code, housebank, currency, row)
+    'transactions'   # Transaction dicts in the same order as keys
+])
+
+def text_column(df, *names):
+    """First present column of `names` as display strings ('' for blanks)"""
+    for name in names:
+        if name in df.columns:
+            return df[name].astype(object).where(df[name].notna(), '').astype(str)
+    return pd.Series('', index=df.index, dtype=object)
+
+def file_transactions(df, company_code, housebank, currency):
+    """Build the sorted transaction index of one output file (stripped headers)"""
+    if 'Payment Date' in df.columns:
+        # Formats differ between source files: ISO values first (so dayfirst can't
+        # swap their month and day), then every other value on its own, day first
+        timestamps = pd.to_datetime(df['Payment Date'], errors='coerce', format='ISO8601')
+        rest = timestamps.isna() & df['Payment Date'].notna()
+        if rest.any():
+            timestamps[rest] = pd.to_datetime(df['Payment Date'][rest], errors='coerce', dayfirst=True, format='mixed')
+        unparsed = int((timestamps.isna() & df['Payment Date'].notna() & (df['Payment Date'].astype(str).str.strip() != '')).sum())
+        if unparsed:
+            print(f"Warning: {unparsed} unparseable Payment Date value(s) in {company_code}_{housebank}_{currency}, listed last in the feed")
+    else:
+        timestamps = pd.Series(pd.NaT, index=df.index)
+    timestamp_ns = np.where(timestamps.notna(), timestamps.values.astype('datetime64[ns]').astype('int64'), NO_TIMESTAMP)
+    amounts = pd.to_numeric(df['Amount'], errors='coerce').fillna(0.0) if 'Amount' in df.columns else pd.Series(0.0, index=df.index)
+
+    frame = pd.DataFrame({
+        'payment_number': text_column(df, 'Payment_Number'),
+        'business_partner': text_column(df, 'Business_Partner'),
+        'amount': amounts.astype(float),
+        'match': text_column(df, 'Match').str.strip().str.upper(),
+        'docnumbers': text_column(df, 'DocNumbers', 'Docnumbers'),
+        'payment_date': text_column(df, 'Payment Date'),
+        'payment_timestamp': timestamps.dt.strftime('%Y-%m-%dT%H:%M:%S').astype(object).where(timestamps.notna(), None),
+        'company_code': company_code,
+        'housebank': housebank,
+        'currency': currency,
+        'timestamp_ns': timestamp_ns,
+        'row': np.arange(len(df)),
+    })
+    frame = frame.sort_values(['timestamp_ns', 'row'], kind='stable')
+
+    keys = tuple(
+        (int(ns), company_code, housebank, currency, int(row))
+        for ns, row in zip(frame['timestamp_ns'], frame['row'])
+    )
+    transactions = tuple(frame.drop(columns=['timestamp_ns', 'row']).to_dict('records'))
+    return FileTransactions((company_code, housebank, currency), keys, transactions)
+
+def encode_cursor(key):
+    """Opaque cursor for the position just after `key`"""
+    return CURSOR_SEPARATOR.join(str(part) for part in key)
+
+def decode_cursor(cursor):
+    """Sort key of a cursor; raises ValueError if it is malformed"""
+    parts = cursor.split(CURSOR_SEPARATOR)
+    if len(parts) != 5:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return (int(parts[0]), parts[1], parts[2], parts[3], int(parts[4]))
+
+def newest_first(index, before=None):
+    """(key, transaction) pairs of one file index, newest first, strictly below `before`"""
+    end = len(index.keys) if before is None else bisect_left(index.keys, before)
+    for position in range(end - 1, -1, -1):
+        yield index.keys[position], index.transactions[position]
+
+def feed_page(indexes, cursor=None, limit=FEED_PAGE_SIZE, account=None, match=None,
+              min_amount=None, max_amount=None):
+    """
+    One page of the merged feed, newest first.
+    account: (company_code, housebank, currency) to show one bank account only
+    match: 'YES' / 'NO' (case-insensitive) to filter on the Match column
+    min_amount / max_amount: inclusive bounds on the payment amount
+    Returns {'transactions': [...], 'next_cursor': str or None}.
+    Raises ValueError for a malformed cursor.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    limit = max(1, min(int(limit), FEED_MAX_PAGE_SIZE))
+    match = match.strip().upper() if match else None
+
+    streams = [newest_first(index, before) for index in indexes if account is None or index.account == account]
+    merged = heapq.merge(*streams, key=lambda item: item[0], reverse=True)
+
+    def wanted(item):
+        transaction = item[1]
+        if match == 'YES' and transaction['match'] != 'YES':
+            return False
+        if match == 'NO' and transaction['match'] == 'YES':
+            return False
+        if min_amount is not None and transaction['amount'] < min_amount:
+            return False
+        if max_amount is not None and transaction['amount'] > max_amount:
+            return False
+        return True
+
+    # One extra item tells whether there is a next page
+    page = list(islice(filter(wanted, merged), limit + 1))
+    next_cursor = encode_cursor(page[limit - 1][0]) if len(page) > limit else None
+    return {
+        'transactions': [transaction for _, transaction in page[:limit]],
+        'next_cursor': next_cursor
+    }
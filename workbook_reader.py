@@ -0,0 +1,125 @@
+"""
+Workbook Reader
+Column-pruned streaming reads of the automation output workbooks.
+
+Rows of the first sheet are streamed and only the requested columns, resolved
+by stripped header name, are decoded and kept. The result matches
+pd.read_excel(filepath, engine='openpyxl') restricted to those columns:
+same NA handling, dtype inference and trailing-blank-row trimming.
+
+Engines (pluggable, fastest installed one is used by default):
+- calamine: python-calamine (Rust parser), if installed
+- openpyxl: openpyxl read-only/values-only mode
+
+Usage:
+    from workbook_reader import read_workbook, METRIC_COLUMNS
+
+    df = read_workbook(filepath, METRIC_COLUMNS)
+"""
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+WORKBOOK_ENGINE = None  # None = first installed engine in ENGINE_PREFERENCE
+ENGINE_PREFERENCE = ['calamine', 'openpyxl']
+
+# Columns the metrics need (DocNumbers is spelled both ways across automations)
+METRIC_COLUMNS = ['Amount', 'Match', 'DocNumbers', 'Docnumbers', 'Business_Partner']
+# Extra columns shown in recent transactions
+TRANSACTION_COLUMNS = ['Payment_Number', 'Payment Date']
+
+def convert_cell(value):
+    """Cell value as pandas' openpyxl reader returns it (empty -> '', integral floats -> int)"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def is_blank(value):
+    return value is None or value == ''
+
+def resolve_positions(header, columns):
+    """(names, positions) of the requested columns found in the header row (first match wins)"""
+    positions = {}
+    for index, name in enumerate(header):
+        if isinstance(name, str) and name.strip() in columns and name.strip() not in positions:
+            positions[name.strip()] = index
+    names = [name for name in columns if name in positions]
+    return names, [positions[name] for name in names]
+
+def prune_rows(rows, columns):
+    """Keep only the requested columns of full value rows. Returns (names, data rows)"""
+    header = next(rows, None)
+    if header is None:
+        return [], []
+    names, indexes = resolve_positions(header, columns)
+
+    data = []
+    last_filled = -1
+    for row in rows:
+        data.append([convert_cell(row[index]) if index < len(row) else '' for index in indexes])
+        if not all(is_blank(value) for value in row):
+            last_filled = len(data) - 1
+    # Trailing rows that are blank across the whole sheet are dropped (like pandas)
+    del data[last_filled + 1:]
+    return names, data
+
+def read_openpyxl(filepath, columns):
+    """openpyxl engine: read-only, values-only row streaming"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(filepath, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()  # Some writers store a wrong sheet size
+        return prune_rows(sheet.iter_rows(values_only=True), columns)
+    finally:
+        workbook.close()
+
+def read_calamine(filepath, columns):
+    """calamine engine: Rust parser, returns the sheet as Python values"""
+    from python_calamine import CalamineWorkbook
+
+    workbook = CalamineWorkbook.from_path(filepath)
+    rows = workbook.get_sheet_by_index(0).to_python(skip_empty_area=False)
+    return prune_rows(iter(rows), columns)
+
+ENGINES = {
+    'calamine': read_calamine,
+    'openpyxl': read_openpyxl,
+}
+
+# Package each engine needs
+ENGINE_MODULES = {'calamine': 'python_calamine', 'openpyxl': 'openpyxl'}
+
+def engine_available(name):
+    """True if the engine's parser package is installed"""
+    try:
+        __import__(ENGINE_MODULES[name])
+        return True
+    except ImportError:
+        return False
+
+def get_engine(name=None):
+    """Resolve an engine name (None = WORKBOOK_ENGINE or the first installed one)"""
+    name = name or WORKBOOK_ENGINE
+    if name:
+        return name
+    for candidate in ENGINE_PREFERENCE:
+        if engine_available(candidate):
+            return candidate
+    raise ImportError("No workbook engine installed (need openpyxl or python-calamine)")
+
+def read_workbook(filepath, columns, engine=None):
+    """
+    Read only `columns` from the first sheet of a workbook into a DataFrame.
+    Headers are matched after stripping whitespace; columns missing from the
+    sheet are left out of the result (check `in df.columns` as before).
+    """
+    names, data = ENGINES[get_engine(engine)](filepath, columns)
+    if not names:
+        # None of the columns present: keep the row count, like pd.read_excel(usecols=...)
+        return pd.DataFrame(index=pd.RangeIndex(len(data)))
+
+    # Same NA handling and dtype inference as pd.read_excel
+    return TextParser([names] + data, header=0, skip_blank_lines=False).read()